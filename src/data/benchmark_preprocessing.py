@@ -0,0 +1,41 @@
+import logging
+import time
+
+import click
+import pandas as pd
+
+from src.data.preprocessing import preprocess_parallel, text_preprocessor
+
+
+@click.command()
+@click.option('--file_path', help='Path to pickled dataset containing a title column')
+@click.option('--workers', help='Comma separated numbers of workers', default='1,2,4,8')
+@click.option('--chunksize', help='Number of titles shipped to a worker at once', type=int, default=10000)
+@click.option('--repetitions', help='Repeat titles to enlarge the corpus', type=int, default=1)
+def main(file_path, workers, chunksize, repetitions):
+    """Measure throughput of preprocess_parallel for different numbers of workers"""
+    logger = logging.getLogger(__name__)
+
+    titles = list(pd.read_pickle(file_path)['title'].astype(str).values) * repetitions
+    logger.info('Loaded {} titles from {}!'.format(len(titles), file_path))
+
+    baseline = None
+    for number_of_workers in [int(value) for value in workers.split(',')]:
+        # Start every run with an empty lemma memo
+        text_preprocessor.lemmas = {}
+
+        start = time.time()
+        preprocess_parallel(titles, workers=number_of_workers, chunksize=chunksize)
+        elapsed_time = time.time() - start
+
+        if baseline is None:
+            baseline = elapsed_time
+        logger.info('Workers: {} - {:.2f}s - {:.0f} titles/s - speedup {:.2f}'
+                    .format(number_of_workers, elapsed_time, len(titles) / elapsed_time, baseline / elapsed_time))
+
+
+if __name__ == '__main__':
+    log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
@@ -9,9 +9,10 @@ from dotenv import find_dotenv, load_dotenv
 import pandas as pd
 from sklearn.model_selection import train_test_split
 import csv
-import pickle
+from multiprocessing import Pool
 
 import src.data.unify_datasets as unify
+from src.data import split_storage
 
 
 @click.command()
@@ -94,24 +95,59 @@ def load_and_split_dataset(dataset):
         persist_dataset(dataset_collector[split], dataset, split)
 
 
-def load_line_json(path):
+def load_line_json(path, workers=1, dtype=object):
+    """Load a json lines file into a single DataFrame - lines are parsed in bulk, optionally by parallel workers
+
+        Values are kept as objects by default, as the json values are not converted."""
     logger = logging.getLogger(__name__)
 
-    df_ds = pd.DataFrame()
-    count = 0
+    if workers > 1:
+        with Pool(workers) as pool:
+            records = [record for chunk in pool.map(parse_line_json_range, split_line_ranges(path, workers))
+                       for record in chunk]
+    else:
+        with open(path) as fp:
+            records = [json.loads(line) for line in fp if line.strip()]
+
+    logger.info('Read {} lines from {}!'.format(len(records), path))
+    return pd.DataFrame(records, dtype=dtype)
+
+
+def iterate_line_json(path, chunksize=100000, dtype=object):
+    """Stream a json lines file as DataFrames of at most chunksize rows - for files that do not fit into memory"""
     with open(path) as fp:
-        while True:
-            count += 1
-            line = fp.readline()
+        records = []
+        for line in fp:
+            if line.strip():
+                records.append(json.loads(line))
+            if len(records) == chunksize:
+                yield pd.DataFrame(records, dtype=dtype)
+                records = []
+        if records:
+            yield pd.DataFrame(records, dtype=dtype)
+
 
-            if not line:
-                logger.info('Read {} lines from {}!'.format(count, path))
-                break
-            json_object = json.loads(line)
-            df_row = pd.DataFrame.from_dict(json_object, orient='index').transpose()
-            df_ds = df_ds.append(df_row)
+def split_line_ranges(path, number_of_ranges):
+    """Split a file into byte ranges of roughly equal size that start and end at line boundaries"""
+    size = os.path.getsize(path)
+    boundaries = [0]
+    with open(path, 'rb') as fp:
+        for i in range(1, number_of_ranges):
+            fp.seek(max(size * i // number_of_ranges, boundaries[-1]))
+            fp.readline()
+            boundaries.append(min(fp.tell(), size))
+    boundaries.append(size)
 
-    return df_ds
+    return [(path, start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if start < end]
+
+
+def parse_line_json_range(line_range):
+    path, start, end = line_range
+    with open(path, 'rb') as fp:
+        fp.seek(start)
+        lines = fp.read(end - start).decode('utf-8').splitlines()
+
+    return [json.loads(line) for line in lines if line.strip()]
 
 
 def split_dataset(df_dataset):
@@ -140,28 +176,8 @@ def split_dataset(df_dataset):
 
 
 def persist_dataset(df_dataset, dataset, split_name):
-    logger = logging.getLogger(__name__)
     data_dir = os.environ['DATA_DIR']
-    data_dir = Path(data_dir)
-    relative_path = 'data/processed/{}/split/raw/{}_data_{}.pkl'.format(dataset, split_name, dataset)
-    file_path = data_dir.joinpath(relative_path)
-
-    # Create new path if it does not exist yet!
-    if not os.path.exists(file_path):
-        logger.info('Path {} does not exist!'.format(file_path))
-        path_parts = relative_path.split('/')
-        path_parts = path_parts[:-1]
-        file_path = data_dir
-        for part in path_parts:
-            file_path = file_path.joinpath(part)
-            if not os.path.exists(file_path):
-                os.mkdir(file_path)
-                logger.info('Path {} created!'.format(file_path))
-        file_path = file_path.joinpath('{}_data_{}.pkl'.format(split_name, dataset))
-
-    with open(file_path, 'wb') as f:
-        pickle.dump(df_dataset, f)
-        logger.info('{} Split of Dataset saved at {}!'.format(split_name, dataset, file_path))
+    split_storage.persist_split(df_dataset, data_dir, dataset, split_name)
 
 
 if __name__ == '__main__':
@@ -1,50 +1,55 @@
 import logging
 import os
+from contextlib import ExitStack
+from itertools import islice
 from pathlib import Path
 
 import click
 import pandas as pd
 
-from src.data.preprocessing import preprocess
+from src.data import split_storage
+from src.data.preprocessing import create_pool, preprocess_parallel
+
+# Number of rows preprocessed and written per batch
+CHUNKSIZE = 100000
+# Write buffer of the generated files
+BUFFER_SIZE = 1 << 20
 
 @click.command()
 @click.option('--dataset_name', help='Dataset which you like to prepare for language modelling')
 @click.option('--additional_ds_path', help='Additional dataset for language modelling')
 @click.option('--additional_ds_suffix', help='Suffix to identify the additional ds')
-def main(dataset_name, additional_ds_path, additional_ds_suffix):
+@click.option('--workers', help='Number of processes used for preprocessing', type=int, default=1)
+def main(dataset_name, additional_ds_path, additional_ds_suffix, workers):
     """ Runs data processing scripts to turn raw data from (../raw) into
         cleaned data ready to be analyzed (saved in ../processed).
     """
     dataset = load_dataset(dataset_name)
 
     #Check if additional dataset information is provided
-    if not (additional_ds_path is None) and not (additional_ds_suffix is None):
-        df_additional_ds = pd.read_csv(additional_ds_path, sep=';')
-    else:
-        df_additional_ds = None
-    generate_datasets_for_language_modelling(dataset, dataset_name, df_additional_ds, additional_ds_suffix)
+    if additional_ds_path is None or additional_ds_suffix is None:
+        additional_ds_path = None
+    generate_datasets_for_language_modelling(dataset, dataset_name, additional_ds_path, additional_ds_suffix, workers)
 
 
 def load_dataset(dataset_name):
     """Load dataset for the given experiments"""
     logger = logging.getLogger(__name__)
     data_dir = os.environ['DATA_DIR']
-    data_dir = Path(data_dir)
     splits = ['train', 'validate']
     dataset = {}
 
     for split in splits:
-        relative_path = 'data/processed/{}/split/raw/{}_data_{}.pkl'.format(dataset_name, split, dataset_name)
-        file_path = data_dir.joinpath(relative_path)
-        dataset[split] = pd.read_pickle(file_path)
+        dataset[split] = split_storage.load_split(data_dir, dataset_name, split,
+                                                  columns=['title', 'description', 'path_list'])
 
     logger.info('Loaded dataset {}!'.format(dataset_name))
 
     return dataset
 
 
-def generate_datasets_for_language_modelling(dataset, dataset_name, df_additional_ds, additional_ds_suffix):
-    logger = logging.getLogger(__name__)
+def generate_datasets_for_language_modelling(dataset, dataset_name, additional_ds_path, additional_ds_suffix,
+                                             workers=1):
     data_dir = os.environ['DATA_DIR']
     data_dir = Path(data_dir)
 
@@ -55,13 +60,57 @@ def generate_datasets_for_language_modelling(dataset, dataset_name, df_additiona
 
     for config in configurations:
         # Make sure that an additional dataset is properly provided if requested
-        if df_additional_ds is None and additional_ds_suffix:
+        if additional_ds_path is None:
             config['additional_ds'] = False
-        generate_and_store_single_dataset_for_language_modelling(dataset, dataset_name, data_dir, config, df_additional_ds, additional_ds_suffix)
+    generate_and_store_datasets_for_language_modelling(dataset, dataset_name, data_dir, configurations,
+                                                       additional_ds_path, additional_ds_suffix, workers)
 
-def generate_and_store_single_dataset_for_language_modelling(dataset, dataset_name, data_dir, config, df_additional_ds, additional_ds_suffix):
+
+def generate_and_store_datasets_for_language_modelling(dataset, dataset_name, data_dir, configurations,
+                                                       additional_ds_path, additional_ds_suffix, workers=1):
+    """Generate the files of all configurations in a single pass over the data
+
+        Every row is preprocessed exactly once - the lines of all configurations are derived from the
+        preprocessed row and written batch-wise. The additional dataset is streamed once into the train files."""
     logger = logging.getLogger(__name__)
 
+    with_category = any([config['category'] for config in configurations])
+    with_description = any([config['description'] for config in configurations])
+    additional_configurations = [config for config in configurations if config['additional_ds']]
+
+    # One pool of workers for all chunks of all splits - workers are started and load WordNet only once
+    with ExitStack() as pool_stack:
+        pool = pool_stack.enter_context(create_pool(workers)) if workers != 1 else None
+
+        for split in dataset:
+            relative_paths = ['data/processed/{}/language-modelling/{}_language_modelling_{}_with_{}.txt'
+                              .format(dataset_name, split, dataset_name, determine_suffix(config, additional_ds_suffix))
+                              for config in configurations]
+
+            with ExitStack() as stack:
+                files = []
+                for relative_path in relative_paths:
+                    file_path = data_dir.joinpath(relative_path)
+                    file_path.parent.mkdir(parents=True, exist_ok=True)
+                    files.append(stack.enter_context(open(file_path, 'w', buffering=BUFFER_SIZE)))
+
+                for records in iterate_dataset_records(dataset[split], with_category, with_description, workers, pool):
+                    for config, file in zip(configurations, files):
+                        write_dataset_to_file(file, [line for record in records
+                                                     for line in generate_lines(config, *record)])
+
+                if split == 'train' and len(additional_configurations) > 0:
+                    for records in iterate_additional_records(additional_ds_path, workers, pool):
+                        for config, file in zip(configurations, files):
+                            if config['additional_ds']:
+                                write_dataset_to_file(file, [line for record in records
+                                                             for line in generate_additional_lines(config, *record)])
+
+            for relative_path in relative_paths:
+                logger.info('File {} created for Language Modelling!'.format(relative_path))
+
+
+def determine_suffix(config, additional_ds_suffix):
     suffix = 'title'
     for key in config:
         if config[key]:
@@ -70,95 +119,135 @@ def generate_and_store_single_dataset_for_language_modelling(dataset, dataset_na
     if not (additional_ds_suffix is None) and config['additional_ds']:
         suffix = '{}_{}'.format(suffix, additional_ds_suffix)
 
-    for split in dataset:
-        relative_path = 'data/processed/{}/language-modelling/{}_language_modelling_{}_with_{}.txt'.format(dataset_name, split, dataset_name, suffix)
-        file_path = data_dir.joinpath(relative_path)
-        with open(file_path, 'w') as file:
-            for index, row in dataset[split].iterrows():
-                #preprocess values
-                prep_title = preprocess(row['title'])
-                line = '{}'.format(prep_title)
-
-                if config['category']:
-                    categories = row['path_list'].split('>')
-                    categories = [value.split('_')[1] for value in categories]
-                    categories = [preprocess(value) for value in categories]
-
-                    new_line = prepare_category(config,categories,line)
-
-                    if config['multiple_rows']:
-                        write_dataset_to_file(file,new_line)
-                    else:
-                        line = new_line
-
-                if config['description']:
-                    new_line = prepare_description(row['description'], line)
-
-                    if config['multiple_rows']:
-                        write_dataset_to_file(file, new_line)
-                    else:
-                        line = new_line
-
-                if not config['multiple_rows']:
-                    write_dataset_to_file(file, line)
-
-                if split == 'train' and config['additional_ds']:
-                    for index, row in df_additional_ds.iterrows():
-                        line = preprocess(row['Title'])
-                        categories = []
-                        if row['Category'] is not None and type(row['Category']) is str:
-                            categories.append(row['Category'])
-                        if row['Breadcrumb'] is not None and type(row['Breadcrumb']) is str:
-                            categories.append(row['Breadcrumb'])
-                        if row['BreadcrumbList'] is not None and type(row['BreadcrumbList']) is str:
-                            categories.append(row['BreadcrumbList'])
-
-
-                        if len(categories) > 0 and config['category']:
-                            new_line = prepare_category(config, categories, line)
-
-                            if config['multiple_rows']:
-                                write_dataset_to_file(file, new_line)
-                            else:
-                                line = new_line
-
-                        if type(row['Description']) is str and config['description']:
-                            new_line = prepare_description(row['Description'], line)
-
-                            if config['multiple_rows']:
-                                write_dataset_to_file(file, new_line)
-                            else:
-                                line = new_line
-                        file.write('{}\n'.format(line))
-
-        logger.info('File {} created for Language Modelling!'.format(relative_path))
+    return suffix
+
+
+def preprocess_groups(groups, workers=1, pool=None):
+    """Preprocess lists of texts with a single call - returns the preprocessed lists"""
+    preprocessed_texts = iter(preprocess_parallel([text for group in groups for text in group], workers,
+                                                  pool=pool))
+    return [list(islice(preprocessed_texts, len(group))) for group in groups]
+
+
+def split_description(description):
+    """Sentences of a description that are long enough to be used for language modelling"""
+    if type(description) is not str:
+        return []
+    return [value for value in description.split('.') if len(value) > 4]
+
+
+def iterate_dataset_records(df_dataset, with_category, with_description, workers=1, pool=None,
+                            chunksize=CHUNKSIZE):
+    """Yield batches of preprocessed records (title, categories, description values) of a split"""
+    for start in range(0, len(df_dataset), chunksize):
+        df_chunk = df_dataset.iloc[start:start + chunksize]
+        groups = [[title] for title in df_chunk['title']]
+
+        if with_category:
+            groups.extend([[value.split('_')[1] for value in path_list.split('>')]
+                           for path_list in df_chunk['path_list']])
+        if with_description:
+            groups.extend([split_description(description) for description in df_chunk['description']])
+
+        groups = preprocess_groups(groups, workers, pool)
+        titles = [group[0] for group in groups[:len(df_chunk)]]
+        categories = groups[len(df_chunk):2 * len(df_chunk)] if with_category else [None] * len(df_chunk)
+        descriptions = groups[-len(df_chunk):] if with_description else [None] * len(df_chunk)
+
+        yield list(zip(titles, categories, descriptions))
+
+
+def iterate_additional_records(additional_ds_path, workers=1, pool=None, chunksize=CHUNKSIZE):
+    """Yield batches of records (title, categories, description values) of the additional dataset
+
+        Only titles and descriptions are preprocessed - categories are used as provided."""
+    for df_chunk in pd.read_csv(additional_ds_path, sep=';', chunksize=chunksize):
+        groups = [[title] for title in df_chunk['Title']]
+        groups.extend([split_description(description) for description in df_chunk['Description']])
+        groups = preprocess_groups(groups, workers, pool)
+
+        categories = [[value for value in values if type(value) is str]
+                      for values in zip(df_chunk['Category'], df_chunk['Breadcrumb'], df_chunk['BreadcrumbList'])]
+
+        # Descriptions are only used if provided
+        descriptions = [values if type(description) is str else None
+                        for description, values in zip(df_chunk['Description'], groups[len(df_chunk):])]
+
+        yield list(zip([group[0] for group in groups[:len(df_chunk)]], categories, descriptions))
+
+
+def generate_lines(config, title, categories, description_values):
+    """Lines of a preprocessed record of the dataset"""
+    lines = []
+    line = title
+
+    if config['category']:
+        new_line = prepare_category(config, categories, line)
+
+        if config['multiple_rows']:
+            lines.append(new_line)
+        else:
+            line = new_line
+
+    if config['description']:
+        new_line = prepare_description(description_values, line)
+
+        if config['multiple_rows']:
+            lines.append(new_line)
+        else:
+            line = new_line
+
+    if not config['multiple_rows']:
+        lines.append(line)
+
+    return lines
+
+
+def generate_additional_lines(config, title, categories, description_values):
+    """Lines of a record of the additional dataset - the last line is written in any case"""
+    lines = []
+    line = title
+
+    if len(categories) > 0 and config['category']:
+        new_line = prepare_category(config, categories, line)
+
+        if config['multiple_rows']:
+            lines.append(new_line)
+        else:
+            line = new_line
+
+    if description_values is not None and config['description']:
+        new_line = prepare_description(description_values, line)
+
+        if config['multiple_rows']:
+            lines.append(new_line)
+        else:
+            line = new_line
+
+    lines.append(line)
+
+    return lines
 
 def prepare_category(config, categories, line):
+    # Records are shared by all configurations - do not reverse in place
     if config['category_reverse']:
-        categories.reverse()
+        categories = categories[::-1]
 
     prep_catgories = ' '.join(categories)
     new_line = '{} - {}'.format(line, prep_catgories)
 
     return new_line
 
-def prepare_description(description, line):
-    description_values = description.split('.')
-    preprocessed_description_values = []
-    for value in description_values:
-        if len(value) > 4:
-            preprocessed_description_values.append(preprocess(value))
-
+def prepare_description(preprocessed_description_values, line):
     new_line = '{} - {}'.format(line, '. '.join(preprocessed_description_values))
 
     return new_line
 
-def write_dataset_to_file(file, line):
-    line = '{}\n'.format(line)
-    file.write(line)
+def write_dataset_to_file(file, lines):
+    file.write(''.join(['{}\n'.format(line) for line in lines]))
 
 if __name__ == '__main__':
     log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     logging.basicConfig(level=logging.INFO, format=log_fmt)
 
-    main()
\ No newline at end of file
+    main()
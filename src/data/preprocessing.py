@@ -1,4 +1,6 @@
+import itertools
 import re
+from multiprocessing import Pool
 
 from bs4 import BeautifulSoup
 import numpy as np
@@ -109,28 +111,135 @@ def preprocess_nils(s):
 # MWPD - Preprocessing
 # https://github.com/ir-ischool-uos/mwpd/blob/master/prodcls/python/src/baseline/fasttext_baseline.py
 #########################
+class TextPreprocessor:
+    """MWPD preprocessing with precompiled patterns and memoized lemmas
+
+        Product vocabularies are highly repetitive - every distinct token is lemmatized only once, such that
+        preprocessing large corpora is bounded by the vocabulary size rather than the number of tokens."""
+
+    url_pattern = re.compile(r'\w+:\/{2}[\d\w-]+(\.[\d\w-]+)*(?:(?:\/[^\s/]*))*')
+    non_word_pattern = re.compile(r'\W+')
+    separator_pattern = re.compile('[^a-zA-Z0-9]+')
+
+    def __init__(self, lemmatizer=None, min_lemma_length=4):
+        self.lemmatizer = lemmatizer if lemmatizer is not None else WordNetLemmatizer()
+        self.min_lemma_length = min_lemma_length
+
+        # Memo of lemmatized tokens - worker processes additionally track lemmas learned since pop_new_lemmas()
+        self.lemmas = {}
+        self.new_lemmas = None
+
+    def normalize(self, text):
+        text = self.url_pattern.sub('', text)
+        text = self.non_word_pattern.sub(' ', text).strip()
+        return text
+
+    def lemmatize(self, token):
+        lemma = self.lemmas.get(token)
+        if lemma is None:
+            lemma = self.lemmatizer.lemmatize(token)
+            self.lemmas[token] = lemma
+            if self.new_lemmas is not None:
+                self.new_lemmas[token] = lemma
+        return lemma
+
+    def tokenize(self, text):
+        """Removes punctuation & excess whitespace, sets to lowercase,
+        and normalizes text. Returns a list of normalised tokens."""
+        tokens = []
+        for t in self.separator_pattern.split(text.lower()):
+            if len(t) < self.min_lemma_length:
+                if t:
+                    tokens.append(t)
+            else:
+                tokens.append(self.lemmatize(t))
+        return tokens
+
+    def preprocess(self, text):
+        return " ".join(self.tokenize(self.normalize(text)))
+
+    def preprocess_many(self, texts):
+        """Preprocess an iterable of texts - returns a list in the same order"""
+        preprocess = self.preprocess
+        return [preprocess(text) for text in texts]
+
+    def pop_new_lemmas(self):
+        new_lemmas = self.new_lemmas
+        self.new_lemmas = {}
+        return new_lemmas
+
+
 lemmatizer = WordNetLemmatizer()
+text_preprocessor = TextPreprocessor(lemmatizer)
+
 
 def preprocess(text):
-    text = normalize(text)
-    text_parts = tokenize(text)
+    return text_preprocessor.preprocess(text)
+
+
+def preprocess_many(texts):
+    return text_preprocessor.preprocess_many(texts)
 
-    return " ".join(text_parts).strip()
 
 def normalize(text):
-    text = re.sub(r'\w+:\/{2}[\d\w-]+(\.[\d\w-]+)*(?:(?:\/[^\s/]*))*', '', text)
-    text = re.sub(r'\W+', ' ', text).strip()
-    return text
+    return text_preprocessor.normalize(text)
 
 
 def tokenize(text):
     """Removes punctuation & excess whitespace, sets to lowercase,
     and normalizes text. Returns a list of normalised tokens."""
-    text = " ".join(re.split("[^a-zA-Z0-9]+", text.lower())).strip()
-    tokens = []
-    for t in text.split():
-        if len(t) < 4:
-            tokens.append(t)
-        else:
-            tokens.append(lemmatizer.lemmatize(t))
-    return tokens
+    return text_preprocessor.tokenize(text)
+
+
+# Separators of texts in chunk buffers - preprocessed texts never contain line breaks
+TEXT_SEPARATOR = '\0'
+PREPROCESSED_TEXT_SEPARATOR = '\n'
+
+
+def initialize_worker(lemmas):
+    text_preprocessor.lemmas.update(lemmas)
+    text_preprocessor.new_lemmas = {}
+
+
+def preprocess_chunk(buffer):
+    """Preprocess a chunk of texts shipped as utf-8 buffer - returns a buffer plus the newly learned lemmas"""
+    texts = buffer.decode('utf-8').split(TEXT_SEPARATOR)
+    preprocessed_texts = text_preprocessor.preprocess_many(texts)
+
+    return PREPROCESSED_TEXT_SEPARATOR.join(preprocessed_texts).encode('utf-8'), text_preprocessor.pop_new_lemmas()
+
+
+def encode_chunks(texts, chunksize):
+    texts = iter(texts)
+    while True:
+        chunk = list(itertools.islice(texts, chunksize))
+        if not chunk:
+            return
+        # The separator is a non-word character, thus replacing it does not change the preprocessed text
+        yield TEXT_SEPARATOR.join([text.replace(TEXT_SEPARATOR, ' ') for text in chunk]).encode('utf-8')
+
+
+def create_pool(workers=None):
+    """Pool of preprocessing workers - can be shared by several calls of preprocess_parallel"""
+    return Pool(workers, initializer=initialize_worker, initargs=(text_preprocessor.lemmas,))
+
+
+def preprocess_parallel(texts, workers=None, chunksize=10000, pool=None):
+    """Preprocess texts on a pool of worker processes - returns a list in the same order as the input
+
+        Chunks are shipped as compact utf-8 buffers. Lemmas learned by the workers are merged into the lemma
+        memo of this process, such that subsequent calls start from the merged memo. An existing pool (see
+        create_pool) is reused, otherwise a pool is started for this call only."""
+    if pool is None:
+        if workers == 1:
+            return preprocess_many(texts)
+
+        with create_pool(workers) as pool:
+            return preprocess_parallel(texts, chunksize=chunksize, pool=pool)
+
+    preprocessed_texts = []
+    for buffer, new_lemmas in pool.imap(preprocess_chunk, encode_chunks(texts, chunksize)):
+        preprocessed_texts.extend(buffer.decode('utf-8').split(PREPROCESSED_TEXT_SEPARATOR))
+        text_preprocessor.lemmas.update(new_lemmas)
+
+    return preprocessed_texts
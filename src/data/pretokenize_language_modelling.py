@@ -0,0 +1,41 @@
+import logging
+import os
+
+import click
+from transformers import AutoTokenizer
+
+from src.models.transformers.dataset.token_shards import load_token_shards
+
+
+@click.command()
+@click.option('--train_file', help='Language modelling text file used for training')
+@click.option('--validation_file', help='Language modelling text file used for validation')
+@click.option('--tokenizer_name', help='Pretrained tokenizer name or path', default='roberta-base')
+@click.option('--packed_dataset_dir', help='Output directory of the token shards - pass it to run_mlm.py')
+@click.option('--max_seq_length', help='Tokens per packed block or maximum tokens per line', type=int, default=None)
+@click.option('--line_by_line', help='Keep lines as distinct sequences', is_flag=True)
+@click.option('--overwrite_cache', help='Tokenize again even if the token shards are up to date', is_flag=True)
+def main(train_file, validation_file, tokenizer_name, packed_dataset_dir, max_seq_length, line_by_line,
+         overwrite_cache):
+    """Tokenize the text files produced by prepare_language_modelling once and store them as token shards"""
+    logger = logging.getLogger(__name__)
+
+    tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+    if max_seq_length is None:
+        max_seq_length = tokenizer.model_max_length
+    else:
+        max_seq_length = min(max_seq_length, tokenizer.model_max_length)
+
+    data_files = {'train': train_file, 'validation': validation_file}
+    for split, text_path in data_files.items():
+        if text_path is not None:
+            dataset = load_token_shards(text_path, os.path.join(packed_dataset_dir, split), tokenizer,
+                                        max_seq_length, line_by_line, overwrite=overwrite_cache)
+            logger.info('{} split contains {} sequences!'.format(split, len(dataset)))
+
+
+if __name__ == '__main__':
+    log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
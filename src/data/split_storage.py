@@ -0,0 +1,92 @@
+"""Persist dataset splits as memory-mappable Arrow files plus a manifest"""
+import json
+import logging
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+MANIFEST_FILE = 'manifest.json'
+
+
+def split_dir(data_dir, dataset_name):
+    return Path(data_dir).joinpath('data', 'processed', dataset_name, 'split', 'raw')
+
+
+def split_path(data_dir, dataset_name, split):
+    """Path to the Arrow file of a split - the pickle of previously persisted splits is used as fallback"""
+    path = split_dir(data_dir, dataset_name).joinpath('{}_data_{}.arrow'.format(split, dataset_name))
+    if not path.exists():
+        pickle_path = path.with_suffix('.pkl')
+        if pickle_path.exists():
+            return pickle_path
+
+    return path
+
+
+def persist_split(df_dataset, data_dir, dataset_name, split):
+    """Write split as uncompressed Arrow (Feather v2) file and register it in the manifest"""
+    logger = logging.getLogger(__name__)
+
+    directory = split_dir(data_dir, dataset_name)
+    directory.mkdir(parents=True, exist_ok=True)
+    file_name = '{}_data_{}.arrow'.format(split, dataset_name)
+
+    # Uncompressed files can be memory-mapped and read without copying
+    table = pa.Table.from_pandas(df_dataset, preserve_index=True)
+    feather.write_feather(table, str(directory.joinpath(file_name)), compression='uncompressed')
+
+    manifest = load_manifest(data_dir, dataset_name) or {'dataset': dataset_name, 'splits': {}}
+    manifest['splits'][split] = {
+        'file': file_name,
+        'rows': len(df_dataset),
+        'schema': {field.name: str(field.type) for field in table.schema},
+        'labels': sorted(df_dataset['category'].astype(str).unique().tolist())
+        if 'category' in df_dataset.columns else None
+    }
+
+    # Replace manifest atomically
+    manifest_path = directory.joinpath(MANIFEST_FILE)
+    with open('{}.tmp'.format(manifest_path), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace('{}.tmp'.format(manifest_path), manifest_path)
+
+    logger.info('{} split of dataset {} saved at {}!'.format(split, dataset_name, directory.joinpath(file_name)))
+
+
+def load_manifest(data_dir, dataset_name):
+    manifest_path = split_dir(data_dir, dataset_name).joinpath(MANIFEST_FILE)
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def load_split(data_dir, dataset_name, split, columns=None):
+    """Load a split - only the requested columns are read from the memory-mapped file"""
+    path = split_path(data_dir, dataset_name, split)
+    if path.suffix == '.pkl':
+        df_dataset = pd.read_pickle(path)
+        return df_dataset if columns is None else df_dataset[columns]
+
+    # Zero-copy read of the memory-mapped file - only the selected columns are converted to pandas
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    if columns is not None:
+        pandas_metadata = table.schema.pandas_metadata or {}
+        index_columns = [column for column in pandas_metadata.get('index_columns', []) if isinstance(column, str)]
+        table = table.select(list(columns) + index_columns)
+
+    return table.to_pandas()
+
+
+def load_labels(data_dir, dataset_name, split='train'):
+    """Sorted label vocabulary of a split - read from the manifest if available"""
+    manifest = load_manifest(data_dir, dataset_name)
+    if manifest is not None and split in manifest['splits'] and manifest['splits'][split]['labels'] is not None:
+        return manifest['splits'][split]['labels']
+
+    df_dataset = load_split(data_dir, dataset_name, split, columns=['category'])
+    return sorted(df_dataset['category'].astype(str).unique().tolist())
@@ -2,7 +2,7 @@ import logging
 
 import click
 
-from src.data.make_dataset import load_line_json
+from src.data.make_dataset import iterate_line_json
 
 @click.command()
 @click.option('--file_paths', help='Path to file containing products', multiple=True)
@@ -11,10 +11,11 @@ def main(file_paths, output_path):
     hosts = set()
 
     for file_path in file_paths:
-        df_data = load_line_json(file_path)
-        new_hosts = df_data['URL'].values
-        for host in new_hosts:
-            hosts.add(extract_host(host))
+        # Stream products - only the hosts are kept in memory
+        for df_data in iterate_line_json(file_path):
+            new_hosts = df_data['URL'].values
+            for host in new_hosts:
+                hosts.add(extract_host(host))
 
     with open(output_path, 'w') as out_file:
         for host in hosts:
@@ -1,63 +1,121 @@
 import logging
 from os import listdir
+from pathlib import Path
+
 import click
 import pandas as pd
 from tqdm import tqdm
 
+from src.data.webdatacommons import product_store
+from src.data.webdatacommons.streaming_aggregation import BloomFilter, HostReservoirSampler, TitleSet, hash_titles
+
+# Columns needed for deduplication and host based sampling
+REQUIRED_COLUMNS = ['Title', 'Category', 'Breadcrumb', 'BreadcrumbList', 'Description', 'Host']
+
+
 @click.command()
-@click.option('--file_dir', help='Path to dir containing files with products')
+@click.option('--file_dir', help='Path to dir containing extracted products')
 @click.option('--output_file', help='Path to output_dir')
 @click.option('--no_products', help='Number of products per host', type=int)
-def main(file_dir, output_file, no_products):
+@click.option('--columns', help='Comma separated columns to aggregate - defaults to all columns')
+@click.option('--host_path', help='Path to file containing hosts - only products of these hosts are aggregated')
+@click.option('--streaming', help='Aggregate in a single pass with memory proportional to the output', is_flag=True)
+@click.option('--bloom_capacity', help='Deduplicate titles of the streaming aggregation with a Bloom filter '
+                                       'for the given number of titles instead of a set of title hashes', type=int)
+@click.option('--bloom_path', help='Path to memory-map the Bloom filter on disk')
+def main(file_dir, output_file, no_products, columns, host_path, streaming, bloom_capacity, bloom_path):
     logger = logging.getLogger(__name__)
 
     logger.info('Start to aggregate products')
 
-    list_dataframes = []
-
-    for file in tqdm(listdir(file_dir)):
-        if '.txt' in file:
-            file_path = '{}/{}'.format(file_dir, file)
-            try:
-                df_new_products = pd.read_csv(filepath_or_buffer=file_path, sep=';', error_bad_lines=False)
-                df_new_products = drop_duplicates(df_new_products)
-                df_new_products = remove_hosts_based_on_count(df_new_products, no_products, True)
-                # Take only the first 1000 products per file
-                df_new_products = df_new_products.head(2000)
-
+    # Column projection - read only the requested columns plus the columns needed for aggregation
+    if columns is not None:
+        columns = list(dict.fromkeys(REQUIRED_COLUMNS + columns.split(',')))
 
-                list_dataframes.append(df_new_products)
+    # Predicate pushdown - skip partitions & row groups of other hosts
+    hosts = load_hosts(host_path) if host_path is not None else None
 
-            except pd.errors.EmptyDataError:
-                logger.info('File {} is empty!'.format(file_path))
+    product_files = iterate_product_files(file_dir, columns, hosts, no_products)
+    if streaming:
+        if bloom_capacity is not None:
+            title_filter = BloomFilter(bloom_capacity, path=bloom_path)
+        else:
+            title_filter = TitleSet()
+        df_products = aggregate_streaming(product_files, no_products, title_filter)
+    else:
+        logger.info('Concat dataframes!')
+        df_products = pd.concat(list(product_files), ignore_index=True)
+        df_products = drop_duplicates(df_products)
+        df_products = remove_hosts_based_on_count(df_products, no_products)
 
-    logger.info('Concat dataframes!')
-    df_products = pd.concat(list_dataframes, ignore_index=True)
-    df_products = drop_duplicates(df_products)
-    df_products = remove_hosts_based_on_count(df_products, no_products, False)
     df_products.to_csv(output_file, sep=';', index=False)
     logger.info('Aggregated results written to {}!'.format(output_file))
     logger.info('Aggregated dataset contains {} products!'.format(len(df_products)))
 
+
+def iterate_product_files(file_dir, columns, hosts, no_products):
+    """Yield deduplicated & host capped products per extracted file"""
+    logger = logging.getLogger(__name__)
+
+    for file in tqdm(listdir(file_dir)):
+        file_path = Path(file_dir).joinpath(file)
+        if file_path.is_dir():
+            if Path('{}.checkpoint'.format(file_path)).is_file():
+                logger.info('Skip {} - extraction is not finished yet!'.format(file_path))
+                continue
+
+            df_new_products = product_store.read_products(file_path, columns=columns, hosts=hosts)
+            if len(df_new_products) == 0:
+                logger.info('File {} is empty!'.format(file_path))
+                continue
+
+            df_new_products = drop_duplicates(df_new_products)
+            df_new_products = remove_hosts_based_on_count(df_new_products, no_products)
+            # Take only the first 1000 products per file
+            df_new_products = df_new_products.head(2000)
+
+            yield df_new_products
+
+
+def aggregate_streaming(product_files, no_products, title_filter):
+    """Deduplicate titles across files & sample at most no_products products per host in a single pass
+
+        The first occurrence of a title is kept. Only the sampled products are held in memory
+        besides the title filter."""
+    sampler = HostReservoirSampler(no_products)
+    columns = None
+
+    for df_new_products in product_files:
+        columns = list(df_new_products.columns)
+        df_new_products = df_new_products[title_filter.add_new(hash_titles(df_new_products['Title']))]
+
+        for host, product in zip(df_new_products['Host'].values, df_new_products.itertuples(index=False)):
+            sampler.add(host, product)
+
+    return pd.DataFrame(list(sampler.products()), columns=columns)
+
+
+def load_hosts(host_path):
+    with open(host_path, 'r') as host_file:
+        return [line.strip() for line in host_file if len(line.strip()) > 0]
+
+
 def drop_duplicates(df):
     df.sort_values(by=['Category', 'Breadcrumb', 'BreadcrumbList', 'Description'], inplace=True)
     df.drop_duplicates(subset=['Title'], inplace=True)
 
     return df
 
-def remove_hosts_based_on_count(df, count, disable_progress_bar):
-    # Remove hosts based on count
-    host_counts = df['Host'].value_counts()
 
-    for host, counts in tqdm(host_counts[host_counts > count].items(), disable=disable_progress_bar):
-        # Shuffle and choose rows to be dropped
-        df_products_to_be_dropped = df[df['Host'] == host].sample(frac=1)[count:]
-        df.drop(df_products_to_be_dropped.index, inplace=True)
+def remove_hosts_based_on_count(df, count):
+    """Keep a random subset of at most count products per host"""
+    # Shuffle once and rank the products of each host - products without host are kept
+    rank = df.sample(frac=1).groupby('Host').cumcount().reindex(df.index)
+    return df[(rank < count) | df['Host'].isnull()]
 
-    return df
 
 if __name__ == '__main__':
     log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     logging.basicConfig(level=logging.INFO, format=log_fmt)
 
-    main()
\ No newline at end of file
+    main()
@@ -2,6 +2,8 @@ from pathlib import Path
 
 import pandas as pd
 
+from src.data import split_storage
+
 def load_datasets(dataset_name):
     """Load dataset for the given experiments"""
     project_dir = Path(__file__).resolve().parents[3]
@@ -9,9 +11,7 @@ def load_datasets(dataset_name):
     dataset = {}
 
     for split in splits:
-        relative_path = 'data/processed/{}/split/raw/{}_data_{}.pkl'.format(dataset_name, split, dataset_name)
-        file_path = project_dir.joinpath(relative_path)
-        dataset[split] = pd.read_pickle(file_path)
+        dataset[split] = split_storage.load_split(project_dir, dataset_name, split, columns=['title'])
 
     return dataset
 
@@ -0,0 +1,87 @@
+import csv
+import gzip
+import logging
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import click
+
+from src.data.webdatacommons.nquads import HostMatcher, iterate_quads
+
+
+@click.command()
+@click.option('--products', help='Number of synthetic products', type=int, default=100000)
+@click.option('--hosts', help='Number of searched hosts', type=int, default=10000)
+def main(products, hosts):
+    """Compare per-line csv parsing plus linear host scan with the streaming quad parser plus host set"""
+    logger = logging.getLogger(__name__)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = Path(tmp_dir).joinpath('synthetic.nq.gz')
+        searched_hosts = generate_nquads(file_path, products, hosts)
+        logger.info('Generated {} products of {} hosts!'.format(products, 2 * hosts))
+
+        start = time.time()
+        csv_matches = scan_csv(file_path, searched_hosts)
+        csv_time = time.time() - start
+        logger.info('csv.reader & host list: {:.2f}s - {} matching quads'.format(csv_time, csv_matches))
+
+        start = time.time()
+        stream_matches = scan_stream(file_path, searched_hosts)
+        stream_time = time.time() - start
+        logger.info('Quad stream & host set: {:.2f}s - {} matching quads'.format(stream_time, stream_matches))
+
+        logger.info('Speedup: {:.1f}x'.format(csv_time / stream_time))
+
+
+def generate_nquads(file_path, products, hosts):
+    random.seed(42)
+    all_hosts = ['shop{}.example{}.com'.format(i, i % 97) for i in range(2 * hosts)]
+    predicates = [('<http://schema.org/Product/name>', '"Running Shoe {} - Size {}"@en'),
+                  ('<http://schema.org/Product/description>', '"Light shoe no. {} for trail runs in size {}"@en'),
+                  ('<http://schema.org/Product/category>', '"Sports > Shoes > Trail {} {}"@en'),
+                  ('<http://schema.org/Product/offers>', '_:node{}x{}')]
+
+    with gzip.open(file_path, 'wt', encoding='utf-8') as f:
+        for i in range(products):
+            graph = '<https://www.{}/product/{}.html>'.format(random.choice(all_hosts), i)
+            for predicate, value in predicates:
+                f.write('_:node{} {} {} {} .\n'.format(i, predicate, value.format(i, i % 50), graph))
+
+    return all_hosts[::2]
+
+
+def scan_csv(file_path, hosts):
+    matches = 0
+    with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            for r in csv.reader([line], delimiter=' ', quotechar='"'):
+                if len(r) > 4:
+                    for host in hosts:
+                        if host in r[3]:
+                            matches += 1
+                            break
+    return matches
+
+
+def scan_stream(file_path, hosts):
+    host_matcher = HostMatcher(hosts)
+    matches = 0
+    uri = None
+    searched_host = False
+    for subject, predicate, obj, graph in iterate_quads(file_path):
+        if graph != uri:
+            searched_host = graph in host_matcher
+        uri = graph
+        if searched_host:
+            matches += 1
+    return matches
+
+
+if __name__ == '__main__':
+    log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
@@ -0,0 +1,49 @@
+import logging
+import time
+
+import click
+import numpy as np
+import pandas as pd
+
+from src.data.webdatacommons.reduce_products_for_LM import sample_products_per_host
+
+
+@click.command()
+@click.option('--rows', help='Number of synthetic products', type=int, default=10000000)
+@click.option('--hosts', help='Number of hosts', type=int, default=100000)
+@click.option('--searched_hosts', help='Number of searched hosts', type=int, default=10000)
+@click.option('--baseline_hosts', help='Number of searched hosts for the per-host str.contains baseline', type=int,
+              default=20)
+@click.option('--num_products_per_host', help='Number of extracted products per host', type=int, default=20)
+def main(rows, hosts, searched_hosts, baseline_hosts, num_products_per_host):
+    """Compare per-host str.contains scans with the groupby based sampler on a synthetic product table"""
+    logger = logging.getLogger(__name__)
+
+    random_state = np.random.RandomState(42)
+    all_hosts = np.array(['shop{}.example{}.com'.format(i, i % 101) for i in range(hosts)], dtype=object)
+    df_products = pd.DataFrame({'title': np.arange(rows).astype(str),
+                                'host': all_hosts[random_state.randint(0, hosts, rows)]})
+    searched = list(all_hosts[random_state.choice(hosts, searched_hosts, replace=False)])
+    logger.info('Generated {} products of {} hosts!'.format(rows, hosts))
+
+    # Baseline scans the full table once per host - measure a few hosts and extrapolate
+    start = time.time()
+    for host in searched[:baseline_hosts]:
+        df_products[df_products['host'].str.contains(host)].sample(frac=1).head(num_products_per_host)
+    baseline_time = (time.time() - start) / baseline_hosts * searched_hosts
+    logger.info('str.contains per host: {:.1f}s (extrapolated from {} hosts)'.format(baseline_time, baseline_hosts))
+
+    for match_subdomains in [False, True]:
+        start = time.time()
+        df_reduced_products = sample_products_per_host(df_products, searched, num_products_per_host,
+                                                       match_subdomains)
+        elapsed_time = time.time() - start
+        logger.info('groupby sampler (match_subdomains={}): {:.1f}s - {} products - speedup {:.0f}x'
+                    .format(match_subdomains, elapsed_time, len(df_reduced_products), baseline_time / elapsed_time))
+
+
+if __name__ == '__main__':
+    log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
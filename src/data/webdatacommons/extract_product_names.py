@@ -1,8 +1,9 @@
-import csv
-import gzip
+import json
 import logging
-import copy
-from multiprocessing import Process, Semaphore, Value
+import os
+import queue
+import threading
+from multiprocessing import Pool
 import time
 from os import listdir
 from pathlib import Path
@@ -13,6 +14,8 @@ import click
 
 from src.data.preprocessing import preprocess
 from src.data.wdc_ziqi.extract_hosts import extract_host
+from src.data.webdatacommons import product_store
+from src.data.webdatacommons.nquads import HostMatcher, iterate_quads_with_offsets
 
 
 @click.command()
@@ -25,45 +28,105 @@ def main(file_dir, output_dir, host_path, worker):
     # Load searched hosts
     hosts = load_hosts(host_path)
 
-    sema = Semaphore(worker)
-    processed_products = Value('i', 0)
-    all_processes = []
-    counter = 1
+    tasks = collect_tasks(file_dir, output_dir)
+    total_bytes = sum([file_size for _, _, file_size in tasks])
+    logger.info('Scheduled {} files ({:.1f} GB) on {} workers!'.format(len(tasks), total_bytes / 1e9, worker))
 
+    processed_files = 0
+    processed_bytes = 0
+    processed_products = 0
+    start = time.time()
+
+    # Fixed pool of workers - the pool hands out files in the order of the queue, i.e. largest files first
+    with Pool(worker, initializer=initialize_worker, initargs=(hosts,)) as pool:
+        for input_file, file_size, products in pool.imap_unordered(run_task, tasks):
+            processed_files += 1
+            processed_bytes += file_size
+            processed_products += products
+            elapsed_time = time.time() - start
+
+            logger.info('Finished {} - {}/{} files, {} products, {:.1f} MB/s, {:.0f} products/s'
+                        .format(input_file, processed_files, len(tasks), processed_products,
+                                processed_bytes / 1e6 / elapsed_time, processed_products / elapsed_time))
+
+    logger.info('Processed {} products!'.format(processed_products))
+
+
+def collect_tasks(file_dir, output_dir):
+    """Collect input & output files that are not yet completely processed - largest files first"""
+    tasks = []
     for file in listdir(file_dir):
         if '.gz' in file:
             input_file = '{}/{}'.format(file_dir, file)
-            output_file = '{}/{}.txt'.format(output_dir, file.split('.')[-2])
+            output_file = '{}/{}'.format(output_dir, file.split('.')[-2])
+
+            # Outputs without checkpoint are complete - outputs with checkpoint are resumed
+            if not Path(output_file).exists() or Path(checkpoint_path(output_file)).is_file():
+                tasks.append((input_file, output_file, Path(input_file).stat().st_size))
+
+    return sorted(tasks, key=lambda task: task[2], reverse=True)
+
+
+# Hosts searched by the worker processes of the pool
+worker_hosts = None
+
+
+def initialize_worker(hosts):
+    global worker_hosts
+    worker_hosts = hosts
+
+
+def run_task(task):
+    input_file, output_file, file_size = task
+    products = extract_products(input_file, output_file, worker_hosts)
+
+    return input_file, file_size, products
+
+
+def checkpoint_path(output_path):
+    return '{}.checkpoint'.format(output_path)
+
+
+def load_checkpoint(output_path):
+    path = checkpoint_path(output_path)
+    if not Path(output_path).exists() or not Path(path).is_file():
+        return None
+
+    with open(path) as f:
+        return json.load(f)
 
-            # Check if output file does not exist!
-            if not Path(output_file).is_file():
-                sema.acquire()
-                process = Process(target=extract_products, args=(input_file, output_file, hosts, sema, processed_products,))
-                all_processes.append(process)
-                process.start()
-                logger.info('Started {} processes!'.format(counter))
 
-            # Join finished processes
-            for p in all_processes:
-                if p.exitcode != None:
-                    if p.exitcode == 0 or p.exitcode < 0:
-                        p.join()
-                        p.close()
-                        all_processes.remove(p)
-                        logger.info('Processed {} products!'.format(processed_products.value))
+def persist_checkpoint(output_path, offset, counter):
+    """Record the input offset from which to resume plus the number of products written so far"""
+    checkpoint = {'offset': offset, 'products': counter}
 
-            counter += 1
+    # Replace checkpoint atomically
+    path = checkpoint_path(output_path)
+    with open('{}.tmp'.format(path), 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace('{}.tmp'.format(path), path)
 
-    logger.info('Wait for all processes to finish!')
-    for p in all_processes:
-        p.join()
-        p.close()
-        all_processes.remove(p)
-        logger.info('Processed {} products!'.format(processed_products.value))
 
+def write_products(product_queue, output_path, errors):
+    """Single writer of an output file - persists batches of products and advances the checkpoint"""
+    while True:
+        batch = product_queue.get()
+        if batch is None:
+            break
+        if errors:
+            # Keep draining the queue after a failure so that the reader is never blocked
+            continue
 
+        products, part, offset, counter = batch
+        try:
+            remove_duplicates_and_write_to_disk(products, output_path, part)
+            if offset is not None:
+                persist_checkpoint(output_path, offset, counter)
+        except Exception as e:
+            errors.append(e)
 
-def extract_products(file_path, output_path, hosts, sema, processed_products):
+
+def extract_products(file_path, output_path, hosts, queue_size=2):
     logging.basicConfig(level=logging.INFO)
     logger = logging.getLogger(__name__)
 
@@ -76,133 +139,151 @@ def extract_products(file_path, output_path, hosts, sema, processed_products):
     product = {'Title': '', 'Description': '', 'Category': '', 'Breadcrumb': '',
                'BreadcrumbList': '', 'Breadcrumb-Predicate': '', 'URL': '', 'Host': ''}
     uri = None
-    p = None  # Process for Multithreading
-
-    # Initialize output file
-    with open(output_path, 'w') as out_f:
-        line = 'Title;Description;Category;Breadcrumb;BreadcrumbList;Breadcrumb-Predicate;URL;Host\n'
-        out_f.write(line)
-
-    logger.info('Initialize output file {}!'.format(output_path))
-
-    with gzip.open(file_path, 'rt', encoding='utf-8') as f:
-
-        for i, line in enumerate(f):
-            reader = csv.reader([line], delimiter=' ', quotechar='"')
-            try:
-                for r in reader:
-                    if len(r) > 4:
-
-                        if not (uri is None) and r[3] != uri and '.' in uri:
-
-                            if len(product['Title']) > 0 and (len(product['Category']) > 0 or
-                                                              len(product['Breadcrumb']) > 0 or
-                                                              len(product['Description']) > 0 or  # Relax constraints
-                                                              len(product['BreadcrumbList']) > 0):
-
-                                collected_products.append(copy.deepcopy(product))
-                                # Initialize product dict
-                                product = {key: '' for key in product}
-                                counter += 1
-
-                                if counter % 10000 == 0:
-                                    p = parallel_write(p, collected_products, output_path)
-                                    collected_products = []
-                                    logger.info('Written {} product names to disc.'.format(counter))
-
-                                    for value in categories:
-                                        logger.info('Category value: {}'.format(value))
-
-                                    for value in breadcrumbs:
-                                        logger.info('Breadcrumbs value: {}'.format(value))
-
-                                    for value in breadcrumbLists:
-                                        logger.info('Breadcrumblists value: {}'.format(value))
-
-                        #Update URI
-                        uri = r[3]
-
-                        # Check if we look for the given host
-                        searched_host = True
-                        if hosts is not None:
-                            searched_host = False
-                            for host in hosts:
-                                if host in r[3]:
-                                    searched_host = True
-                                    break
-
-                        if searched_host:
-                            product['URL'] = r[3]
-                            if r[1] == '<http://schema.org/Product/name>' and '@en' in r[2]:
-                                prep_value = preprocess_value(r[2])
-                                if len(prep_value) > 0 and prep_value != 'null':
-                                    product['Title'] = prep_value
-
-                            elif r[1] == '<http://schema.org/Product/description>':
-                                prep_value = preprocess_value(r[2])
-                                exclude_values = ['description', 'a href', 'various', 'share', '0', 'more']
-                                if len(prep_value) > 0 and prep_value != 'null' and prep_value not in exclude_values:
-                                    product['Description'] = prep_value
-
-                            # elif 'breadcrumblist' in r[2].lower():
-                            #    node = r[0]
-                            #    node_relevant = True
-                            # logger.info(r)
-
-                            elif 'category' in r[1].lower():
-                                prep_value = preprocess_value(r[2])
-                                if len(prep_value) > 0 and prep_value != 'null' and prep_value != 'more section not available':
-                                    if prep_value not in product['Category']:
-                                        product['Category'] = '{} {}'.format(product['Category'], prep_value).lstrip()
-                                        categories.add(r[1])
-
-                            elif r[1] == '<http://schema.org/Product/breadcrumb>':
-                                if '_:node' in r[2]:
-                                    pass
-                                    # logger.info(r)
-                                else:
-                                    prep_value = preprocess_value(r[2])
-                                    prep_value = re.sub(r"^home", '', prep_value).strip()
-                                    if len(prep_value) > 0 and prep_value != 'null':
-                                        if prep_value not in product['Breadcrumb']:
-                                            product['Breadcrumb'] = '{} {}'.format(product['Breadcrumb'],
-                                                                                   prep_value).lstrip()
-                                            product['Breadcrumb-Predicate'] = '{} {}'.format(
-                                                product['Breadcrumb-Predicate'],
-                                                r[1]).lstrip()
-                                            breadcrumbs.add(r[1])
-
-                            elif 'breadcrumblist' in r[1].lower():
-                                if '_:node' in r[2]:
-                                    node = r[2]
-                                    node_relevant = True
-                                # logger.info(r)
-                                else:
-                                    prep_value = preprocess_value(r[2])
-                                    prep_value = re.sub(r"^home", '', prep_value).strip()
-                                    if len(prep_value) > 0 and prep_value != 'null':
-                                        product['BreadcrumbList'] = '{} {}'.format(product['BreadcrumbList'],
-                                                                                   prep_value).lstrip()
-                                        breadcrumbLists.add(r[1])
-
-                            elif 'breadcrumb' in r[1].lower():
-                                if r[1] != '<http://schema.org/Breadcrumb/url>' and r[1] != '<http://schema.org/Breadcrumb/child>':
-                                    prep_value = preprocess_value(r[2])
-                                    prep_value = re.sub(r"^home", '', prep_value)
-                                    if len(prep_value) > 0 and prep_value != 'null':
-                                        if prep_value not in product['Breadcrumb']:
-                                            product['Breadcrumb'] = '{} {}'.format(product['Breadcrumb'],
-                                                                                   prep_value).lstrip()
-                                            product['Breadcrumb-Predicate'] = '{} {}'.format(
-                                                product['Breadcrumb-Predicate'], r[1]).lstrip()
-                                            breadcrumbs.add(r[1])
-
-            except csv.Error as e:
-                logger.error(e)
-
-    p = parallel_write(p, collected_products, output_path)
+
+    checkpoint = load_checkpoint(output_path)
+    if checkpoint is None:
+        # Initialize output directory
+        Path(output_path).mkdir(parents=True, exist_ok=True)
+        persist_checkpoint(output_path, 0, 0)
+        offset = 0
+
+        logger.info('Initialize output directory {}!'.format(output_path))
+    else:
+        offset = checkpoint['offset']
+        counter = checkpoint['products']
+        # Drop output written after the last checkpoint - one part is written per 10000 products
+        product_store.remove_parts(output_path, counter // 10000)
+
+        logger.info('Resume {} at offset {} after {} products!'.format(file_path, offset, counter))
+
+    # Batches of products are handed over to a single writer - the bounded queue limits memory usage
+    product_queue = queue.Queue(maxsize=queue_size)
+    writer_errors = []
+    writer = threading.Thread(target=write_products, args=(product_queue, output_path, writer_errors))
+    writer.start()
+    start = time.time()
+    initial_counter = counter
+
+    if hosts is not None:
+        hosts = HostMatcher(hosts)
+    searched_host = hosts is None
+
+    for line_offset, (subject, predicate, obj, graph) in iterate_quads_with_offsets(file_path, offset):
+
+        if not (uri is None) and graph != uri and '.' in uri:
+
+            if len(product['Title']) > 0 and (len(product['Category']) > 0 or
+                                              len(product['Breadcrumb']) > 0 or
+                                              len(product['Description']) > 0 or  # Relax constraints
+                                              len(product['BreadcrumbList']) > 0):
+
+                collected_products.append(product)
+                # Initialize product dict - the collected dict is handed over as it is, no copy needed
+                product = dict.fromkeys(product, '')
+                counter += 1
+
+                if counter % 10000 == 0:
+                    if writer_errors:
+                        product_queue.put(None)
+                        raise writer_errors[0]
+
+                    # The current line starts a new product - resume from here
+                    product_queue.put((collected_products, counter // 10000 - 1, line_offset, counter))
+                    collected_products = []
+                    logger.info('Collected {} product names - {:.0f} products/s.'
+                                .format(counter, (counter - initial_counter) / (time.time() - start)))
+
+                    for value in categories:
+                        logger.info('Category value: {}'.format(value))
+
+                    for value in breadcrumbs:
+                        logger.info('Breadcrumbs value: {}'.format(value))
+
+                    for value in breadcrumbLists:
+                        logger.info('Breadcrumblists value: {}'.format(value))
+
+        # Check if we look for the given host - only necessary if the URI changes
+        if hosts is not None and graph != uri:
+            searched_host = graph in hosts
+
+        #Update URI
+        uri = graph
+
+        if searched_host:
+            product['URL'] = graph
+            if predicate == '<http://schema.org/Product/name>' and '@en' in obj:
+                prep_value = preprocess_value(obj)
+                if len(prep_value) > 0 and prep_value != 'null':
+                    product['Title'] = prep_value
+
+            elif predicate == '<http://schema.org/Product/description>':
+                prep_value = preprocess_value(obj)
+                exclude_values = ['description', 'a href', 'various', 'share', '0', 'more']
+                if len(prep_value) > 0 and prep_value != 'null' and prep_value not in exclude_values:
+                    product['Description'] = prep_value
+
+            # elif 'breadcrumblist' in r[2].lower():
+            #    node = r[0]
+            #    node_relevant = True
+            # logger.info(r)
+
+            elif 'category' in predicate.lower():
+                prep_value = preprocess_value(obj)
+                if len(prep_value) > 0 and prep_value != 'null' and prep_value != 'more section not available':
+                    if prep_value not in product['Category']:
+                        product['Category'] = '{} {}'.format(product['Category'], prep_value).lstrip()
+                        categories.add(predicate)
+
+            elif predicate == '<http://schema.org/Product/breadcrumb>':
+                if '_:node' in obj:
+                    pass
+                    # logger.info(r)
+                else:
+                    prep_value = preprocess_value(obj)
+                    prep_value = re.sub(r"^home", '', prep_value).strip()
+                    if len(prep_value) > 0 and prep_value != 'null':
+                        if prep_value not in product['Breadcrumb']:
+                            product['Breadcrumb'] = '{} {}'.format(product['Breadcrumb'],
+                                                                   prep_value).lstrip()
+                            product['Breadcrumb-Predicate'] = '{} {}'.format(
+                                product['Breadcrumb-Predicate'],
+                                predicate).lstrip()
+                            breadcrumbs.add(predicate)
+
+            elif 'breadcrumblist' in predicate.lower():
+                if '_:node' in obj:
+                    node = obj
+                    node_relevant = True
+                # logger.info(r)
+                else:
+                    prep_value = preprocess_value(obj)
+                    prep_value = re.sub(r"^home", '', prep_value).strip()
+                    if len(prep_value) > 0 and prep_value != 'null':
+                        product['BreadcrumbList'] = '{} {}'.format(product['BreadcrumbList'],
+                                                                   prep_value).lstrip()
+                        breadcrumbLists.add(predicate)
+
+            elif 'breadcrumb' in predicate.lower():
+                if predicate != '<http://schema.org/Breadcrumb/url>' and predicate != '<http://schema.org/Breadcrumb/child>':
+                    prep_value = preprocess_value(obj)
+                    prep_value = re.sub(r"^home", '', prep_value)
+                    if len(prep_value) > 0 and prep_value != 'null':
+                        if prep_value not in product['Breadcrumb']:
+                            product['Breadcrumb'] = '{} {}'.format(product['Breadcrumb'],
+                                                                   prep_value).lstrip()
+                            product['Breadcrumb-Predicate'] = '{} {}'.format(
+                                product['Breadcrumb-Predicate'], predicate).lstrip()
+                            breadcrumbs.add(predicate)
+
+    product_queue.put((collected_products, counter // 10000, None, counter))
+    product_queue.put(None)
+    writer.join()
+    if writer_errors:
+        raise writer_errors[0]
+
+    # Output is complete
+    os.remove(checkpoint_path(output_path))
     logger.info('Written offers to disc.')
-    p.join()
 
     for value in categories:
         logger.info('Category value: {}'.format(value))
@@ -213,10 +294,7 @@ def extract_products(file_path, output_path, hosts, sema, processed_products):
     for value in breadcrumbLists:
         logger.info('Breadcrumblists value: {}'.format(value))
 
-    # Share info about processed products -1: Don't count header row
-    processed_products.value = processed_products.value + counter
-    # Release Sema so that new processes can start!
-    sema.release()
+    return counter
 
 
 
@@ -241,19 +319,7 @@ def load_hosts(host_path):
         return hosts
 
 
-def parallel_write(p, products, path):
-    logger = logging.getLogger(__name__)
-    if p is not None:
-        start = time.time()
-        p.join()
-        end = time.time()
-        elapsed_time = end - start
-        logger.info('Waited for {}'.format(elapsed_time))
-    p = Process(target=remove_duplicates_and_write_to_disk, args=(copy.deepcopy(products), path))
-    p.start()
-    return p
-
-def remove_duplicates_and_write_to_disk(products, path):
+def remove_duplicates_and_write_to_disk(products, path, part):
     # Convert to pandas df
     logger = logging.getLogger(__name__)
     dict_products = {'Title': [], 'Category': [], 'Breadcrumb': [], 'BreadcrumbList':[], 'Breadcrumb-Predicate': [],
@@ -281,7 +347,7 @@ def remove_duplicates_and_write_to_disk(products, path):
         df_products_to_be_dropped = df_products[df_products['Host'] == host].sample(frac=1)[10:]
         df_products.drop(df_products_to_be_dropped.index, inplace=True)
 
-    df_products.to_csv(path, sep=';', index=False, mode='a', header=False)
+    product_store.write_product_partitions(df_products, path, part)
 
     logger.info('Written {} offers to {}!'.format(len(df_products), path))
 
@@ -0,0 +1,83 @@
+import gzip
+import io
+
+from src.data.wdc_ziqi.extract_hosts import extract_host
+
+
+def parse_quad(line):
+    """Split an N-Quads line into subject, predicate, object and graph - returns None for malformed lines
+
+        Literal objects are returned without surrounding quotes, but with language tag or datatype
+        (e.g. 'Red Shoe@en'), escape sequences are kept as they are."""
+    parts = line.rstrip().split(' ', 2)
+    if len(parts) < 3:
+        return None
+    subject, predicate, rest = parts
+
+    # IRIs of the graph never contain whitespace - parse from the right to support whitespace in literals
+    parts = rest.rsplit(' ', 2)
+    if len(parts) < 3 or parts[2] != '.' or not parts[1].startswith('<'):
+        return None
+    obj, graph = parts[0], parts[1]
+
+    if obj.startswith('"'):
+        end = obj.rfind('"')
+        if end == 0:
+            return None
+        obj = obj[1:end] + obj[end + 1:]
+
+    return subject, predicate, obj, graph
+
+
+def iterate_quads(file_path, buffer_size=1 << 20):
+    """Stream quads from a gzipped N-Quads file"""
+    with gzip.open(file_path, 'rb') as gzip_file:
+        reader = io.TextIOWrapper(io.BufferedReader(gzip_file, buffer_size=buffer_size), encoding='utf-8')
+        for line in reader:
+            quad = parse_quad(line)
+            if quad is not None:
+                yield quad
+
+
+def iterate_quads_with_offsets(file_path, offset=0, buffer_size=1 << 20):
+    """Stream quads plus the uncompressed byte offset of their line from a gzipped N-Quads file
+
+        Streaming starts at the given uncompressed byte offset, which has to point to the start of a line."""
+    with gzip.open(file_path, 'rb') as gzip_file:
+        if offset > 0:
+            # Gzip streams are not seekable - seeking decompresses and discards the data up to the offset
+            gzip_file.seek(offset)
+        reader = io.BufferedReader(gzip_file, buffer_size=buffer_size)
+        for line in reader:
+            line_offset = offset
+            offset += len(line)
+            quad = parse_quad(line.decode('utf-8', errors='replace'))
+            if quad is not None:
+                yield line_offset, quad
+
+
+class HostMatcher:
+    """Match URLs against a set of hosts - subdomains of a searched host match as well"""
+
+    def __init__(self, hosts):
+        self.hosts = set([host.lower() for host in hosts])
+
+    @staticmethod
+    def normalize_host(url):
+        """Host of a graph IRI without closing bracket, fragment & port - lowercased like the searched hosts"""
+        host = extract_host(url)
+        for separator in ['>', '#', ':']:
+            host = host.split(separator)[0]
+
+        return host.lower()
+
+    def __contains__(self, url):
+        host = self.normalize_host(url)
+        while True:
+            if host in self.hosts:
+                return True
+            # Continue with parent domain
+            position = host.find('.')
+            if position < 0:
+                return False
+            host = host[position + 1:]
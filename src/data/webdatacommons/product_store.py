@@ -0,0 +1,68 @@
+import zlib
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Columns of extracted products - Host and Category are highly repetitive and therefore dictionary encoded
+PRODUCT_COLUMNS = ['Title', 'Category', 'Breadcrumb', 'BreadcrumbList', 'Breadcrumb-Predicate', 'Description', 'URL',
+                   'Host']
+DICTIONARY_COLUMNS = ['Host', 'Category']
+PRODUCT_SCHEMA = pa.schema([(column, pa.string()) for column in PRODUCT_COLUMNS])
+
+NUMBER_OF_HOST_BUCKETS = 64
+
+
+def host_bucket(host):
+    """Stable partition of a host - independent of the Python hash seed"""
+    return zlib.crc32(host.encode('utf-8')) % NUMBER_OF_HOST_BUCKETS
+
+
+def part_file_name(part):
+    return 'part-{:06d}.parquet'.format(part)
+
+
+def write_product_partitions(df_products, output_path, part):
+    """Write products as zstd compressed Parquet files partitioned by host bucket (hive layout)
+
+        Each batch of products is written as part file `part` into its partitions. Rewriting a part
+        (e.g. after resuming an extraction) overwrites the previously written files."""
+    buckets = df_products['Host'].map(host_bucket)
+    for bucket, df_bucket in df_products.groupby(buckets):
+        partition_path = Path(output_path).joinpath('host_bucket={}'.format(bucket))
+        partition_path.mkdir(parents=True, exist_ok=True)
+
+        # Store empty values as nulls - as read_csv did for the former csv output
+        df_bucket = df_bucket[PRODUCT_COLUMNS]
+        df_bucket = df_bucket.mask(df_bucket == '')
+        table = pa.Table.from_pandas(df_bucket, schema=PRODUCT_SCHEMA, preserve_index=False)
+        pq.write_table(table, str(partition_path.joinpath(part_file_name(part))), compression='zstd',
+                       use_dictionary=DICTIONARY_COLUMNS)
+
+
+def remove_parts(output_path, first_part):
+    """Remove part files starting from part number first_part"""
+    for path in Path(output_path).glob('host_bucket=*/part-*.parquet'):
+        if int(path.stem.split('-')[1]) >= first_part:
+            path.unlink()
+
+
+def read_products(path, columns=None, hosts=None):
+    """Read products from a partitioned product directory
+
+        Only the requested columns are read. If hosts are provided, partitions of other host buckets are skipped
+        and the host filter is pushed down to the Parquet reader."""
+    if columns is None:
+        columns = PRODUCT_COLUMNS
+
+    filters = None
+    if hosts is not None:
+        hosts = list(hosts)
+        filters = [('host_bucket', 'in', sorted({host_bucket(host) for host in hosts})), ('Host', 'in', hosts)]
+
+    if not any(Path(path).glob('host_bucket=*/part-*.parquet')):
+        return pd.DataFrame(columns=columns)
+
+    table = pq.read_table(str(path), columns=columns, filters=filters)
+    return table.to_pandas()
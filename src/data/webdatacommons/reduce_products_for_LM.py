@@ -1,8 +1,10 @@
 import logging
 
+import numpy as np
 import pandas as pd
 import click
-from tqdm import tqdm
+
+from src.data.wdc_ziqi.extract_hosts import extract_host
 
 
 @click.command()
@@ -10,26 +12,78 @@ from tqdm import tqdm
 @click.option('--host_path', help='Input file')
 @click.option('--output_file', help='Output file')
 @click.option('--num_products_per_host', help='Number of extracted products per host', type=int)
-def main(file, host_path, output_file, num_products_per_host):
+@click.option('--match_subdomains', help='Assign products of subdomains to the searched host', is_flag=True)
+def main(file, host_path, output_file, num_products_per_host, match_subdomains):
     logger = logging.getLogger(__name__)
 
-    list_products = []
     df_products = pd.read_csv(file, sep=';')
     logger.info('{} Products loaded!'.format(len(df_products)))
     hosts = load_hosts(host_path)
 
-    for host in tqdm(hosts):
-        df_sub_products = df_products[df_products['host'].str.contains(host)].sample(frac=1)
-        df_sub_products = df_sub_products.head(num_products_per_host)
-        list_products.append(df_sub_products)
-
-    df_reduced_products = pd.concat(list_products)
+    df_reduced_products = sample_products_per_host(df_products, hosts, num_products_per_host, match_subdomains)
     df_reduced_products.to_csv(output_file, sep=';', index=False)
     logger.info('Results written to {}!'.format(output_file))
 
     logger.info('Added products {}!'.format(len(df_reduced_products)))
     logger.info('Average number of added products {}!'.format(len(df_reduced_products)/ len(hosts)))
 
+
+class HostSuffixTrie:
+    """Trie over the reversed domain labels of hosts - finds the most specific searched host of a subdomain"""
+
+    def __init__(self, hosts):
+        self.root = {}
+        for host in hosts:
+            node = self.root
+            for label in reversed(host.split('.')):
+                node = node.setdefault(label, {})
+            # Terminal marker - None is never a label, labels of malformed hosts may be empty strings
+            node[None] = host
+
+    def lookup(self, host):
+        node = self.root
+        match = None
+        for label in reversed(host.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            match = node.get(None, match)
+        return match
+
+
+def assign_hosts(product_hosts, hosts, match_subdomains=False):
+    """Map the host values of products to the searched hosts - products of other hosts are mapped to None"""
+    # Resolve every distinct host only once
+    codes, unique_hosts = pd.factorize(product_hosts)
+    unique_hosts = [extract_host(host) if isinstance(host, str) else '' for host in unique_hosts]
+
+    if match_subdomains:
+        trie = HostSuffixTrie(hosts)
+        resolved_hosts = [trie.lookup(host) for host in unique_hosts]
+    else:
+        searched_hosts = set(hosts)
+        resolved_hosts = [host if host in searched_hosts else None for host in unique_hosts]
+
+    # Code -1 (missing host) picks the appended None
+    resolved_hosts = np.array(resolved_hosts + [None], dtype=object)
+    return resolved_hosts[codes]
+
+
+def sample_products_per_host(df_products, hosts, num_products_per_host, match_subdomains=False, seed=None):
+    """Sample up to num_products_per_host random products of each searched host in a single pass"""
+    assigned_hosts = pd.Series(assign_hosts(df_products['host'].values, hosts, match_subdomains),
+                               index=df_products.index)
+    # Keep the order of the searched hosts for the output
+    host_order = assigned_hosts.map({host: position for position, host in enumerate(dict.fromkeys(hosts))})
+
+    matched = host_order.notnull().values
+    df_matched = df_products[matched].assign(host_order=host_order[matched])
+    df_matched = df_matched.sample(frac=1, random_state=seed)
+    df_matched = df_matched.groupby('host_order', sort=False).head(num_products_per_host)
+
+    return df_matched.sort_values('host_order', kind='stable').drop(columns='host_order')
+
+
 def load_hosts(host_path):
     logger = logging.getLogger(__name__)
     hosts = []
@@ -0,0 +1,90 @@
+import math
+import random
+
+import numpy as np
+import pandas as pd
+
+
+def hash_titles(titles):
+    """64 bit hashes of titles"""
+    return pd.util.hash_pandas_object(pd.Series(titles), index=False).values
+
+
+class TitleSet:
+    """Exact set of title hashes"""
+
+    def __init__(self):
+        self.hashes = set()
+
+    def add_new(self, hashes):
+        """Add hashes and return a mask of the hashes that have not been seen before"""
+        new = np.zeros(len(hashes), dtype=bool)
+        for i, value in enumerate(hashes.tolist()):
+            if value not in self.hashes:
+                self.hashes.add(value)
+                new[i] = True
+        return new
+
+
+class BloomFilter:
+    """Bloom filter of title hashes with fixed memory - optionally memory-mapped to disk for crawl scale data
+
+        Duplicates are always detected, new titles are dropped as false positives with probability error_rate."""
+
+    def __init__(self, capacity, error_rate=0.001, path=None):
+        self.number_of_bits = int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.number_of_hashes = max(1, int(round(self.number_of_bits / capacity * math.log(2))))
+
+        number_of_bytes = (self.number_of_bits + 7) // 8
+        if path is None:
+            self.bits = np.zeros(number_of_bytes, dtype=np.uint8)
+        else:
+            self.bits = np.memmap(path, dtype=np.uint8, mode='w+', shape=(number_of_bytes,))
+
+    def positions(self, hashes):
+        # Double hashing - derive all bit positions from the two halves of the 64 bit hash
+        hashes = hashes.astype(np.uint64)
+        h1 = hashes & np.uint64(0xffffffff)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        i = np.arange(self.number_of_hashes, dtype=np.uint64)
+        return (h1[:, None] + i[None, :] * h2[:, None]) % np.uint64(self.number_of_bits)
+
+    def add_new(self, hashes):
+        """Add hashes and return a mask of the hashes that have (probably) not been seen before"""
+        positions = self.positions(hashes)
+        bytes_, masks = positions // np.uint64(8), (1 << (positions % np.uint64(8))).astype(np.uint8)
+
+        new = ((self.bits[bytes_] & masks) == 0).any(axis=1)
+        # Duplicates within the batch - keep only the first occurrence
+        new &= ~pd.Series(hashes).duplicated().values
+
+        np.bitwise_or.at(self.bits, bytes_[new].ravel(), masks[new].ravel())
+        return new
+
+
+class HostReservoirSampler:
+    """Keep a uniform random sample of at most capacity products per host (reservoir sampling)"""
+
+    def __init__(self, capacity, seed=None):
+        self.capacity = capacity
+        self.random = random.Random(seed)
+        self.reservoirs = {}
+        self.counts = {}
+
+    def add(self, host, product):
+        count = self.counts.get(host, 0) + 1
+        self.counts[host] = count
+
+        if count <= self.capacity:
+            self.reservoirs.setdefault(host, []).append(product)
+        else:
+            position = self.random.randrange(count)
+            if position < self.capacity:
+                self.reservoirs[host][position] = product
+
+    def __len__(self):
+        return sum([len(reservoir) for reservoir in self.reservoirs.values()])
+
+    def products(self):
+        for reservoir in self.reservoirs.values():
+            yield from reservoir
@@ -10,6 +10,7 @@ from src.evaluation.evaluator.model_evaluator_random_forest import ModelEvaluato
 from src.evaluation.evaluator.model_evaluator_transformer_flat import ModelEvaluatorTransformer
 from src.evaluation.evaluator.model_evaluator_transformer_rnn import ModelEvaluatorTransformerRNN
 from src.evaluation.evaluator.model_evaluator_transformer_hierarchy import ModelEvaluatorTransformerHierarchy
+from src.evaluation.evaluator.model_evaluator_transformer_lcpn import ModelEvaluatorTransformerLCPN
 
 
 @click.command()
@@ -58,6 +59,8 @@ def evaluate_experiments(configuration, test, experiment_type):
         evaluator = ModelEvaluatorTransformerRNN(configuration, test, experiment_type)
     elif experiment_type == 'eval-transformer-based-hierarchy':
         evaluator = ModelEvaluatorTransformerHierarchy(configuration, test, experiment_type)
+    elif experiment_type == 'eval-transformer-based-lcpn':
+        evaluator = ModelEvaluatorTransformerLCPN(configuration, test, experiment_type)
     elif experiment_type == 'eval-random-forest-based':
         evaluator = ModelEvaluatorRandomForest(configuration, test, experiment_type)
     elif experiment_type == 'eval-fasttext-based':
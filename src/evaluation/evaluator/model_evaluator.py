@@ -1,9 +1,10 @@
-from pathlib import Path
 
 import pandas as pd
 from sklearn.preprocessing import LabelEncoder
+from src.data import split_storage
 from src.models.model_runner import ModelRunner
-from src.data.preprocessing import preprocess
+from src.data.preprocessing import preprocess_many
+from src.models.transformers.dataset.tokenization_cache import TokenizationCache
 
 
 class ModelEvaluator(ModelRunner):
@@ -42,13 +43,10 @@ class ModelEvaluator(ModelRunner):
 
     def initialize_encoder(self):
         """Initialize Encoder"""
-        data_dir = Path(self.data_dir)
-        relative_path = 'data/processed/{}/split/raw/train_data_{}.pkl' \
-            .format(self.original_dataset_name, self.original_dataset_name)
-        file_path = data_dir.joinpath(relative_path)
-        df_orig_ds = pd.read_pickle(file_path)
+        # Label vocabulary of the training split is recorded in the split manifest
+        labels = split_storage.load_labels(self.data_dir, self.original_dataset_name)
         self.encoder = LabelEncoder()
-        self.encoder.fit(df_orig_ds['category'].values)
+        self.encoder.fit(labels)
 
         self.logger.info('Initialized encoder using {}!'.format(self.original_dataset_name))
 
@@ -85,6 +83,18 @@ class ModelEvaluator(ModelRunner):
 
         # Preprocess values if necessary
         if self.preprocessing:
-            ds_eval['preprocessed_title'] = ds_eval['title'].apply(preprocess)
+            ds_eval['preprocessed_title'] = preprocess_many(ds_eval['title'].values)
 
         return ds_eval
+
+    def encode_texts(self, ds_eval, tokenizer):
+        """Tokenize evaluation texts - token ids are reused from the tokenization cache if possible"""
+        if self.evaluate_on_full_dataset:
+            split_paths = list(self.split_paths.values())
+        else:
+            split_paths = [self.split_paths['validate']]
+        column = 'preprocessed_title' if self.preprocessing else 'title'
+
+        cache = TokenizationCache(self.data_dir, self.dataset_name)
+        return cache.encode(split_paths, tokenizer, False, self.preprocessing, len(ds_eval),
+                            lambda: list(ds_eval[column].values))
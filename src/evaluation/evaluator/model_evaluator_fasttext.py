@@ -5,7 +5,7 @@ from pathlib import Path
 
 import fasttext
 
-from src.data.preprocessing import preprocess
+from src.data.preprocessing import preprocess_parallel
 from src.evaluation import scorer
 from src.evaluation.evaluator.model_evaluator import ModelEvaluator
 from src.utils.result_collector import ResultCollector
@@ -35,8 +35,8 @@ class ModelEvaluatorFastText(ModelEvaluator):
         ds['category_prepared'] = ds['category'].str.replace(' ', '_')
         ds['category_prepared'] = '__label__' + ds['category_prepared'].astype(str)
 
-        #Preprocess Title
-        ds['title'] =ds['title'].apply(preprocess)
+        #Preprocess Title - parameter workers sets the number of processes, titles are preprocessed serially by default
+        ds['title'] = preprocess_parallel(ds['title'].values, self.parameter.get('workers', 1))
 
         orig_categories = ds['category'].values
         prepared_categories = ds['category_prepared'].values
@@ -7,6 +7,7 @@ from src.evaluation import scorer
 from src.evaluation.evaluator.model_evaluator import ModelEvaluator
 from src.models.transformers import utils
 from src.models.transformers.dataset.category_dataset_flat import CategoryDatasetFlat
+from src.models.transformers.dataset.dynamic_padding_collator import DynamicPaddingCollator
 from src.utils.result_collector import ResultCollector
 
 
@@ -49,23 +50,21 @@ class ModelEvaluatorTransformer(ModelEvaluator):
 
         normalized_encoder, normalized_decoder, number_leaf_nodes = self.encode_labels()
 
-        evaluator = scorer.HierarchicalScorer(self.experiment_name, self.tree, transformer_decoder=normalized_decoder)
+        evaluator = scorer.HierarchicalScorer(self.experiment_name, self.tree, transformer_decoder=normalized_decoder,
+                                              tree_utils=self.tree_utils)
+        tokenizer = utils.roberta_base_tokenizer()
         trainer = Trainer(
             model=self.model,  # the instantiated 🤗 Transformers model to be trained
+            data_collator=DynamicPaddingCollator(tokenizer.pad_token_id),  # pad per batch
             compute_metrics=evaluator.compute_metrics_transformers_flat
         )
 
-        if self.preprocessing:
-            texts = list(ds_eval['preprocessed_title'].values)
-        else:
-            texts = list(ds_eval['title'].values)
+        encodings = self.encode_texts(ds_eval, tokenizer)
 
         ds_eval['category'] = ds_eval['category'].str.replace(' ', '_')
         labels = list(ds_eval['category'].values)
 
-        tokenizer = utils.roberta_base_tokenizer()
-
-        ds_wdc = CategoryDatasetFlat(texts, labels, tokenizer, normalized_encoder)
+        ds_wdc = CategoryDatasetFlat(None, labels, tokenizer, normalized_encoder, encodings=encodings)
 
         result_collector = ResultCollector(self.dataset_name, self.experiment_type)
         result_collector.results[self.experiment_name] = trainer.evaluate(ds_wdc)
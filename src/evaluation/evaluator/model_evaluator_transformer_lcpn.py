@@ -0,0 +1,107 @@
+import time
+import csv
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+from transformers import Trainer
+
+from src.evaluation import scorer
+from src.evaluation.evaluator.model_evaluator import ModelEvaluator
+from src.models.transformers import utils
+from src.models.transformers.custom_transformers.roberta_for_hierarchical_classification_lcpn import \
+    RobertaForHierarchicalClassificationLCPN
+from src.models.transformers.dataset.category_dataset_flat import CategoryDatasetFlat
+from src.models.transformers.dataset.dynamic_padding_collator import DynamicPaddingCollator
+from src.utils.result_collector import ResultCollector
+
+
+class ModelEvaluatorTransformerLCPN(ModelEvaluator):
+
+    def __init__(self, configuration_path, test, experiment_type):
+        super().__init__(configuration_path, test, experiment_type)
+
+        self.load_model()
+        self.load_tree()
+
+    def load_model(self):
+        data_dir = Path(self.data_dir)
+        file_path = data_dir.joinpath(self.model_path)
+        self.model = RobertaForHierarchicalClassificationLCPN.from_pretrained(file_path)
+
+    def encode_labels(self):
+        """Encode & decode labels - leaves are encoded by their index in the leaves of the LCPN structure"""
+        normalized_encoder = {}
+        normalized_decoder = {}
+        decoder = dict(self.tree.nodes(data="name"))
+
+        for derived_key, leaf in enumerate(self.model.config.lcpn_leaves):
+            normalized_encoder[decoder[leaf]] = {'original_key': leaf, 'derived_key': derived_key}
+            normalized_decoder[derived_key] = {'original_key': leaf, 'value': decoder[leaf]}
+
+        return normalized_encoder, normalized_decoder
+
+    def predict_top_down(self, dataset, collator, batch_size=64):
+        """Predict nodes per level greedily top down - batch by batch"""
+        device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        model = self.model.to(device).eval()
+
+        nodes = []
+        with torch.no_grad():
+            for batch in DataLoader(dataset, batch_size=batch_size, collate_fn=collator):
+                batch_nodes, _ = model.predict_top_down(batch['input_ids'].to(device),
+                                                        attention_mask=batch['attention_mask'].to(device))
+                nodes.append(batch_nodes.cpu().numpy())
+
+        return np.concatenate(nodes)
+
+    def evaluate(self):
+        ds_eval = self.prepare_eval_dataset()
+
+        normalized_encoder, normalized_decoder = self.encode_labels()
+
+        evaluator = scorer.HierarchicalScorer(self.experiment_name, self.tree, transformer_decoder=normalized_decoder,
+                                              tree_utils=self.tree_utils)
+        tokenizer = utils.roberta_base_tokenizer()
+        collator = DynamicPaddingCollator(tokenizer.pad_token_id)  # pad per batch
+        trainer = Trainer(
+            model=self.model,  # the instantiated 🤗 Transformers model to be trained
+            data_collator=collator,
+            compute_metrics=evaluator.compute_metrics_transformers_flat
+        )
+
+        encodings = self.encode_texts(ds_eval, tokenizer)
+
+        ds_eval['category'] = ds_eval['category'].str.replace(' ', '_')
+        labels = list(ds_eval['category'].values)
+
+        ds_wdc = CategoryDatasetFlat(None, labels, tokenizer, normalized_encoder, encodings=encodings)
+
+        result_collector = ResultCollector(self.dataset_name, self.experiment_type)
+        decoder = dict(self.tree.nodes(data="name"))
+        if 'top_down' in self.parameter and self.parameter['top_down']:
+            # Follow the local classifiers greedily instead of scoring all paths
+            nodes = self.predict_top_down(ds_wdc, collator)
+            preds = [decoder[path[path >= 0][-1]] for path in nodes]
+            result_collector.results[self.experiment_name] = evaluator.compute_metrics_no_encoding(labels, preds)
+
+            for lvl, nodes_lvl in enumerate(nodes.transpose(), start=1):
+                ds_eval['Hierarchy Level {} Prediction'.format(lvl)] = [decoder[node] if node >= 0 else None
+                                                                        for node in nodes_lvl]
+        else:
+            result_collector.results[self.experiment_name] = trainer.evaluate(ds_wdc)
+
+            # Predict values for error analysis
+            prediction = trainer.predict(ds_wdc)
+            preds = [normalized_decoder[pred]['value'] for pred in prediction.predictions.argmax(-1)]
+
+        ds_eval['prediction'] = preds
+        full_prediction_output = '{}/{}'.format(self.data_dir, self.prediction_output)
+
+        ds_eval.to_csv(full_prediction_output, index=False, sep=';', encoding='utf-8', quotechar='"',
+                       quoting=csv.QUOTE_ALL)
+
+        # Persist results
+        timestamp = time.time()
+        result_collector.persist_results(timestamp)
@@ -8,7 +8,9 @@ from src.evaluation.evaluator.model_evaluator import ModelEvaluator
 from src.models.transformers import utils
 from src.models.transformers.custom_transformers.roberta_for_hierarchical_classification_rnn import \
     RobertaForHierarchicalClassificationRNN
+from src.models.transformers.custom_transformers.modules.top_down_decoder import TopDownDecoder
 from src.models.transformers.dataset.category_dataset_rnn import CategoryDatasetRNN
+from src.models.transformers.dataset.dynamic_padding_collator import DynamicPaddingCollator
 from src.utils.result_collector import ResultCollector
 
 
@@ -26,16 +28,6 @@ class ModelEvaluatorTransformerRNN(ModelEvaluator):
         print(file_path)
         self.model = RobertaForHierarchicalClassificationRNN.from_pretrained(file_path)
 
-    def determine_path_to_root(self, nodes):
-        predecessors = self.tree.predecessors(nodes[-1])
-        predecessor = [k for k in predecessors][0]
-
-        if predecessor == self.root:
-            nodes.reverse()
-            return nodes
-        nodes.append(predecessor)
-        return self.determine_path_to_root(nodes)
-
     def normalize_path_from_root_per_parent(self, path):
         """Normalize label values per parent node"""
         found_successor = self.root
@@ -67,7 +59,7 @@ class ModelEvaluatorTransformerRNN(ModelEvaluator):
         longest_path = 0
         for key in encoder:
             if key in leaf_nodes:
-                path = self.determine_path_to_root([encoder[key]])
+                path = self.tree_utils.determine_path_to_root([encoder[key]])
                 if 'exploit_hierarchy' in self.parameter and self.parameter['exploit_hierarchy']:
                     path = self.normalize_path_from_root_per_parent(path)
 
@@ -91,28 +83,36 @@ class ModelEvaluatorTransformerRNN(ModelEvaluator):
 
         return normalized_encoder, normalized_decoder, number_of_labels
 
+    def initialize_rnn_decoder(self):
+        """Decode valid paths top down if a beam size is configured - otherwise levels are decoded independently"""
+        if 'beam_size' not in self.parameter:
+            return None
+
+        exploit_hierarchy = 'exploit_hierarchy' in self.parameter and self.parameter['exploit_hierarchy']
+        self.logger.info('Decode paths top down with beam size {}!'.format(self.parameter['beam_size']))
+        return TopDownDecoder.from_tree_utils(self.tree_utils, len(self.tree), per_parent=exploit_hierarchy,
+                                              beam_size=self.parameter['beam_size'])
+
     def evaluate(self):
         ds_eval = self.prepare_eval_dataset()
 
         normalized_encoder, normalized_decoder, number_of_labels = self.encode_labels()
 
-        evaluator = scorer.HierarchicalScorer(self.experiment_name, self.tree, transformer_decoder=normalized_decoder)
+        evaluator = scorer.HierarchicalScorer(self.experiment_name, self.tree, transformer_decoder=normalized_decoder,
+                                              tree_utils=self.tree_utils, rnn_decoder=self.initialize_rnn_decoder())
+        tokenizer = utils.roberta_base_tokenizer()
         trainer = Trainer(
             model=self.model,  # the instantiated 🤗 Transformers model to be trained
+            data_collator=DynamicPaddingCollator(tokenizer.pad_token_id),  # pad per batch
             compute_metrics=evaluator.compute_metrics_transformers_rnn
         )
 
-        if self.preprocessing:
-            texts = list(ds_eval['preprocessed_title'].values)
-        else:
-            texts = list(ds_eval['title'].values)
+        encodings = self.encode_texts(ds_eval, tokenizer)
 
         ds_eval['category'] = ds_eval['category'].str.replace(' ', '_')
         labels = list(ds_eval['category'].values)
 
-        tokenizer = utils.roberta_base_tokenizer()
-
-        ds_wdc = CategoryDatasetRNN(texts, labels, tokenizer, normalized_encoder)
+        ds_wdc = CategoryDatasetRNN(None, labels, tokenizer, normalized_encoder, encodings=encodings)
 
         result_collector = ResultCollector(self.dataset_name, self.experiment_type)
         result_collector.results[self.experiment_name] = trainer.evaluate(ds_wdc)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+import logging
+from pathlib import Path
+
+import click
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import DataLoader
+from transformers.trainer_utils import EvalPrediction
+
+from src.evaluation import scorer
+from src.evaluation.evaluator.model_evaluator_transformer_flat import ModelEvaluatorTransformer
+from src.evaluation.evaluator.model_evaluator_transformer_hierarchy import ModelEvaluatorTransformerHierarchy
+from src.evaluation.evaluator.model_evaluator_transformer_rnn import ModelEvaluatorTransformerRNN
+from src.models.transformers import inference_models, utils
+from src.models.transformers.dataset.category_dataset_flat import CategoryDatasetFlat
+from src.models.transformers.dataset.category_dataset_rnn import CategoryDatasetRNN
+from src.models.transformers.dataset.dynamic_padding_collator import DynamicPaddingCollator
+
+
+@click.command()
+@click.option('--configuration', help='Evaluation configuration of the transformer model')
+@click.option('--experiment_type', help='Experiment Type - eval-transformer-based(-rnn/-hierarchy)')
+@click.option('--output_dir', help='Directory of the exported models and the comparison report')
+@click.option('--batch_size', help='Batch size used to measure latency', type=int, default=32)
+@click.option('--num_threads', help='Number of CPU threads used for inference', type=int, default=None)
+@click.option('--test/--no-test', default=False, help='Test configuration - Run only on small subset')
+def main(configuration, experiment_type, output_dir, batch_size, num_threads, test):
+    """Export int8 quantized & ONNX variants of a trained transformer and compare their accuracy & latency on CPU"""
+    logger = logging.getLogger(__name__)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+
+    evaluator, compute_metrics, dataset = prepare_evaluation(configuration, experiment_type, test)
+    batches = list(DataLoader(dataset, batch_size=batch_size,
+                              collate_fn=DynamicPaddingCollator(utils.roberta_base_tokenizer().pad_token_id)))
+    label_ids = np.array([np.asarray(dataset[i]['labels']) for i in range(len(dataset))])
+
+    inference_model = inference_models.build_inference_model(evaluator.model, experiment_type,
+                                                             num_levels=len(evaluator.tree_utils.levels))
+    quantized_model = inference_models.quantize_dynamic(inference_model)
+
+    variants = {
+        'pytorch-fp32': (inference_model, inference_models.export_torchscript(
+            inference_model, str(output_dir.joinpath('model-fp32.pt')))),
+        'pytorch-int8': (quantized_model, inference_models.export_torchscript(
+            quantized_model, str(output_dir.joinpath('model-int8.pt'))))
+    }
+
+    # ONNX variants are optional - the exporter & onnxruntime depend on additional packages
+    try:
+        onnx_path = inference_models.export_onnx(inference_model, str(output_dir.joinpath('model-fp32.onnx')))
+    except ImportError as e:
+        logger.warning('ONNX export is not available ({}) - ONNX variants are not compared!'.format(e))
+    else:
+        try:
+            onnx_int8_path = inference_models.quantize_onnx(onnx_path, str(output_dir.joinpath('model-int8.onnx')))
+            variants['onnx-fp32'] = (inference_models.OnnxInferenceModel(onnx_path, num_threads), onnx_path)
+            variants['onnx-int8'] = (inference_models.OnnxInferenceModel(onnx_int8_path, num_threads), onnx_int8_path)
+        except ImportError:
+            logger.warning('onnxruntime is not installed - ONNX model exported to {} but not compared!'
+                           .format(onnx_path))
+
+    results = []
+    reference_predictions = None
+    for name, (model, path) in variants.items():
+        logits, latencies = inference_models.predict_batches(model, batches)
+        predictions = logits.argmax(-1)
+        if reference_predictions is None:
+            reference_predictions = predictions
+
+        result = {'variant': name, 'size_mb': inference_models.file_size(path),
+                  'titles_per_second': len(label_ids) / latencies.sum(),
+                  'latency_p50_ms': np.percentile(latencies, 50) * 1000,
+                  'latency_p95_ms': np.percentile(latencies, 95) * 1000,
+                  'agreement_with_fp32': (predictions == reference_predictions).all(axis=-1).mean()
+                  if predictions.ndim > 1 else (predictions == reference_predictions).mean()}
+        result.update(compute_metrics(EvalPrediction(predictions=logits, label_ids=label_ids)))
+        results.append(result)
+        logger.info('{} - {}'.format(name, result))
+
+    report_path = output_dir.joinpath('comparison_report.csv')
+    pd.DataFrame(results).to_csv(report_path, index=False, sep=';')
+    logger.info('Comparison report persisted to {}!'.format(report_path))
+
+
+def prepare_evaluation(configuration, experiment_type, test):
+    """Load model, tree and evaluation split via the evaluator of the experiment type"""
+    if experiment_type == 'eval-transformer-based':
+        evaluator = ModelEvaluatorTransformer(configuration, test, experiment_type)
+        normalized_encoder, normalized_decoder, _ = evaluator.encode_labels()
+    elif experiment_type == 'eval-transformer-based-rnn':
+        evaluator = ModelEvaluatorTransformerRNN(configuration, test, experiment_type)
+        normalized_encoder, normalized_decoder, _ = evaluator.encode_labels()
+    elif experiment_type == 'eval-transformer-based-hierarchy':
+        evaluator = ModelEvaluatorTransformerHierarchy(configuration, test, experiment_type)
+        normalized_encoder, normalized_decoder, _ = evaluator.intialize_hierarchy_paths()
+    else:
+        raise ValueError('Experiment Type {} not defined!'.format(experiment_type))
+
+    hierarchical_scorer = scorer.HierarchicalScorer(evaluator.experiment_name, evaluator.tree,
+                                                    transformer_decoder=normalized_decoder,
+                                                    tree_utils=evaluator.tree_utils)
+
+    ds_eval = evaluator.prepare_eval_dataset()
+    tokenizer = utils.roberta_base_tokenizer()
+    encodings = evaluator.encode_texts(ds_eval, tokenizer)
+    labels = list(ds_eval['category'].str.replace(' ', '_').values)
+
+    if experiment_type == 'eval-transformer-based-rnn':
+        dataset = CategoryDatasetRNN(None, labels, tokenizer, normalized_encoder, encodings=encodings)
+        compute_metrics = hierarchical_scorer.compute_metrics_transformers_rnn
+    else:
+        dataset = CategoryDatasetFlat(None, labels, tokenizer, normalized_encoder,
+                                      per_lvl_labels=experiment_type == 'eval-transformer-based-hierarchy',
+                                      encodings=encodings)
+        compute_metrics = hierarchical_scorer.compute_metrics_transformers_flat
+
+    return evaluator, compute_metrics, dataset
+
+
+if __name__ == '__main__':
+    log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
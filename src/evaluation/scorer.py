@@ -1,10 +1,10 @@
 from sklearn.metrics import precision_recall_fscore_support, f1_score
-from networkx import all_pairs_shortest_path_length, relabel_nodes
-from contextlib import contextmanager
-from sklearn.preprocessing import MultiLabelBinarizer
+from scipy.sparse import csr_matrix
 import logging
 import numpy as np
 
+from src.utils.tree_utils import TreeUtils
+
 
 def score_traditional(gs: list, prediction: list, name='Unknown'):
     logger = logging.getLogger(__name__)
@@ -36,17 +36,44 @@ def score_mwpd(gs: list, prediction: list):
 #    return f1_score(y_true, y_pred, labels=np.unique(y_true), average='weighted')
 
 
-def h_score(y_true, y_pred, class_hierarchy, root):
+def build_ancestor_matrix(tree):
+    """Build a sparse node x node matrix marking the ancestors of every node (incl. the node itself, excl. root).
+    An additional empty row is appended for labels which are not part of the tree."""
+    node_index = {node: i for i, node in enumerate(tree.nodes)}
+    parents = {child: parent for parent, child in tree.edges}
+
+    rows = []
+    cols = []
+    for node, i in node_index.items():
+        path = [node]
+        while path[-1] in parents:
+            path.append(parents[path[-1]])
+        # all ancestors, except the last one which would be the root node
+        for ancestor in path[:-1]:
+            rows.append(i)
+            cols.append(node_index[ancestor])
+
+    data = np.ones(len(rows), dtype=np.int32)
+    ancestor_matrix = csr_matrix((data, (rows, cols)), shape=(len(node_index) + 1, len(node_index)))
+
+    return node_index, ancestor_matrix
+
+
+def encode_ancestor_rows(labels, node_index):
+    """Map labels to rows of the ancestor matrix - unknown labels are mapped to the empty last row"""
+    unknown = len(node_index)
+    return np.fromiter((node_index.get(label, unknown) for label in labels), dtype=np.int64, count=len(labels))
+
+
+def h_score(y_true, y_pred, node_index, ancestor_matrix):
     """ Influenced by https://github.com/asitang/sklearn-hierarchical-classification/blob/develop
     /sklearn_hierarchical/metrics.py """
-    y_true_ = fill_ancestors(y_true, root, graph=class_hierarchy)
-    y_pred_ = fill_ancestors(y_pred, root, graph=class_hierarchy)
+    y_true_ = ancestor_matrix[encode_ancestor_rows(y_true, node_index)]
+    y_pred_ = ancestor_matrix[encode_ancestor_rows(y_pred, node_index)]
 
-    ix = np.where((y_true_ != 0) & (y_pred_ != 0))
-
-    true_positives = len(ix[0])
-    all_positives = np.count_nonzero(y_true_)
-    all_results = np.count_nonzero(y_pred_)
+    true_positives = y_true_.multiply(y_pred_).sum()
+    all_positives = y_true_.nnz
+    all_results = y_pred_.nnz
 
     h_precision = 0
     if all_results > 0:
@@ -59,95 +86,29 @@ def h_score(y_true, y_pred, class_hierarchy, root):
     return h_precision, h_recall
 
 
-def h_fbeta_score(y_true, y_pred, class_hierarchy, root, beta=1.):
+def h_fbeta_score(y_true, y_pred, node_index, ancestor_matrix, beta=1.):
     """ Influenced by https://github.com/asitang/sklearn-hierarchical-classification/blob/develop
     /sklearn_hierarchical/metrics.py """
-    hP, hR = h_score(y_true, y_pred, class_hierarchy, root)
+    hP, hR = h_score(y_true, y_pred, node_index, ancestor_matrix)
     if (beta ** 2. * hP + hR) > 0:
         return (1. + beta ** 2.) * hP * hR / (beta ** 2. * hP + hR)
     else:
         return 0
 
 
-@contextmanager
-def multi_labeled(y_true, y_pred, graph, root):
-    """ Influenced by https://github.com/asitang/sklearn-hierarchical-classification/blob/develop
-    /sklearn_hierarchical/metrics.py """
-    mlb = MultiLabelBinarizer()
-    all_classes = [
-        node
-        for node in graph.nodes
-        if node != root
-    ]
-    # print('all_classes',all_classes) Nb. we pass a (singleton) list-within-a-list as fit() expects an iterable of
-    # iterables -> Changed implementation here
-    all_classes_new = []
-    for klasse in all_classes:
-        all_classes_new.append([klasse])
-
-    mlb.fit(all_classes_new)
-
-    y_true_new = []
-    for klasse in y_true:
-        y_true_new.append([klasse])
-
-    y_pred_new = []
-    for klasse in y_pred:
-        y_pred_new.append([klasse])
-
-    node_label_mapping = {
-        old_label: new_label
-        for new_label, old_label in enumerate(list(mlb.classes_))
-    }
-    # print('node_label_mapping',node_label_mapping)
-    # print('y_true transform',y_true)
-    # print('mlb.transform(y_true)',mlb.transform(y_true_new)[0])
-    yield (
-        mlb.transform(y_true_new),
-        mlb.transform(y_pred_new),
-        relabel_nodes(graph, node_label_mapping),
-        root,
-    )
-
-
-def hierarchical_score(y_true, y_pred, tree, root, name='Unknown'):
+def hierarchical_score(y_true, y_pred, tree, root, name='Unknown', ancestors=None):
+    """Compute the hierarchical f1 score - pass precomputed ancestors (see build_ancestor_matrix) to reuse them"""
     logger = logging.getLogger(__name__)
-    with multi_labeled(y_true, y_pred, tree, root) as (y_test_, y_pred_, graph_, root_):
-        h_fbeta = h_fbeta_score(
-            y_test_,
-            y_pred_,
-            graph_,
-            root_,
-        )
-        if not name:
-            return h_fbeta
-        else:
-            logger.info("{} - Hierarchy: | h_f1: {:4f}".format(name, h_fbeta))
-            return h_fbeta
-
+    if ancestors is None:
+        ancestors = build_ancestor_matrix(tree)
+    node_index, ancestor_matrix = ancestors
 
-def fill_ancestors(y, root, graph, copy=True):
-    """ Influenced by https://github.com/asitang/sklearn-hierarchical-classification/blob/develop
-    /sklearn_hierarchical/metrics.py """
-    y_ = y.copy() if copy else y
-    paths = all_pairs_shortest_path_length(graph.reverse(copy=False))
-    for target, distances in paths:
-        if target == root:
-            # Our stub ROOT node, can skip
-            continue
-        # print('y',y)
-        # print('target',target)
-        ix_rows = np.where(y[:, target] > 0)[0]
-        # all ancestors, except the last one which would be the root node
-        ancestors = list(distances.keys())[:-1]
-        # print('ancestors',ancestors)
-        # print('mesh',tuple(np.meshgrid(ix_rows, ancestors)))
-        # print('target',target)
-        # print(type(target))
-        y_[tuple(np.meshgrid(ix_rows, ancestors))] = 1
-    graph.reverse(copy=False)
-    # print('y_',y_[0])
-    return y_
+    h_fbeta = h_fbeta_score(y_true, y_pred, node_index, ancestor_matrix)
+    if not name:
+        return h_fbeta
+    else:
+        logger.info("{} - Hierarchy: | h_f1: {:4f}".format(name, h_fbeta))
+        return h_fbeta
 
 
 # only if SelectKBest was used
@@ -158,74 +119,54 @@ def get_most_important_features(classifier_pipeline_object):
 
 
 class HierarchicalScorer:
-    def __init__(self, experiment_name, tree, transformer_decoder=None, num_labels_per_level=None):
+    def __init__(self, experiment_name, tree, transformer_decoder=None, num_labels_per_level=None, tree_utils=None,
+                 rnn_decoder=None):
         self.logger = logging.getLogger(__name__)
 
         self.experiment_name = experiment_name
         self.tree = tree
         self.transformer_decoder = transformer_decoder
         self.num_labels_per_lvl = num_labels_per_level
+        # Top down decoder of the RNN logits - without decoder each level is predicted independently
+        self.rnn_decoder = rnn_decoder
 
         self.root = [node[0] for node in self.tree.in_degree if node[1] == 0][0]
 
-    def determine_path_to_root(self, nodes):
-        predecessors = [k for k in self.tree.predecessors(nodes[-1])]
-        if len(predecessors) > 0:
-            predecessor = predecessors[0]
-        else:
-            predecessor = self.root #Return ooc path
+        # Reuse compiled tree index of the runner if available
+        self.tree_utils = tree_utils if tree_utils is not None else TreeUtils(self.tree)
 
-        if predecessor == self.root:
-            nodes.reverse()
-            return nodes
-        nodes.append(predecessor)
-        return self.determine_path_to_root(nodes)
+        # Ancestors are computed once per tree and reused by every evaluation
+        self.ancestors = build_ancestor_matrix(self.tree)
 
     def determine_label_preds_per_lvl(self, labels, preds):
-        label_paths = [self.determine_path_to_root([label]) for label in labels]
-        pred_paths = [self.determine_path_to_root([pred]) for pred in preds]
+        label_paths, label_lengths = self.tree_utils.determine_paths_to_root(labels)
+        pred_paths, pred_lengths = self.tree_utils.determine_paths_to_root(preds)
 
         dummy_label = len(self.tree) + 1  # Dummy label used to align length of prediction paths if they differ
-        longest_path = max([len(path) for path in label_paths])
-        for label_path, pred_path in zip(label_paths, pred_paths):
-            # Align length of prediction paths
-            if len(label_path) != len(pred_path):
-                prediction_difference = len(label_path) - len(pred_path)
-                if prediction_difference > 0:
-                    while prediction_difference > 0:
-                        pred_path.append(dummy_label)
-                        prediction_difference -= 1
-                else:
-                    while prediction_difference < 0:
-                        label_path.append(dummy_label)
-                        prediction_difference += 1
+        longest_path = max(label_lengths.max(), pred_lengths.max())
+        levels = np.arange(longest_path)
+
+        # Align length of prediction paths using the dummy label & add dummy (-1) to all shorter paths
+        aligned_lengths = np.maximum(label_lengths, pred_lengths)[:, None]
+        fill_up = np.where(levels < aligned_lengths, dummy_label, -1)
 
-            #Add dummy to all paths
-            while len(label_path) < longest_path and len(pred_path) < longest_path:
-                label_path.append(-1)
-                pred_path.append(-1)
+        label_paths = np.where(levels < label_lengths[:, None], label_paths[:, :longest_path], fill_up)
+        pred_paths = np.where(levels < pred_lengths[:, None], pred_paths[:, :longest_path], fill_up)
 
         #Transpose paths
-        label_per_lvl = np.array(label_paths).transpose().tolist()
-        preds_per_lvl = np.array(pred_paths).transpose().tolist()
+        label_per_lvl = label_paths.transpose().tolist()
+        preds_per_lvl = pred_paths.transpose().tolist()
 
         return label_per_lvl, preds_per_lvl
 
-    #Taken from experiment runner --> Refactor - consolidate functions
-    def get_all_nodes_per_lvl(self, level):
-        successors = self.tree.successors(self.root)
-        while level > 0:
-            next_lvl_succesors = []
-            for successor in successors:
-                next_lvl_succesors.extend(self.tree.successors(successor))
-            successors = next_lvl_succesors
-            level -= 1
-        return successors
-
     def compute_metrics_transformers_flat(self, pred):
         raw_labels = pred.label_ids
         raw_preds = pred.predictions.argmax(-1)
 
+        if raw_labels.ndim > 1:
+            # Labels are provided per lvl - last lvl contains the leaf label
+            raw_labels = raw_labels[:, -1]
+
         labels = [self.transformer_decoder[label]['value'] for label in raw_labels]
         preds = [self.transformer_decoder[pred]['value'] for pred in raw_preds]
 
@@ -258,7 +199,7 @@ class HierarchicalScorer:
 
         # Decode hierarchy lvl labels
         for i in range(len(labels_paths[0])):
-            nodes = list(self.get_all_nodes_per_lvl(i))
+            nodes = self.tree_utils.get_all_nodes_per_lvl(i)
             for label_path in labels_paths:
                 if label_path[i] > 0: # Keep 0 (out of category)
                     index = label_path[i] - 1
@@ -277,7 +218,12 @@ class HierarchicalScorer:
 
     def transpose_rnn_hierarchy(self, pred):
         labels_paths = [list(label) for label in pred.label_ids]
-        preds_paths = [list(prediction.argmax(-1)) for prediction in pred.predictions]
+        if self.rnn_decoder is not None:
+            import torch
+            with torch.no_grad():
+                preds_paths = self.rnn_decoder(torch.as_tensor(pred.predictions))[0].tolist()
+        else:
+            preds_paths = [list(prediction.argmax(-1)) for prediction in pred.predictions]
 
         labels_per_lvl = np.array(labels_paths).transpose().tolist()
         preds_per_lvl = np.array(preds_paths).transpose().tolist()
@@ -319,7 +265,8 @@ class HierarchicalScorer:
         """Compute Metrics for leaf nodes and all nodes in the graph separately"""
         self.logger.debug('Leaf nodes')
         w_prec, w_rec, w_f1, macro_f1 = score_traditional(labels, preds, name=self.experiment_name)  # Score leaf nodes
-        h_f_score = hierarchical_score(labels, preds, self.tree, self.root, name=self.experiment_name)
+        h_f_score = hierarchical_score(labels, preds, self.tree, self.root, name=self.experiment_name,
+                                       ancestors=self.ancestors)
 
         results = { 'leaf_weighted_prec': w_prec,
                     'leaf_weighted_rec': w_rec,
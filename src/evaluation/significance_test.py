@@ -93,18 +93,17 @@ def augment_dataset(dataset, path_to_tree):
         tree = pickle.load(f)
     treeUtils = TreeUtils(tree)
 
-    augmented_dataset = pd.DataFrame()
     dataset['encoded_prediction'] = dataset['prediction'].apply(treeUtils.encode_node)
     dataset['encoded_category'] = dataset['category'].apply(treeUtils.encode_node)
 
-    for index, row in dataset.iterrows():
-        path_to_root_prediction = treeUtils.determine_path_to_root([row['encoded_prediction']])
-        path_to_root_category = treeUtils.determine_path_to_root([row['encoded_category']])
-        new_row = path_to_root_prediction + path_to_root_category
-        df_new_row = pd.DataFrame([new_row], columns=['Hierarchy Level 1 Prediction', 'Hierarchy Level 2 Prediction', 'Hierarchy Level 3 Prediction',
-                                       'Hierarchy Level 1 Label', 'Hierarchy Level 2 Label', 'Hierarchy Level 3 Label'])
+    # Look up all paths at once using the compiled tree index
+    paths_prediction, _ = treeUtils.determine_paths_to_root(dataset['encoded_prediction'].values)
+    paths_category, _ = treeUtils.determine_paths_to_root(dataset['encoded_category'].values)
 
-        augmented_dataset = augmented_dataset.append(df_new_row, ignore_index=True)
+    augmented_dataset = pd.DataFrame(np.hstack([paths_prediction[:, :3], paths_category[:, :3]]),
+                                     columns=['Hierarchy Level 1 Prediction', 'Hierarchy Level 2 Prediction',
+                                              'Hierarchy Level 3 Prediction', 'Hierarchy Level 1 Label',
+                                              'Hierarchy Level 2 Label', 'Hierarchy Level 3 Label'])
 
     return augmented_dataset
 
@@ -11,6 +11,7 @@ from src.experiments.runner.experiment_runner_random_forest import ExperimentRun
 from src.experiments.runner.experiment_runner_transformer_flat import ExperimentRunnerTransformerFlat
 from src.experiments.runner.experiment_runner_transformer_rnn import ExperimentRunnerTransformerRNN
 from src.experiments.runner.experiment_runner_transformer_hierarchy import ExperimentRunnerTransformerHierarchy
+from src.experiments.runner.experiment_runner_transformer_lcpn import ExperimentRunnerTransformerLCPN
 
 @click.command()
 @click.option('--configuration', help='Configuration used to run the experiments')
@@ -49,6 +50,11 @@ def main(configuration, test, experiment_type):
 #@click.option('--test/--no-test', default=False, help='Test configuration - Run only on small subset')
 #@click.option('--experiment_type', help='Experiment Type')
 def run_experiment(configuration, test, experiment_type):
+    runner = create_runner(configuration, test, experiment_type)
+    runner.run()
+
+
+def create_runner(configuration, test, experiment_type):
 
     if experiment_type == 'dict-based':
         runner = ExperimentRunnerDict(configuration, test, experiment_type)
@@ -58,13 +64,16 @@ def run_experiment(configuration, test, experiment_type):
         runner = ExperimentRunnerTransformerRNN(configuration, test, experiment_type)
     elif experiment_type == 'transformer-based-hierarchy':
         runner = ExperimentRunnerTransformerHierarchy(configuration, test, experiment_type)
+    elif experiment_type == 'transformer-based-lcpn':
+        runner = ExperimentRunnerTransformerLCPN(configuration, test, experiment_type)
     elif experiment_type == 'random-forest-based':
         runner = ExperimentRunnerRandomForest(configuration, test, experiment_type)
     elif experiment_type == 'fasttext-based':
         runner = ExperimentRunnerFastText(configuration, test, experiment_type)
     else:
         raise ValueError('Experiment Type {} not defined!'.format(experiment_type))
-    runner.run()
+
+    return runner
 
 
 def augment_experiments(experiment):
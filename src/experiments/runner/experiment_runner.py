@@ -1,4 +1,8 @@
+from src.data.preprocessing import preprocess_many
 from src.models.model_runner import ModelRunner
+from src.models.transformers.dataset.dynamic_padding_collator import DynamicPaddingCollator
+from src.models.transformers.dataset.embedding_cache import EmbeddingCache
+from src.models.transformers.dataset.tokenization_cache import TokenizationCache
 
 
 class ExperimentRunner(ModelRunner):
@@ -7,6 +11,8 @@ class ExperimentRunner(ModelRunner):
 
         super().__init__(path, test, experiment_type)
 
+        self.embedding_cache = None
+
     def __str__(self):
         output = 'Experiment runner for {} experiments on {} dataset with the following parameter: {}' \
             .format(self.experiment_type, self.dataset_name, self.parameter)
@@ -14,3 +20,78 @@ class ExperimentRunner(ModelRunner):
 
     def run(self):
         """Run experiments - Implemented in child classes!"""
+
+    def text_columns(self):
+        """Columns of the splits used to train transformers"""
+        if self.parameter['description']:
+            return ['title', 'description', 'category']
+        return ['title', 'category']
+
+    def prepare_texts(self, df_ds):
+        """Build input texts from title (plus description) - preprocess them if configured"""
+        if self.parameter['description']:
+            texts = list((df_ds['title'] + ' - ' + df_ds['description']).values)
+        else:
+            texts = df_ds['title'].values
+
+        if self.parameter['preprocessing'] == True:
+            texts = preprocess_many(texts)
+
+        return texts
+
+    def encode_texts(self, split, df_ds, tokenizer):
+        """Tokenize input texts of a split - token ids are reused from the tokenization cache if possible"""
+        cache = TokenizationCache(self.data_dir, self.dataset_name)
+        return cache.encode([self.split_paths[split]], tokenizer, self.parameter['description'],
+                            self.parameter['preprocessing'] == True, len(df_ds), lambda: self.prepare_texts(df_ds))
+
+    def head_only(self):
+        """Train only the head on cached <s> embeddings of the encoder - see EmbeddingCache"""
+        return self.parameter.get('head_only', False)
+
+    def encoder_model_or_path(self):
+        """Encoder used to extract the embeddings - the flat model always starts from roberta-base"""
+        if 'encoder_model_or_path' in self.parameter:
+            return self.parameter['encoder_model_or_path']
+        if self.parameter['model_name'] == 'roberta-base':
+            return 'roberta-base'
+        return self.parameter['pretrained_model_or_path']
+
+    def encode_embeddings(self, split, df_ds, tokenizer, batch_size=256):
+        """Encode input texts of a split once - <s> embeddings are reused from the embedding cache if possible"""
+        if self.embedding_cache is None:
+            self.embedding_cache = EmbeddingCache(self.data_dir, self.dataset_name, batch_size=batch_size)
+        return self.embedding_cache.encode([self.split_paths[split]], tokenizer, self.parameter['description'],
+                                           self.parameter['preprocessing'] == True, len(df_ds),
+                                           lambda: self.prepare_texts(df_ds), self.encoder_model_or_path())
+
+    def encode_inputs(self, split, df_ds, tokenizer):
+        """Model inputs of a split - cached embeddings if only the head is trained, token ids otherwise"""
+        if self.head_only():
+            return self.encode_embeddings(split, df_ds, tokenizer)
+        return self.encode_texts(split, df_ds, tokenizer)
+
+    def provide_model_and_tokenizer(self, config):
+        from src.models.transformers import utils
+        if self.head_only():
+            from src.models.transformers.custom_transformers import head_only_models
+            self.logger.info('Train head only on embeddings of {}!'.format(self.encoder_model_or_path()))
+            return utils.roberta_base_tokenizer(), \
+                head_only_models.provide_head_only_model(self.parameter['model_name'], config)
+
+        return utils.provide_model_and_tokenizer(self.parameter['model_name'],
+                                                 self.parameter['pretrained_model_or_path'], config)
+
+    def provide_data_collator(self, tokenizer):
+        # Embeddings have a fixed size and are stacked by the default collator of the trainer
+        if self.head_only():
+            return None
+        return DynamicPaddingCollator(tokenizer.pad_token_id)
+
+    def save_model(self, trainer):
+        """Persist the trained model - a trained head is combined with its encoder into a full model"""
+        trainer.save_model()
+        if self.head_only():
+            model = trainer.model.assemble(self.encoder_model_or_path())
+            model.save_pretrained(trainer.args.output_dir)
+            self.logger.info('Combined head & encoder saved to {}!'.format(trainer.args.output_dir))
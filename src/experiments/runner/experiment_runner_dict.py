@@ -41,7 +41,7 @@ class ExperimentRunnerDict(ExperimentRunner):
         """Run experiments"""
         result_collector = ResultCollector(self.dataset_name, self.experiment_type)
 
-        dict_classifier = DictClassifier(self.dataset_name, self.most_frequent_leaf, self.tree)
+        dict_classifier = DictClassifier(self.dataset_name, self.most_frequent_leaf, self.tree, self.data_dir)
 
         # fallback classifier
         pipeline = Pipeline([
@@ -59,15 +59,20 @@ class ExperimentRunnerDict(ExperimentRunner):
             if configuration['fallback']:
                 fallback_classifier = classifier_dictionary_based
 
+            # Index mode scores all titles at once via an inverted index of the class words
             y_pred = dict_classifier.classify_dictionary_based(self.dataset['validate']['title'],
-                                                               fallback_classifier, configuration['lemmatizing'],
-                                                               configuration['synonyms'])
+                                                               fallback_classifier,
+                                                               synonyms=configuration['synonyms'],
+                                                               lemmatize=configuration['lemmatizing'],
+                                                               index=configuration.get('index', False))
 
             experiment_name = '{}; title only; synonyms: {}, lemmatizing: {}, fallback: {}'.format(
                 self.experiment_type, configuration['synonyms'],
                 configuration['lemmatizing'], configuration['fallback'])
+            if configuration.get('index', False):
+                experiment_name = '{}, index: True'.format(experiment_name)
 
-            evaluator = scorer.HierarchicalScorer(experiment_name, self.tree)
+            evaluator = scorer.HierarchicalScorer(experiment_name, self.tree, tree_utils=self.tree_utils)
 
             result_collector.results[experiment_name] = evaluator.compute_metrics_no_encoding(y_true, y_pred)
 
@@ -1,11 +1,12 @@
 import pickle
 import time
+from contextlib import ExitStack
 
 import fasttext
 import csv
 import os
 
-from src.data.preprocessing import preprocess
+from src.data.preprocessing import create_pool, preprocess_parallel
 from src.evaluation import scorer
 from src.experiments.runner.experiment_runner import ExperimentRunner
 from src.utils.result_collector import ResultCollector
@@ -28,12 +29,17 @@ class ExperimentRunnerFastText(ExperimentRunner):
         experiments = self.load_configuration(path)
         self.parameter = experiments['parameter']
 
-    def prepare_fasttext(self, ds, split):
+    def preprocessing_workers(self):
+        """Number of processes used to preprocess titles - parameter workers, titles are preprocessed serially
+            by default"""
+        return self.parameter.get('workers', 1)
+
+    def prepare_fasttext(self, ds, split, pool=None):
         ds['category'] = ds['category'].str.replace(' ', '_')
         ds['category_prepared'] = '__label__' + ds['category'].astype(str)
 
         #Preprocess Title
-        ds['title'] =ds['title'].apply(preprocess)
+        ds['title'] = preprocess_parallel(ds['title'].values, self.preprocessing_workers(), pool=pool)
 
         orig_categories = ds['category'].values
         prepared_categories = ds['category_prepared'].values
@@ -65,10 +71,15 @@ class ExperimentRunnerFastText(ExperimentRunner):
         ds_validate = self.dataset['validate']
         ds_test = self.dataset['test']
 
-        #Prepare data
-        train_path, ds_train, orig_categories_train = self.prepare_fasttext(ds_train, 'train')
-        validate_path, ds_validate, orig_categories_validate = self.prepare_fasttext(ds_validate, 'validate')
-        test_path, ds_test, orig_categories_test  = self.prepare_fasttext(ds_test, 'test')
+        #Prepare data - one pool of workers preprocesses all splits
+        with ExitStack() as stack:
+            pool = None
+            if self.preprocessing_workers() != 1:
+                pool = stack.enter_context(create_pool(self.preprocessing_workers()))
+
+            train_path, ds_train, orig_categories_train = self.prepare_fasttext(ds_train, 'train', pool)
+            validate_path, ds_validate, orig_categories_validate = self.prepare_fasttext(ds_validate, 'validate', pool)
+            test_path, ds_test, orig_categories_test = self.prepare_fasttext(ds_test, 'test', pool)
 
         y_true = list(orig_categories_validate)
 
@@ -88,7 +99,8 @@ class ExperimentRunnerFastText(ExperimentRunner):
         # Postprocess labels
         y_pred = [self.fasttextencoder[prediction[0]] for prediction in y_pred]
 
-        evaluator = scorer.HierarchicalScorer(self.parameter['experiment_name'], self.tree)
+        evaluator = scorer.HierarchicalScorer(self.parameter['experiment_name'], self.tree,
+                                              tree_utils=self.tree_utils)
         result_collector.results[self.parameter['experiment_name']] = evaluator.compute_metrics_no_encoding(y_true, y_pred)
 
 
@@ -52,7 +52,8 @@ class ExperimentRunnerRandomForest(ExperimentRunner):
         y_pred = classifier.predict(ds_test['title'])
         y_true = ds_test['category'].values
 
-        evaluator = scorer.HierarchicalScorer(self.parameter['experiment_name'], self.tree)
+        evaluator = scorer.HierarchicalScorer(self.parameter['experiment_name'], self.tree,
+                                              tree_utils=self.tree_utils)
         result_collector.results[self.parameter['experiment_name']] = \
             evaluator.compute_metrics_no_encoding(y_true, y_pred)
 
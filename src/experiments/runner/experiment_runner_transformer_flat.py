@@ -1,14 +1,13 @@
 import time
 from datetime import datetime
 
-from src.data.preprocessing import preprocess
 from src.evaluation import scorer
 from src.experiments.runner.experiment_runner import ExperimentRunner
-from src.models.transformers import utils
 from src.models.transformers.dataset.category_dataset_flat import CategoryDatasetFlat
+from src.models.transformers.length_grouped_trainer import LengthGroupedTrainer
 from src.utils.result_collector import ResultCollector
 
-from transformers import TrainingArguments, Trainer, RobertaConfig
+from transformers import TrainingArguments, RobertaConfig
 
 
 class ExperimentRunnerTransformerFlat(ExperimentRunner):
@@ -17,7 +16,8 @@ class ExperimentRunnerTransformerFlat(ExperimentRunner):
         super().__init__(path, test, experiment_type)
 
         self.load_experiments(path)
-        self.load_datasets()
+        # Load only the columns used for training
+        self.load_datasets(columns=self.text_columns())
 
         self.load_tree()
 
@@ -56,9 +56,7 @@ class ExperimentRunnerTransformerFlat(ExperimentRunner):
         config = RobertaConfig.from_pretrained("roberta-base")
         config.num_labels = number_of_labels
 
-        tokenizer, model = utils.provide_model_and_tokenizer(self.parameter['model_name'],
-                                                             self.parameter['pretrained_model_or_path'],
-                                                             config)
+        tokenizer, model = self.provide_model_and_tokenizer(config)
 
         tf_ds = {}
         for key in self.dataset:
@@ -68,19 +66,12 @@ class ExperimentRunnerTransformerFlat(ExperimentRunner):
                 df_ds = df_ds[:20]
                 self.logger.warning('Run in test mode - dataset reduced to 20 records!')
 
-            if self.parameter['description']:
-                texts = list((df_ds['title'] + ' - ' + df_ds['description']).values)
-            else:
-                texts = df_ds['title'].values
-
-            if self.parameter['preprocessing'] == True:
-                texts = [preprocess(value) for value in texts]
-
+            encodings = self.encode_inputs(key, df_ds, tokenizer)
 
             # Normalize label values
             labels = [value.replace(' ', '_') for value in df_ds['category'].values]
 
-            tf_ds[key] = CategoryDatasetFlat(texts, labels, tokenizer, normalized_encoder)
+            tf_ds[key] = CategoryDatasetFlat(None, labels, tokenizer, normalized_encoder, encodings=encodings)
 
         timestamp = time.time()
         string_timestamp = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d_%H-%M-%S')
@@ -106,12 +97,13 @@ class ExperimentRunnerTransformerFlat(ExperimentRunner):
         )
 
         evaluator = scorer.HierarchicalScorer(self.parameter['experiment_name'], self.tree,
-                                              transformer_decoder=normalized_decoder)
-        trainer = Trainer(
+                                              transformer_decoder=normalized_decoder, tree_utils=self.tree_utils)
+        trainer = LengthGroupedTrainer(
             model=model,  # the instantiated 🤗 Transformers model to be trained
             args=training_args,  # training arguments, defined above
             train_dataset=tf_ds['train'],  # tensorflow_datasets training dataset
             eval_dataset=tf_ds['validate'],  # tensorflow_datasets evaluation dataset
+            data_collator=self.provide_data_collator(tokenizer),  # pad token ids per batch
             compute_metrics=evaluator.compute_metrics_transformers_flat
         )
 
@@ -122,7 +114,7 @@ class ExperimentRunnerTransformerFlat(ExperimentRunner):
             result_collector.results['{}+{}'.format(self.parameter['experiment_name'], split)] \
                 = trainer.evaluate(tf_ds[split])
 
-        trainer.save_model()
+        self.save_model(trainer)
 
         # Persist results
         result_collector.persist_results(timestamp)
@@ -2,15 +2,16 @@ import time
 from datetime import datetime
 import csv
 
-from src.data.preprocessing import preprocess
 from src.evaluation import scorer
 from src.experiments.runner.experiment_runner import ExperimentRunner
-from src.models.transformers import utils
+from src.models.transformers.custom_transformers.modules.hierarchical_classification_head import \
+    encode_hierarchy_paths
 from src.models.transformers.dataset.category_dataset_flat import CategoryDatasetFlat
+from src.models.transformers.length_grouped_trainer import LengthGroupedTrainer
 from src.utils import tree_utils
 from src.utils.result_collector import ResultCollector
 
-from transformers import TrainingArguments, Trainer, RobertaConfig
+from transformers import TrainingArguments, RobertaConfig
 
 from src.utils.tree_utils import TreeUtils
 
@@ -55,47 +56,7 @@ class ExperimentRunnerTransformerHierarchy(ExperimentRunner):
 
     def intialize_hierarchy_paths(self):
         """initialize paths using the provided tree"""
-
-        leaf_nodes = [node[0] for node in self.tree.out_degree if node[1] == 0]
-        paths = [self.tree_utils.determine_path_to_root([node]) for node in leaf_nodes]
-
-        # Normalize paths per level in hierarchy - currently the nodes are of increasing number throughout the tree.
-        normalized_paths = [self.tree_utils.normalize_path_from_root_per_level(path) for path in paths]
-
-        normalized_encoder = {'Root': {'original_key': 0, 'derived_key': 0}}
-        normalized_decoder = { 0: {'original_key': 0, 'value': 'Root'}}
-        decoder = dict(self.tree.nodes(data="name"))
-        encoder = dict([(value, key) for key, value in decoder.items()])
-
-        #initiaize encoders
-        for path, normalized_path in zip(paths, normalized_paths):
-            key = path[-1]
-            derived_key = normalized_path[-1]
-            if key in leaf_nodes:
-                normalized_encoder[decoder[key]] = {'original_key': key, 'derived_key': derived_key}
-                normalized_decoder[derived_key] = {'original_key': key, 'value': decoder[key]}
-
-        oov_path = [[0, 0, 0]]
-        normalized_paths = oov_path + normalized_paths
-
-        #Align length of paths if necessary
-        longest_path = max([len(path) for path in normalized_paths])
-
-        # Sort paths ascending
-        sorted_normalized_paths = []
-        for i in range(len(normalized_paths)):
-            found_path = normalized_paths[0]
-            for path in normalized_paths:
-                for found_node, node in zip(found_path,path):
-                    if found_node > node:
-                        found_path = path
-                        break
-
-            if not (found_path is None):
-                sorted_normalized_paths.append(found_path)
-                normalized_paths.remove(found_path)
-
-        return normalized_encoder, normalized_decoder, sorted_normalized_paths
+        return encode_hierarchy_paths(self.tree, self.tree_utils)
 
     def run(self):
         """Run experiments"""
@@ -108,9 +69,7 @@ class ExperimentRunnerTransformerHierarchy(ExperimentRunner):
         config.num_labels_per_lvl = self.tree_utils.get_number_of_nodes_lvl()
 
 
-        tokenizer, model = utils.provide_model_and_tokenizer(self.parameter['model_name'],
-                                                             self.parameter['pretrained_model_or_path'],
-                                                             config)
+        tokenizer, model = self.provide_model_and_tokenizer(config)
 
         tf_ds = {}
         for key in self.dataset:
@@ -124,19 +83,13 @@ class ExperimentRunnerTransformerHierarchy(ExperimentRunner):
                 df_ds = df_ds[:20]
                 self.logger.warning('Run in test mode - dataset reduced to 20 records!')
 
-            if self.parameter['description']:
-                texts = list((df_ds['title'] + ' - ' + df_ds['description']).values)
-            else:
-                texts = df_ds['title'].values
-
-            if self.parameter['preprocessing'] == True:
-                texts = [preprocess(value) for value in texts]
-
+            encodings = self.encode_inputs(key, df_ds, tokenizer)
 
             # Normalize label values
             labels = [value.replace(' ', '_') for value in df_ds['category'].values]
 
-            tf_ds[key] = CategoryDatasetFlat(texts, labels, tokenizer, normalized_encoder)
+            tf_ds[key] = CategoryDatasetFlat(None, labels, tokenizer, normalized_encoder, per_lvl_labels=True,
+                                             encodings=encodings)
 
         timestamp = time.time()
         string_timestamp = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d_%H-%M-%S')
@@ -162,12 +115,13 @@ class ExperimentRunnerTransformerHierarchy(ExperimentRunner):
         )
 
         evaluator = scorer.HierarchicalScorer(self.parameter['experiment_name'], self.tree,
-                                              transformer_decoder=normalized_decoder)
-        trainer = Trainer(
+                                              transformer_decoder=normalized_decoder, tree_utils=self.tree_utils)
+        trainer = LengthGroupedTrainer(
             model=model,  # the instantiated 🤗 Transformers model to be trained
             args=training_args,  # training arguments, defined above
             train_dataset=tf_ds['train'],  # tensorflow_datasets training dataset
             eval_dataset=tf_ds['validate'],  # tensorflow_datasets evaluation dataset
+            data_collator=self.provide_data_collator(tokenizer),  # pad token ids per batch
             compute_metrics=evaluator.compute_metrics_transformers_flat
         )
 
@@ -178,7 +132,7 @@ class ExperimentRunnerTransformerHierarchy(ExperimentRunner):
             result_collector.results['{}+{}'.format(self.parameter['experiment_name'], split)] \
                 = trainer.evaluate(tf_ds[split])
 
-        trainer.save_model()
+        self.save_model(trainer)
 
         prediction = trainer.predict(tf_ds['test'])
         preds = prediction.predictions.argmax(-1)
@@ -0,0 +1,116 @@
+import time
+from datetime import datetime
+
+from src.evaluation import scorer
+from src.experiments.runner.experiment_runner import ExperimentRunner
+from src.models.transformers.custom_transformers.modules.lcpn_head import compile_lcpn_structure
+from src.models.transformers.dataset.category_dataset_flat import CategoryDatasetFlat
+from src.models.transformers.length_grouped_trainer import LengthGroupedTrainer
+from src.utils.result_collector import ResultCollector
+
+from transformers import TrainingArguments, RobertaConfig
+
+
+class ExperimentRunnerTransformerLCPN(ExperimentRunner):
+
+    def __init__(self, path, test, experiment_type):
+        super().__init__(path, test, experiment_type)
+
+        self.load_experiments(path)
+        # Load only the columns used for training
+        self.load_datasets(columns=self.text_columns())
+
+        self.load_tree()
+
+    def load_experiments(self, path):
+        """Load experiments defined in the json for which a path is provided"""
+        experiments = self.load_configuration(path)
+        self.parameter = experiments['parameter']
+
+    def encode_labels(self, leaves):
+        """Encode & decode labels - leaves are encoded by their index in the leaves of the LCPN structure"""
+        normalized_encoder = {}
+        normalized_decoder = {}
+        decoder = dict(self.tree.nodes(data="name"))
+
+        for derived_key, leaf in enumerate(leaves):
+            normalized_encoder[decoder[leaf]] = {'original_key': leaf, 'derived_key': derived_key}
+            normalized_decoder[derived_key] = {'original_key': leaf, 'value': decoder[leaf]}
+
+        return normalized_encoder, normalized_decoder
+
+    def run(self):
+        """Run experiments"""
+        result_collector = ResultCollector(self.dataset_name, self.experiment_type)
+
+        parents, children, leaves = compile_lcpn_structure(self.tree, self.tree_utils)
+        normalized_encoder, normalized_decoder = self.encode_labels(leaves)
+
+        config = RobertaConfig.from_pretrained("roberta-base")
+        config.num_labels = len(leaves)
+        config.lcpn_parents = parents
+        config.lcpn_children = children
+        config.lcpn_leaves = leaves
+
+        tokenizer, model = self.provide_model_and_tokenizer(config)
+
+        tf_ds = {}
+        for key in self.dataset:
+            df_ds = self.dataset[key]
+            if self.test:
+                # load only subset of the data
+                df_ds = df_ds[:20]
+                self.logger.warning('Run in test mode - dataset reduced to 20 records!')
+
+            encodings = self.encode_inputs(key, df_ds, tokenizer)
+
+            # Normalize label values
+            labels = [value.replace(' ', '_') for value in df_ds['category'].values]
+
+            tf_ds[key] = CategoryDatasetFlat(None, labels, tokenizer, normalized_encoder, encodings=encodings)
+
+        timestamp = time.time()
+        string_timestamp = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d_%H-%M-%S')
+        training_args = TrainingArguments(
+            output_dir='{}/models/{}/transformers/model/{}'
+                .format(self.data_dir, self.dataset_name, self.parameter['experiment_name']),
+            # output directory
+            num_train_epochs=self.parameter['epochs'],  # total # of training epochs
+            learning_rate=self.parameter['learning_rate'],
+            per_device_train_batch_size=self.parameter['per_device_train_batch_size'],
+            # batch size per device during training
+            per_device_eval_batch_size=64,  # batch size for evaluation
+            warmup_steps=500,  # number of warmup steps for learning rate scheduler
+            weight_decay=self.parameter['weight_decay'],  # strength of weight decay
+            logging_dir='{}/models/{}/transformers/logs-{}'.format(self.data_dir, self.dataset_name, string_timestamp),
+            # directory for storing logs
+            save_total_limit=5,  # Save only the last 5 Checkpoints
+            metric_for_best_model=self.parameter['metric_for_best_model'],
+            load_best_model_at_end=True,
+            gradient_accumulation_steps=self.parameter['gradient_accumulation_steps'],
+            seed=self.parameter['seed'],
+            disable_tqdm=True
+        )
+
+        evaluator = scorer.HierarchicalScorer(self.parameter['experiment_name'], self.tree,
+                                              transformer_decoder=normalized_decoder, tree_utils=self.tree_utils)
+        trainer = LengthGroupedTrainer(
+            model=model,  # the instantiated 🤗 Transformers model to be trained
+            args=training_args,  # training arguments, defined above
+            train_dataset=tf_ds['train'],  # tensorflow_datasets training dataset
+            eval_dataset=tf_ds['validate'],  # tensorflow_datasets evaluation dataset
+            data_collator=self.provide_data_collator(tokenizer),  # pad token ids per batch
+            compute_metrics=evaluator.compute_metrics_transformers_flat
+        )
+
+        self.logger.info('Start training!')
+        trainer.train()
+
+        for split in ['train', 'validate', 'test']:
+            result_collector.results['{}+{}'.format(self.parameter['experiment_name'], split)] \
+                = trainer.evaluate(tf_ds[split])
+
+        self.save_model(trainer)
+
+        # Persist results
+        result_collector.persist_results(timestamp)
@@ -1,14 +1,13 @@
 import time
 from datetime import datetime
 
-from src.data.preprocessing import preprocess
 from src.evaluation import scorer
 from src.experiments.runner.experiment_runner import ExperimentRunner
-from src.models.transformers import utils
 from src.models.transformers.dataset.category_dataset_rnn import CategoryDatasetRNN
+from src.models.transformers.length_grouped_trainer import LengthGroupedTrainer
 from src.utils.result_collector import ResultCollector
 
-from transformers import TrainingArguments, Trainer, RobertaConfig
+from transformers import TrainingArguments, RobertaConfig
 
 
 class ExperimentRunnerTransformerRNN(ExperimentRunner):
@@ -17,7 +16,8 @@ class ExperimentRunnerTransformerRNN(ExperimentRunner):
         super().__init__(path, test, experiment_type)
 
         self.load_experiments(path)
-        self.load_datasets()
+        # Load only the columns used for training
+        self.load_datasets(columns=self.text_columns())
 
         self.load_tree()
 
@@ -26,16 +26,6 @@ class ExperimentRunnerTransformerRNN(ExperimentRunner):
         experiments = self.load_configuration(path)
         self.parameter = experiments['parameter']
 
-    def determine_path_to_root(self, nodes):
-        predecessors = self.tree.predecessors(nodes[-1])
-        predecessor = [k for k in predecessors][0]
-
-        if predecessor == self.root:
-            nodes.reverse()
-            return nodes
-        nodes.append(predecessor)
-        return self.determine_path_to_root(nodes)
-
     def normalize_path_from_root_per_parent(self, path):
         """Normalize label values per parent node"""
         found_successor = self.root
@@ -67,7 +57,7 @@ class ExperimentRunnerTransformerRNN(ExperimentRunner):
         longest_path = 0
         for key in encoder:
             if key in leaf_nodes:
-                path = self.determine_path_to_root([encoder[key]])
+                path = self.tree_utils.determine_path_to_root([encoder[key]])
                 if 'exploit_hierarchy' in self.parameter and self.parameter['exploit_hierarchy']:
                     path = self.normalize_path_from_root_per_parent(path)
                 
@@ -99,9 +89,10 @@ class ExperimentRunnerTransformerRNN(ExperimentRunner):
 
         config = RobertaConfig.from_pretrained("roberta-base")
         config.num_labels = number_of_labels
+        # Number of levels the RNN head is unrolled for label free inference
+        config.num_levels = len(self.tree_utils.levels)
 
-        tokenizer, model = utils.provide_model_and_tokenizer(self.parameter['model_name'],
-                                                             self.parameter['pretrained_model_or_path'], config=config)
+        tokenizer, model = self.provide_model_and_tokenizer(config)
 
         tf_ds = {}
         for key in self.dataset:
@@ -111,18 +102,12 @@ class ExperimentRunnerTransformerRNN(ExperimentRunner):
                 df_ds = df_ds[:10]
                 self.logger.warning('Run in test mode - dataset reduced to 10 records!')
 
-            if self.parameter['description']:
-                texts = list((df_ds['title'] + ' - ' + df_ds['description']).values)
-            else:
-                texts = df_ds['title'].values
-
-            if self.parameter['preprocessing'] == True:
-                texts = [preprocess(value) for value in texts]
+            encodings = self.encode_inputs(key, df_ds, tokenizer)
 
             # Normalize label values
             labels = [value.replace(' ', '_') for value in df_ds['category'].values]
 
-            tf_ds[key] = CategoryDatasetRNN(texts, labels, tokenizer, normalized_encoder)
+            tf_ds[key] = CategoryDatasetRNN(None, labels, tokenizer, normalized_encoder, encodings=encodings)
 
         timestamp = time.time()
         string_timestamp = datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d_%H-%M-%S')
@@ -148,12 +133,13 @@ class ExperimentRunnerTransformerRNN(ExperimentRunner):
         )
 
         evaluator = scorer.HierarchicalScorer(self.parameter['experiment_name'], self.tree,
-                                              transformer_decoder=normalized_decoder)
-        trainer = Trainer(
+                                              transformer_decoder=normalized_decoder, tree_utils=self.tree_utils)
+        trainer = LengthGroupedTrainer(
             model=model,  # the instantiated 🤗 Transformers model to be trained
             args=training_args,  # training arguments, defined above
             train_dataset=tf_ds['train'],  # tensorflow_datasets training dataset
             eval_dataset=tf_ds['validate'],  # tensorflow_datasets evaluation dataset
+            data_collator=self.provide_data_collator(tokenizer),  # pad token ids per batch
             compute_metrics=evaluator.compute_metrics_transformers_rnn
         )
 
@@ -164,7 +150,7 @@ class ExperimentRunnerTransformerRNN(ExperimentRunner):
             result_collector.results['{}+{}'.format(self.parameter['experiment_name'], split)] \
                 = trainer.evaluate(tf_ds[split])
 
-        trainer.save_model()
+        self.save_model(trainer)
 
         # Persist results
         result_collector.persist_results(timestamp)
@@ -0,0 +1,29 @@
+import logging
+
+import click
+
+from src.experiments.run_experiments import create_runner
+from src.models.transformers import utils
+
+
+@click.command()
+@click.option('--configuration', help='Configuration of the transformer experiment')
+@click.option('--experiment_type', help='Experiment Type - transformer-based(-rnn/-hierarchy)')
+@click.option('--batch_size', help='Number of texts encoded per batch', type=int, default=256)
+def main(configuration, experiment_type, batch_size):
+    """Run the encoder of an experiment once per split and cache the <s> embeddings as float16 arrays.
+        Experiments with the parameter head_only train their head on these embeddings."""
+    logger = logging.getLogger(__name__)
+
+    runner = create_runner(configuration, False, experiment_type)
+    tokenizer = utils.roberta_base_tokenizer()
+    for split, df_ds in runner.dataset.items():
+        embeddings = runner.encode_embeddings(split, df_ds, tokenizer, batch_size=batch_size)
+        logger.info('{} split - {} embeddings of {}!'.format(split, len(embeddings), runner.encoder_model_or_path()))
+
+
+if __name__ == '__main__':
+    log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
@@ -1,14 +1,22 @@
 """Dictionary based approach --> serves as baseline"""
+import hashlib
+import json
 import logging
+import os
+from pathlib import Path
+
 import nltk
+import numpy as np
 
 from nltk.stem import WordNetLemmatizer
 from nltk.corpus import wordnet
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import CountVectorizer
 
 
 class DictClassifier(object):
 
-    def __init__(self, dataset, most_frequent_leaf, tree):
+    def __init__(self, dataset, most_frequent_leaf, tree, data_dir=None):
 
         self.logger = logging.getLogger(__name__)
 
@@ -16,21 +24,45 @@ class DictClassifier(object):
         self.synonyms_dict = None
         self.most_frequent_leaf = most_frequent_leaf
         self.tree = tree
+        self.data_dir = data_dir if data_dir is not None else os.environ.get('DATA_DIR')
 
+        # The WordNet corpus is only loaded if a word is lemmatized that is not known yet
         self.wnl = WordNetLemmatizer()
+        self.lemmas = {}
+        # Prepared class words & inverted indices per (synonyms, lemmatize) configuration
+        self.classes_prep = {}
+        self.indices = {}
         self.generate_synonyms(dataset)
         self.logger.info('Initialized Dict-classifier for dataset {}'.format(dataset))
 
 
 
-    def generate_synonyms(self, dataset):
+    def synonyms_path(self, leaf_nodes):
+        """Path of the persisted synonyms & lemmas - keyed by a hash of the leaf classes of the tree"""
+        if self.data_dir is None:
+            return None
 
-        nltk.download('wordnet')
+        tree_hash = hashlib.sha1(json.dumps(leaf_nodes).encode('utf-8')).hexdigest()
+        return Path(self.data_dir).joinpath('data', 'processed', self.dataset, 'cache',
+                                            'dict_synonyms_{}.json'.format(tree_hash))
 
+    def generate_synonyms(self, dataset):
+        """Load synonyms & lemmas of all class words - WordNet is only queried if they are not persisted yet"""
         leaf_nodes_wdc = [node[0] for node in self.tree.out_degree(self.tree.nodes()) if node[1] == 0]
         decoder = dict(self.tree.nodes(data="name"))
         leaf_nodes_wdc = [decoder[node] for node in leaf_nodes_wdc]
 
+        path = self.synonyms_path(leaf_nodes_wdc)
+        if path is not None and path.exists():
+            with open(path) as f:
+                persisted = json.load(f)
+            self.synonyms_dict = persisted['synonyms']
+            self.lemmas.update(persisted['lemmas'])
+            self.logger.info('Loaded synonyms for dataset {} from {}'.format(dataset, path))
+            return
+
+        nltk.download('wordnet')
+
         self.synonyms_dict = {}
 
         for classname in leaf_nodes_wdc:
@@ -41,8 +73,29 @@ class DictClassifier(object):
                     synonyms.append(lem.name().replace('_', ' ').lower())
             self.synonyms_dict[classname] = synonyms
 
+        # Lemmatize all words that can occur in the prepared classes
+        for classname, synonyms in self.synonyms_dict.items():
+            for word in set(classname.lower().split()).union(set(' '.join(synonyms).split())):
+                self.lemmatize(word)
+
         self.logger.info('Loaded synonyms for dataset {}'.format(dataset))
 
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first - concurrent runs never see partial files
+            tmp_path = path.with_suffix('.{}.tmp'.format(os.getpid()))
+            with open(tmp_path, 'w') as f:
+                json.dump({'synonyms': self.synonyms_dict, 'lemmas': self.lemmas}, f)
+            os.replace(tmp_path, path)
+            self.logger.info('Persisted synonyms for dataset {} at {}'.format(dataset, path))
+
+    def lemmatize(self, word):
+        lemma = self.lemmas.get(word)
+        if lemma is None:
+            lemma = self.wnl.lemmatize(word)
+            self.lemmas[word] = lemma
+        return lemma
+
     def count_occurrences(self, list_of_words, target_string):
         if len(list_of_words) == 0:
             return 0
@@ -51,29 +104,100 @@ class DictClassifier(object):
             count = sum([target_string.count(word) for word in list_of_words])
             return count / len(list_of_words)
 
-    def classify_dictionary_based(self, test_data, fallback_classifier, synonyms, lemmatize):
+    def prepare_classes(self, synonyms, lemmatize):
+        """Words of each class - prepared once per configuration"""
+        if (synonyms, lemmatize) not in self.classes_prep:
+            classes_prep = {}
+            for classname in self.synonyms_dict.keys():
+                classes_prep[classname] = set(classname.lower().split())
+                if synonyms:
+                    classes_prep[classname] = classes_prep[classname].union(
+                        set(' '.join(self.synonyms_dict[classname]).split()))
+                if lemmatize:
+                    classes_prep[classname] = [self.lemmatize(word) for word in classes_prep[classname]]
+
+            self.classes_prep[(synonyms, lemmatize)] = classes_prep
+
+        return self.classes_prep[(synonyms, lemmatize)]
+
+    def build_index(self, synonyms, lemmatize):
+        """Inverted index word --> classes as sparse word x class matrix
+
+            Class words are tokenized like titles. Each occurrence of a word is weighted by 1 / number of class
+            words, such that a title x word count matrix multiplied by the index yields the relative counts."""
+        if (synonyms, lemmatize) not in self.indices:
+            analyzer = CountVectorizer().build_analyzer()
+            classes_prep = self.prepare_classes(synonyms, lemmatize)
+
+            word_index = {}
+            rows, columns, weights = [], [], []
+            for column, classname in enumerate(classes_prep.keys()):
+                words = classes_prep[classname]
+                for word in words:
+                    for token in analyzer(word):
+                        rows.append(word_index.setdefault(token, len(word_index)))
+                        columns.append(column)
+                        weights.append(1 / len(words))
+
+            # Duplicate entries are summed up
+            index = csr_matrix((weights, (rows, columns)), shape=(len(word_index), len(classes_prep)))
+            self.indices[(synonyms, lemmatize)] = (word_index, index)
+
+        return self.indices[(synonyms, lemmatize)]
+
+    def score_titles(self, test_data, synonyms, lemmatize):
+        """Relative word counts of all titles & classes as sparse title x class matrix
+
+            Titles are tokenized once. Each distinct title token is lemmatized at most once and mapped to the
+            class words of the inverted index. The scores can be reused as a cheap pre-filter of candidate classes."""
+        word_index, index = self.build_index(synonyms, lemmatize)
+
+        vectorizer = CountVectorizer()
+        title_counts = vectorizer.fit_transform(test_data)
+
+        # Map title vocabulary to class words
+        rows, columns = [], []
+        for token, row in vectorizer.vocabulary_.items():
+            word = self.lemmatize(token) if lemmatize else token
+            if word in word_index:
+                rows.append(row)
+                columns.append(word_index[word])
+        vocabulary_mapping = csr_matrix((np.ones(len(rows)), (rows, columns)),
+                                        shape=(len(vectorizer.vocabulary_), len(word_index)))
+
+        scores = title_counts @ (vocabulary_mapping @ index)
+        scores.sort_indices()
+
+        return scores
+
+    def classify_dictionary_based(self, test_data, fallback_classifier, synonyms, lemmatize, index=False):
+        """Assign the class whose words occur most often in a title
+
+            By default class words are counted as substrings of each title. If index is set, titles are tokenized
+            and all titles are scored at once via the inverted index - class words must then match whole tokens."""
         y_pred = []
         count = 0
-        # Prepare class strings
-        classes_prep = {}
-        for classname in self.synonyms_dict.keys():
-            classes_prep[classname] = set(classname.lower().split())
-            if synonyms:
-                classes_prep[classname] = classes_prep[classname].union(
-                    set(' '.join(self.synonyms_dict[classname]).split()))
-            if lemmatize:
-                classes_prep[classname] = [self.wnl.lemmatize(word) for word in classes_prep[classname]]
-
-        # Prepare class strings
+        classes_prep = self.prepare_classes(synonyms, lemmatize)
+        classnames = list(classes_prep.keys())
+
+        if index:
+            scores = self.score_titles(test_data, synonyms, lemmatize)
+            max_classes = np.asarray(scores.argmax(axis=1)).ravel()
+            max_word_counts = scores.max(axis=1).toarray().ravel()
+
         to_predict_by_fallback = []
-        for text_of_instance in test_data:
-            max_word = None
-            max_word_count = 0
-            for classname in self.synonyms_dict.keys():
-                word_rel_count = self.count_occurrences(classes_prep[classname], text_of_instance)
-                if word_rel_count > max_word_count:
-                    max_word_count = word_rel_count
-                    max_word = classname
+        for i, text_of_instance in enumerate(test_data):
+            if index:
+                max_word = classnames[max_classes[i]]
+                max_word_count = max_word_counts[i]
+            else:
+                max_word = None
+                max_word_count = 0
+                for classname in classnames:
+                    word_rel_count = self.count_occurrences(classes_prep[classname], text_of_instance)
+                    if word_rel_count > max_word_count:
+                        max_word_count = word_rel_count
+                        max_word = classname
 
             if max_word_count == 0:
                 count = count + 1
@@ -87,12 +211,11 @@ class DictClassifier(object):
 
         if fallback_classifier and len(to_predict_by_fallback) > 0:
             # Use fallback only in case it is necessary!
-            fallback_predictions = fallback_classifier.predict(to_predict_by_fallback)
+            fallback_predictions = iter(fallback_classifier.predict(to_predict_by_fallback))
 
             for i, p in enumerate(y_pred):
                 if p == 0:
-                    y_pred[i] = fallback_predictions[0]
-                    fallback_predictions = fallback_predictions[1:]
+                    y_pred[i] = next(fallback_predictions)
 
         self.logger.info('Most frequent class/fallback classifier was used %d times' % count)
 
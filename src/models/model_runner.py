@@ -5,8 +5,7 @@ from pathlib import Path
 from sys import platform
 
 import os
-import pandas as pd
-
+from src.data import split_storage
 from src.utils.tree_utils import TreeUtils
 
 
@@ -26,11 +25,13 @@ class ModelRunner:
 
         self.experiment_type = experiment_type
         self.dataset = {}
+        self.split_paths = {}
         self.parameter = None
         self.dataset_name = None
 
         self.tree = None
         self.root = None
+        self.tree_utils = None
 
     def initialize_logging(self, path):
         # Extract experiment name from config for logging
@@ -56,15 +57,13 @@ class ModelRunner:
 
         return experiments
 
-    def load_datasets(self):
-        """Load dataset for the given experiments"""
+    def load_datasets(self, columns=None):
+        """Load dataset for the given experiments - optionally only the given columns"""
         splits = ['train', 'validate', 'test']
 
         for split in splits:
-            relative_path = 'data/processed/{}/split/raw/{}_data_{}.pkl'.format(self.dataset_name, split, self.dataset_name)
-            data_dir = Path(self.data_dir)
-            file_path = data_dir.joinpath(relative_path)
-            self.dataset[split] = pd.read_pickle(file_path)
+            self.dataset[split] = split_storage.load_split(self.data_dir, self.dataset_name, split, columns=columns)
+            self.split_paths[split] = split_storage.split_path(self.data_dir, self.dataset_name, split)
 
         self.logger.info('Loaded dataset {}!'.format(self.dataset_name))
 
@@ -78,5 +77,6 @@ class ModelRunner:
 
         self.root = [node[0] for node in self.tree.in_degree if node[1] == 0][0]
 
+        # Compile tree index once - reused by label encoding and scoring
         self.tree_utils = TreeUtils(self.tree)
 
@@ -0,0 +1,138 @@
+import torch
+from torch import nn
+from torch.nn import CrossEntropyLoss
+from transformers import RobertaForSequenceClassification
+from transformers.modeling_outputs import SequenceClassifierOutput
+from transformers.modeling_roberta import RobertaClassificationHead
+
+from src.models.transformers.custom_transformers.modules.hierarchical_classification_head import \
+    HierarchicalClassificationHead
+from src.models.transformers.custom_transformers.modules.lcpn_head import LCPNHead
+from src.models.transformers.custom_transformers.modules.roberta_rnn_head import RobertaRNNHead
+from src.models.transformers.custom_transformers.roberta_for_hierarchical_classification_hierarchy import \
+    RobertaForHierarchicalClassificationHierarchy
+from src.models.transformers.custom_transformers.roberta_for_hierarchical_classification_lcpn import \
+    RobertaForHierarchicalClassificationLCPN
+from src.models.transformers.custom_transformers.roberta_for_hierarchical_classification_rnn import \
+    RobertaForHierarchicalClassificationRNN
+
+
+class RobertaHeadOnlyModel(nn.Module):
+    """Head of a RoBERTa model trained on cached <s> embeddings (see EmbeddingCache) - the encoder is skipped.
+
+        The head is stored as classifier like in the full model, such that trained heads can be combined with the
+        encoder the embeddings were extracted with."""
+    model_class = None
+
+    def __init__(self, config):
+        super().__init__()
+        self.config = config
+        self.num_labels = config.num_labels
+
+    def forward(self, embeddings=None, labels=None, return_dict=None, **kwargs):
+        return_dict = return_dict if return_dict is not None else self.config.use_return_dict
+
+        logits, loss = self.classify(embeddings.float(), labels, **kwargs)
+
+        if not return_dict:
+            output = (logits,)
+            return ((loss,) + output) if loss is not None else output
+
+        return SequenceClassifierOutput(loss=loss, logits=logits)
+
+    def classify(self, sequence_output, labels, **kwargs):
+        """Implemented in child classes - returns logits and loss"""
+
+    def assemble(self, encoder_model_or_path):
+        """Combine the trained head with the encoder the embeddings were extracted with into a full model"""
+        model = self.model_class.from_pretrained(encoder_model_or_path, config=self.config)
+        model.classifier.load_state_dict(self.classifier.state_dict())
+
+        return model
+
+
+class RobertaHeadOnlyForSequenceClassification(RobertaHeadOnlyModel):
+    model_class = RobertaForSequenceClassification
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.classifier = RobertaClassificationHead(config)
+
+    def classify(self, sequence_output, labels, **kwargs):
+        # The classification head selects the <s> token of the sequence itself
+        logits = self.classifier(sequence_output.unsqueeze(1))
+
+        loss = None
+        if labels is not None:
+            loss_fct = CrossEntropyLoss()
+            loss = loss_fct(logits.view(-1, self.num_labels), labels.view(-1))
+
+        return logits, loss
+
+
+class RobertaHeadOnlyForHierarchicalClassificationRNN(RobertaHeadOnlyModel):
+    model_class = RobertaForHierarchicalClassificationRNN
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.classifier = RobertaRNNHead(config, self.num_labels)
+
+    def classify(self, sequence_output, labels, num_levels=None, **kwargs):
+        if labels is not None:
+            num_levels = labels.size(1)
+        elif num_levels is None:
+            num_levels = getattr(self.config, 'num_levels', None)
+        if num_levels is None:
+            raise ValueError('Provide labels or the number of levels to unroll the RNN head!')
+
+        logits = self.classifier.unroll(sequence_output, num_levels)
+
+        loss = None
+        if labels is not None:
+            loss_fct = CrossEntropyLoss()
+            loss = sum([loss_fct(logits[:, i], labels[:, i]) for i in range(num_levels)])
+
+        return logits, loss
+
+
+class RobertaHeadOnlyForHierarchicalClassificationHierarchy(RobertaHeadOnlyModel):
+    model_class = RobertaForHierarchicalClassificationHierarchy
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.classifier = HierarchicalClassificationHead(config)
+
+    def classify(self, sequence_output, labels, **kwargs):
+        if labels is not None:
+            return self.classifier(sequence_output, labels)
+
+        # Without labels predict along the longest paths only
+        sequence_output = self.classifier.dropout(sequence_output)
+        all_logits = torch.cat([nodes(sequence_output) for nodes in self.classifier.nodes], dim=1)
+        return self.classifier.predict_along_paths(all_logits, len(self.classifier.paths_per_lvl)), None
+
+
+class RobertaHeadOnlyForHierarchicalClassificationLCPN(RobertaHeadOnlyModel):
+    model_class = RobertaForHierarchicalClassificationLCPN
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.classifier = LCPNHead(config)
+
+    def classify(self, sequence_output, labels, **kwargs):
+        return self.classifier(sequence_output, labels)
+
+
+HEAD_ONLY_MODELS = {
+    'roberta-base': RobertaHeadOnlyForSequenceClassification,
+    'roberta-base-hierarchy-rnn': RobertaHeadOnlyForHierarchicalClassificationRNN,
+    'roberta-base-hierarchy': RobertaHeadOnlyForHierarchicalClassificationHierarchy,
+    'roberta-base-hierarchy-lcpn': RobertaHeadOnlyForHierarchicalClassificationLCPN
+}
+
+
+def provide_head_only_model(name, config):
+    if name not in HEAD_ONLY_MODELS:
+        raise ValueError('No head only model available for {}!'.format(name))
+
+    return HEAD_ONLY_MODELS[name](config)
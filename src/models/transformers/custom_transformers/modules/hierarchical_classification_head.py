@@ -1,8 +1,43 @@
+import numpy as np
 import torch
 from torch import nn
+import torch.nn.functional as F
 from torch.nn import CrossEntropyLoss
 
 
+def encode_hierarchy_paths(tree, tree_utils):
+    """Encode & decode leaves by their normalized label on the last lvl of their path - returns the encoder, the
+        decoder and the sorted normalized paths (see config.paths)"""
+    leaf_nodes = [node[0] for node in tree.out_degree if node[1] == 0]
+
+    # Normalize paths per level in hierarchy - currently the nodes are of increasing number throughout the tree.
+    normalized_paths = tree_utils.normalize_paths_from_root_per_level(leaf_nodes)
+    path_lengths = tree_utils.depth[leaf_nodes]
+
+    oov_path = np.zeros((1, normalized_paths.shape[1]), dtype=normalized_paths.dtype)
+
+    normalized_encoder = {'Root': {'original_key': 0, 'derived_key': 0, 'derived_path': oov_path[0].tolist()}}
+    normalized_decoder = {0: {'original_key': 0, 'value': 'Root'}}
+    decoder = dict(tree.nodes(data="name"))
+
+    # Derived path contains the normalized label per lvl - the label of shorter paths is repeated on deeper lvls
+    # like in HierarchicalClassificationHead.initialize_leaf_to_level_label, such that all paths have equal length
+    for key, normalized_path, path_length in zip(leaf_nodes, normalized_paths, path_lengths):
+        derived_key = int(normalized_path[path_length - 1])
+        derived_path = normalized_path.copy()
+        derived_path[path_length:] = derived_key
+        normalized_encoder[decoder[key]] = {'original_key': key, 'derived_key': derived_key,
+                                            'derived_path': derived_path.tolist()}
+        normalized_decoder[derived_key] = {'original_key': key, 'value': decoder[key]}
+
+    normalized_paths = np.concatenate([oov_path, normalized_paths])
+
+    # Sort paths ascending & remove padding
+    sorted_normalized_paths = [path[path >= 0].tolist() for path in tree_utils.sort_paths(normalized_paths)]
+
+    return normalized_encoder, normalized_decoder, sorted_normalized_paths
+
+
 class HierarchicalClassificationHead(nn.Module):
     """Head for hierarchical classification tasks"""
 
@@ -19,62 +54,68 @@ class HierarchicalClassificationHead(nn.Module):
 
         self.dropout = nn.Dropout(config.hidden_dropout_prob)
 
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        # create a weight matrix and bias vector for each node in the tree
-        self.nodes = {}
+        # create a weight matrix and bias vector for each lvl in the tree - one row per node on the lvl
+        self.nodes = nn.ModuleList([nn.Linear(self.hidden_size, self.num_labels_per_lvl[lvl])
+                                    for lvl in self.num_labels_per_lvl])
+
+        # Precompute index of the nodes along each path into the concatenated logits of all lvls
+        offsets = [0]
         for lvl in self.num_labels_per_lvl:
-            self.nodes[lvl] = nn.ModuleList([nn.Linear(self.hidden_size, 1).to(device) for i in range(self.num_labels_per_lvl[lvl])])
+            offsets.append(offsets[-1] + self.num_labels_per_lvl[lvl])
+        offsets = torch.tensor(offsets, dtype=torch.long)
+
+        # Shorter paths are padded with the index of an appended column of certain nodes (see predict_along_paths)
+        for lvl in self.paths_per_lvl:
+            path_index = torch.full((len(self.paths_per_lvl[lvl]), lvl), offsets[-1].item(), dtype=torch.long)
+            for i, path in enumerate(self.paths_per_lvl[lvl]):
+                path_index[i, :len(path)] = torch.tensor(path, dtype=torch.long) + offsets[:len(path)]
+            self.register_buffer('path_index_lvl_{}'.format(lvl), path_index, persistent=False)
+
+        self.register_buffer('leaf_to_level_label', self.initialize_leaf_to_level_label(), persistent=False)
 
     def forward(self, input, labels):
         # Make a prediction for all nodes in the tree and full paths
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         loss_fct = CrossEntropyLoss()
         loss = None
-        logits = None
 
         input = self.dropout(input)
 
         # Make prediction for each lvl in hierarchy
-        for lvl in self.nodes:
-            logit_list = [node(input) for node in self.nodes[lvl]]
-            logits = torch.stack(logit_list, dim=1).to(device)
-
-            updated_labels = self.update_label_per_lvl(labels, lvl, True)
+        logits_per_lvl = [nodes(input) for nodes in self.nodes]
+        for lvl, logits in enumerate(logits_per_lvl, start=1):
+            updated_labels = self.update_label_per_lvl(labels, lvl)
 
             if loss is None:
                 loss = loss_fct(logits.view(-1, self.num_labels_per_lvl[lvl]), updated_labels.view(-1))
             else:
                 loss += loss_fct(logits.view(-1, self.num_labels_per_lvl[lvl]), updated_labels.view(-1))
 
+        # Predict along the longest paths
+        lvl = len(self.paths_per_lvl)
+        logits = self.predict_along_paths(torch.cat(logits_per_lvl, dim=1), lvl)
 
-        #lvl = 3 --> longest path
-        logit_list = [self.predict_along_path(input,path, 3) for path in self.paths_per_lvl[3]]
-        logits = torch.stack(logit_list, dim=1).to(device)
-
-        updated_labels = self.update_label_per_lvl(labels, 3, True)
+        updated_labels = self.update_label_per_lvl(labels, lvl)
 
         if loss is None:
-            loss = loss_fct(logits.view(-1, self.num_labels_per_lvl[3]), updated_labels.view(-1))
+            loss = loss_fct(logits.view(-1, self.num_labels_per_lvl[lvl]), updated_labels.view(-1))
         else:
-            loss += loss_fct(logits.view(-1, self.num_labels_per_lvl[3]), updated_labels.view(-1))
+            loss += loss_fct(logits.view(-1, self.num_labels_per_lvl[lvl]), updated_labels.view(-1))
 
         #Return only logits of last run to receive only valid paths!
         return logits, loss
 
     def forward_along_paths(self, input, labels):
         # Make a prediction along all paths in the tree
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         loss_fct = CrossEntropyLoss()
         loss = None
         logits = None
 
         input = self.dropout(input)
+        all_logits = torch.cat([nodes(input) for nodes in self.nodes], dim=1)
 
         # Make prediction for each lvl in hierarchy along path to hierarchy lvl
         for lvl in self.paths_per_lvl:
-        #lvl = 3
-            logit_list = [self.predict_along_path(input,path, lvl) for path in self.paths_per_lvl[lvl]]
-            logits = torch.stack(logit_list, dim=1).to(device)
+            logits = self.predict_along_paths(all_logits, lvl)
 
             updated_labels = self.update_label_per_lvl(labels, lvl)
 
@@ -86,13 +127,14 @@ class HierarchicalClassificationHead(nn.Module):
         #Return only logits of last run to receive only valid paths!
         return logits, loss
 
-    def predict_along_path(self, input, path, lvl):
-        # Make predictions along path
-        logits = [torch.sigmoid(self.nodes[i+1][path[i]](input)) for i in range(lvl)]
-        logits = torch.cat(logits, dim=1)
+    def predict_along_paths(self, all_logits, lvl):
+        # Gather logits of the nodes along all paths up to the given lvl
+        path_index = getattr(self, 'path_index_lvl_{}'.format(lvl))
+        # Append zero column (log probability of a certain node) for the padding of shorter paths
+        log_probabilities = F.pad(F.logsigmoid(all_logits), (0, 1))[:, path_index]
 
-        # Calculate logit for given input and path
-        logit = torch.prod(logits, dim=1)
+        # Product of the node probabilities along each path - computed as sum in log space
+        logit = torch.exp(log_probabilities.sum(dim=-1))
 
         return logit
 
@@ -111,17 +153,18 @@ class HierarchicalClassificationHead(nn.Module):
 
         return paths_per_lvl
 
-    def update_label_per_lvl(self, labels, lvl, all_paths=False):
-        #Move this function out of training in the future!!!!
-        unique_values = labels
-        updated_labels = labels.clone()
-        for value in unique_values:
-            searched_path = self.paths_per_lvl[len(self.paths_per_lvl)][value]
-            if len(searched_path) >= lvl:
-                update_value = searched_path[lvl - 1]
-                updated_labels[updated_labels==value] = update_value
+    def initialize_leaf_to_level_label(self):
+        # Lookup of the label on each lvl for all leaf labels - labels of shorter paths are kept on deeper lvls
+        leaf_paths = self.paths_per_lvl[len(self.paths_per_lvl)]
+        leaf_to_level_label = torch.arange(len(leaf_paths), dtype=torch.long).repeat(len(self.paths_per_lvl), 1)
+        for leaf, path in enumerate(leaf_paths):
+            leaf_to_level_label[:len(path), leaf] = torch.tensor(path, dtype=torch.long)
+
+        return leaf_to_level_label
 
-        if not all_paths:
-            updated_labels = [path for path in updated_labels if len(path) == lvl]
+    def update_label_per_lvl(self, labels, lvl):
+        # Labels per lvl are either provided by the dataset or looked up for the leaf labels
+        if labels.dim() > 1:
+            return labels[:, lvl - 1]
 
-        return updated_labels
\ No newline at end of file
+        return self.leaf_to_level_label[lvl - 1].index_select(0, labels.view(-1))
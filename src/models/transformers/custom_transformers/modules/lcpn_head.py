@@ -0,0 +1,137 @@
+import torch
+from torch import nn
+import torch.nn.functional as F
+
+
+def compile_lcpn_structure(tree, tree_utils):
+    """Parent nodes (root first), their children and the leaves of the tree - stored in the model config"""
+    parents = [node for nodes in [[tree_utils.root]] + tree_utils.levels for node in nodes
+               if tree.out_degree(node) > 0]
+    children = [list(tree.successors(node)) for node in parents]
+    leaves = [node for node in tree.nodes() if tree.out_degree(node) == 0]
+
+    return [int(node) for node in parents], [[int(node) for node in nodes] for nodes in children], \
+        [int(node) for node in leaves]
+
+
+class LCPNHead(nn.Module):
+    """Local classifier per parent node - each parent node predicts one of its children.
+
+        The output layers of all parent nodes are packed into a single weight matrix with one row per child, such
+        that the logits of all local classifiers are computed by one matrix multiplication. The block of a parent
+        is selected via gather using a precomputed (parent, child) index."""
+
+    def __init__(self, config):
+        super(LCPNHead, self).__init__()
+
+        self.hidden_size = config.hidden_size
+        self.dropout = nn.Dropout(config.hidden_dropout_prob)
+        self.dense = nn.Linear(config.hidden_size, config.hidden_size)
+
+        parents, children, leaves = config.lcpn_parents, config.lcpn_children, config.lcpn_leaves
+        num_parents = len(parents)
+        max_children = max([len(nodes) for nodes in children])
+        num_rows = sum([len(nodes) for nodes in children])
+
+        self.weight = nn.Parameter(torch.empty(num_rows, config.hidden_size))
+        self.bias = nn.Parameter(torch.zeros(num_rows))
+        nn.init.normal_(self.weight, std=getattr(config, 'initializer_range', 0.02))
+
+        # Row of each (parent, child) in the packed weight matrix - blocks are padded to the largest parent
+        child_index = torch.zeros((num_parents, max_children), dtype=torch.long)
+        child_mask = torch.zeros((num_parents, max_children), dtype=torch.bool)
+        child_nodes = torch.full((num_parents, max_children), -1, dtype=torch.long)
+
+        num_nodes = max(parents + leaves) + 1
+        parent_of_node = torch.full((num_nodes,), -1, dtype=torch.long)  # Local classifier of each parent node
+        position = {}  # (parent, position) of each child node
+        row = 0
+        for parent, nodes in enumerate(children):
+            parent_of_node[parents[parent]] = parent
+            for m, node in enumerate(nodes):
+                child_index[parent, m] = row
+                child_mask[parent, m] = True
+                child_nodes[parent, m] = node
+                position[node] = (parent, m)
+                row += 1
+
+        # Index of the local decision on each level of the leaf paths into the flattened (parent, child) table
+        # Paths are padded with the index of an additional zero column
+        self.num_levels = 0
+        leaf_paths = []
+        for leaf in leaves:
+            path = []
+            node = leaf
+            while node in position:
+                parent, m = position[node]
+                path.insert(0, parent * max_children + m)
+                node = parents[parent]
+            leaf_paths.append(path)
+            self.num_levels = max(self.num_levels, len(path))
+
+        padding = num_parents * max_children
+        leaf_index = torch.tensor([path + [padding] * (self.num_levels - len(path)) for path in leaf_paths],
+                                  dtype=torch.long)
+
+        self.register_buffer('child_index', child_index, persistent=False)
+        self.register_buffer('child_mask', child_mask, persistent=False)
+        self.register_buffer('child_nodes', child_nodes, persistent=False)
+        self.register_buffer('parent_of_node', parent_of_node, persistent=False)
+        self.register_buffer('leaf_index', leaf_index, persistent=False)
+
+    def forward(self, input, labels=None):
+        """Score all leaves by the sum of the local log probabilities along their paths - labels are leaf indices"""
+        log_probabilities = self.local_log_probabilities(input)
+
+        # Append zero column for the padding of shorter paths
+        log_probabilities = F.pad(log_probabilities.flatten(1), (0, 1))
+        logits = log_probabilities[:, self.leaf_index].sum(dim=-1)
+
+        loss = None
+        if labels is not None:
+            # Negative log likelihood of the local decisions along the labelled paths
+            label_index = self.leaf_index.index_select(0, labels.view(-1))
+            valid = label_index < log_probabilities.size(1) - 1
+            loss = -log_probabilities.gather(1, label_index)[valid].sum() / valid.sum()
+
+        return logits, loss
+
+    def compute_logits(self, input):
+        """Logits of all children of all parent nodes - one column per row of the packed weight matrix"""
+        input = self.dropout(input)
+        input = torch.tanh(self.dense(input))
+        input = self.dropout(input)
+
+        return F.linear(input, self.weight, self.bias)
+
+    def local_log_probabilities(self, input):
+        """Log probabilities of each local classifier - shape (batch, parents, max children)"""
+        logits = self.compute_logits(input)[:, self.child_index]
+        logits = logits.masked_fill(~self.child_mask, float('-inf'))
+
+        # Padded children receive no probability mass - set to 0 to keep sums finite
+        return torch.log_softmax(logits, dim=-1).masked_fill(~self.child_mask, 0.)
+
+    def predict_top_down(self, input):
+        """Greedy top down prediction - starting at the root, the classifier of the previously predicted node is
+            selected per sample via gather. Returns nodes & probabilities per level, padded with -1 & 0."""
+        logits = self.compute_logits(input)
+
+        parents = torch.zeros(input.size(0), dtype=torch.long, device=input.device)
+        active = torch.ones(input.size(0), dtype=torch.bool, device=input.device)
+        nodes_per_lvl, probabilities_per_lvl = [], []
+        for _ in range(self.num_levels):
+            local_logits = logits.gather(1, self.child_index[parents])
+            local_logits = local_logits.masked_fill(~self.child_mask[parents], float('-inf'))
+            probabilities, positions = torch.softmax(local_logits, dim=-1).max(dim=-1)
+
+            nodes = self.child_nodes[parents, positions]
+            nodes_per_lvl.append(torch.where(active, nodes, torch.full_like(nodes, -1)))
+            probabilities_per_lvl.append(torch.where(active, probabilities, torch.zeros_like(probabilities)))
+
+            # Continue with the classifier of the predicted node - leaves stop the prediction
+            next_parents = self.parent_of_node[nodes]
+            active = active & (next_parents >= 0)
+            parents = torch.where(active, next_parents, torch.zeros_like(next_parents))
+
+        return torch.stack(nodes_per_lvl, dim=1), torch.stack(probabilities_per_lvl, dim=1)
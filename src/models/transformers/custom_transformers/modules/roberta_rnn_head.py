@@ -37,6 +37,16 @@ class RobertaRNNHead(nn.Module):
 
         return output, hidden
 
+    def unroll(self, input, num_levels):
+        """Predict the logits of num_levels levels - returns a tensor of shape (batch, levels, labels)"""
+        hidden = input.new_zeros((input.size(0), self.hidden_size))
+        logits_list = []
+        for _ in range(num_levels):
+            logits_lvl, hidden = self(input, hidden)
+            logits_list.append(logits_lvl)
+
+        return torch.stack(logits_list, dim=1)
+
     def initHidden(self, size):
         device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         return torch.zeros(size, self.hidden_size).to(device)
\ No newline at end of file
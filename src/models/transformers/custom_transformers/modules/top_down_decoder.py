@@ -0,0 +1,58 @@
+import torch
+from torch import nn
+
+
+class TopDownDecoder(nn.Module):
+    """Decode valid paths from the per level logits of the RNN head.
+
+        Starting at the root, the logits of each level are masked to the children of the previously predicted node
+        using a precomputed child mask. A beam of the k best partial paths is kept per title - beam size 1 is greedy
+        decoding. All titles of a batch are decoded at once."""
+
+    def __init__(self, child_mask, transitions, root, beam_size=1):
+        super().__init__()
+        self.root = root
+        self.beam_size = beam_size
+        self.fill_category = len(child_mask) - 1
+
+        # Buffers move with the model, but are not part of the persisted weights
+        self.register_buffer('child_mask', torch.as_tensor(child_mask, dtype=torch.bool), persistent=False)
+        self.register_buffer('transitions', torch.as_tensor(transitions, dtype=torch.long), persistent=False)
+
+    @classmethod
+    def from_tree_utils(cls, tree_utils, fill_category, per_parent=False, beam_size=1):
+        child_mask, transitions = tree_utils.compile_transitions(fill_category, per_parent=per_parent)
+        return cls(child_mask, transitions, tree_utils.root, beam_size=beam_size)
+
+    def forward(self, logits):
+        """Decode logits of shape (batch, levels, labels) - returns the labels, the nodes and the probability of
+            each level along the best path. Nodes of levels below a leaf are set to the fill up category."""
+        batch_size, num_levels, num_labels = logits.shape
+        log_probabilities = torch.log_softmax(logits.float(), dim=-1)
+
+        # Only the first beam is alive at the beginning - all others would duplicate it
+        beam_scores = torch.full((batch_size, self.beam_size), float('-inf'), device=logits.device)
+        beam_scores[:, 0] = 0
+        nodes = torch.full((batch_size, self.beam_size), self.root, dtype=torch.long, device=logits.device)
+        label_paths = logits.new_zeros((batch_size, self.beam_size, 0), dtype=torch.long)
+        node_paths = logits.new_zeros((batch_size, self.beam_size, 0), dtype=torch.long)
+
+        for lvl in range(num_levels):
+            scores = beam_scores.unsqueeze(-1) + log_probabilities[:, lvl].unsqueeze(1)
+            scores = scores.masked_fill(~self.child_mask[nodes], float('-inf'))
+
+            beam_scores, candidates = scores.view(batch_size, -1).topk(self.beam_size, dim=-1)
+            beams = candidates // num_labels
+            labels = candidates % num_labels
+
+            nodes = self.transitions[nodes.gather(1, beams), labels]
+            label_paths = torch.cat([label_paths.gather(1, beams.unsqueeze(-1).expand_as(label_paths)),
+                                     labels.unsqueeze(-1)], dim=-1)
+            node_paths = torch.cat([node_paths.gather(1, beams.unsqueeze(-1).expand_as(node_paths)),
+                                    nodes.unsqueeze(-1)], dim=-1)
+
+        # Beams are sorted by score - the first beam holds the best path
+        label_paths = label_paths[:, 0]
+        probabilities = log_probabilities.gather(-1, label_paths.unsqueeze(-1)).squeeze(-1).exp()
+
+        return label_paths, node_paths[:, 0], probabilities
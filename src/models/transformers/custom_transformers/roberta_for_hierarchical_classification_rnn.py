@@ -33,12 +33,15 @@ class RobertaForHierarchicalClassificationRNN(RobertaPreTrainedModel):
             output_attentions=None,
             output_hidden_states=None,
             return_dict=None,
+            num_levels=None,
     ):
         r"""
-        labels (:obj:`torch.LongTensor` of shape :obj:`(batch_size,)`, `optional`):
+        labels (:obj:`torch.LongTensor` of shape :obj:`(batch_size, num_levels)`, `optional`):
             Labels for computing the sequence classification/regression loss. Indices should be in :obj:`[0, ...,
             config.num_labels - 1]`. If :obj:`config.num_labels == 1` a regression loss is computed (Mean-Square loss),
             If :obj:`config.num_labels > 1` a classification loss is computed (Cross-Entropy).
+        num_levels (:obj:`int`, `optional`):
+            Number of levels the RNN head is unrolled without labels - defaults to :obj:`config.num_levels`.
         """
         return_dict = return_dict if return_dict is not None else self.config.use_return_dict
 
@@ -56,18 +59,29 @@ class RobertaForHierarchicalClassificationRNN(RobertaPreTrainedModel):
 
         sequence_output = outputs[0][:, 0, :].view(-1, 768)  # take <s> token (equiv. to [CLS])
 
+        transposed_labels = None
+        if labels is not None:
+            transposed_labels = torch.transpose(labels, 0, 1)
+            num_levels = len(transposed_labels)
+        elif num_levels is None:
+            num_levels = getattr(self.config, 'num_levels', None)
+        if num_levels is None:
+            raise ValueError('Provide labels or the number of levels to unroll the RNN head!')
+
         loss = None
         logits_list = []
-        transposed_labels = torch.transpose(labels, 0, 1)
-        hidden = self.classifier.initHidden(len(labels))
+        hidden = self.classifier.initHidden(sequence_output.size(0))
         # Initialize RNNHead
         self.classifier.zero_grad()
 
-        for i in range(len(transposed_labels)):
+        for i in range(num_levels):
             logits_lvl, hidden = self.classifier(sequence_output, hidden)
 
             logits_list.append(logits_lvl)
 
+            if transposed_labels is None:
+                continue
+
             loss_fct = CrossEntropyLoss()
 
             if loss is None:
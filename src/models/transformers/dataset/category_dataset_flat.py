@@ -1,16 +1,31 @@
 import torch
 
+from src.models.transformers.dataset.lazy_encodings import LazyEncodings
+
 
 class CategoryDatasetFlat(torch.utils.data.Dataset):
-    def __init__(self, texts, labels, tokenizer, encoder):
-        # Preprocess encodings
-        self.encodings = tokenizer(texts, padding=True, truncation=True)
+    def __init__(self, texts, labels, tokenizer, encoder, per_lvl_labels=False, dynamic_padding=False, encodings=None):
+        # Preprocess encodings - tokenize lazily if padding is done per batch (see DynamicPaddingCollator)
+        # Pre-tokenized encodings (see TokenizationCache) are always padded per batch
+        self.dynamic_padding = dynamic_padding or encodings is not None
+        if encodings is not None:
+            self.encodings = encodings
+        elif dynamic_padding:
+            self.encodings = LazyEncodings(texts, tokenizer)
+        else:
+            self.encodings = tokenizer(texts, padding=True, truncation=True)
 
-        # Preprocess labels
-        self.labels = [encoder[x]['derived_key'] for x in labels]
+        # Preprocess labels - Provide label per lvl in hierarchy if requested
+        if per_lvl_labels:
+            self.labels = [encoder[x]['derived_path'] for x in labels]
+        else:
+            self.labels = [encoder[x]['derived_key'] for x in labels]
 
     def __getitem__(self, idx):
-        item = {key: torch.tensor(val[idx]).to(torch.int64) for key, val in self.encodings.items()}
+        if self.dynamic_padding:
+            item = self.encodings.get_item(idx)
+        else:
+            item = {key: torch.tensor(val[idx]).to(torch.int64) for key, val in self.encodings.items()}
         item['labels'] = torch.tensor(self.labels[idx]).to(torch.int64)
         return item
 
@@ -0,0 +1,29 @@
+import torch
+
+
+class DynamicPaddingCollator:
+    """Pad a batch to its longest sequence - lengths are rounded up to a multiple of pad_to_multiple_of
+        so that only a few distinct batch shapes occur. Batches of similar length are drawn by the
+        LengthGroupedSampler"""
+
+    def __init__(self, pad_token_id, pad_to_multiple_of=8):
+        self.pad_token_id = pad_token_id
+        self.pad_to_multiple_of = pad_to_multiple_of
+
+    def __call__(self, features):
+        max_length = max([len(feature['input_ids']) for feature in features])
+        if self.pad_to_multiple_of:
+            max_length = -(-max_length // self.pad_to_multiple_of) * self.pad_to_multiple_of
+
+        input_ids = torch.full((len(features), max_length), self.pad_token_id, dtype=torch.int64)
+        attention_mask = torch.zeros((len(features), max_length), dtype=torch.int64)
+        for i, feature in enumerate(features):
+            length = len(feature['input_ids'])
+            input_ids[i, :length] = feature['input_ids']
+            attention_mask[i, :length] = feature['attention_mask']
+
+        batch = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'labels' in features[0]:
+            batch['labels'] = torch.stack([feature['labels'] for feature in features])
+
+        return batch
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from src.models.transformers.dataset.dynamic_padding_collator import DynamicPaddingCollator
+from src.models.transformers.dataset.tokenization_cache import TokenizationCache
+
+WEIGHTS_NAME = 'pytorch_model.bin'
+
+
+class CachedEmbeddings:
+    """<s> embeddings loaded from the embedding cache - rows are memory-mapped float16 vectors"""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def get_item(self, idx):
+        """Model input of a single text - see the head only models"""
+        return {'embeddings': torch.from_numpy(np.asarray(self.embeddings[idx], dtype=np.float32))}
+
+
+def extract_embeddings(encoder, encodings, path, pad_token_id, batch_size=256, device=None):
+    """Run the encoder once over all encodings and persist the <s> vectors as memory-mapped float16 array"""
+    # Sort texts by length - batches hold texts of similar length and need little padding
+    lengths = np.array([len(encodings[idx]) for idx in range(len(encodings))], dtype=np.int64)
+    order = np.argsort(lengths, kind='stable')
+    collator = DynamicPaddingCollator(pad_token_id)
+
+    embeddings = np.lib.format.open_memmap(path, mode='w+', dtype=np.float16,
+                                           shape=(len(encodings), encoder.config.hidden_size))
+    encoder.eval()
+    with torch.no_grad():
+        for start in range(0, len(order), batch_size):
+            idx = order[start:start + batch_size]
+            batch = collator([encodings.get_item(i) for i in idx])
+            outputs = encoder(batch['input_ids'].to(device), attention_mask=batch['attention_mask'].to(device),
+                              return_dict=False)
+            embeddings[idx] = outputs[0][:, 0, :].cpu().numpy().astype(np.float16)
+
+    embeddings.flush()
+    del embeddings
+
+    return path
+
+
+class EmbeddingCache:
+    """Persist <s> embeddings of dataset splits as memory-mapped float16 arrays
+
+        Entries are stored under DATA_DIR/data/processed/<dataset>/cache/ and keyed by the settings of the token ids
+        (see TokenizationCache) plus the encoder, so that the encoder runs only once per split while heads are
+        trained on the embeddings."""
+
+    def __init__(self, data_dir, dataset_name, batch_size=256):
+        self.logger = logging.getLogger(__name__)
+        self.tokenization_cache = TokenizationCache(data_dir, dataset_name)
+        self.cache_dir = self.tokenization_cache.cache_dir
+        self.batch_size = batch_size
+
+        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+        # Encoders are loaded once per cache - all splits are encoded with the same encoder
+        self.encoders = {}
+
+    def compute_key(self, split_paths, tokenizer, description, preprocessing, num_records, encoder_model_or_path):
+        """Hash the settings of the token ids plus the encoder - local encoder weights are hashed as well"""
+        weights_path = Path(encoder_model_or_path).joinpath(WEIGHTS_NAME)
+        settings = {
+            'encodings': self.tokenization_cache.compute_key(split_paths, tokenizer, description, preprocessing,
+                                                             num_records),
+            'encoder': str(encoder_model_or_path),
+            'weights': TokenizationCache.hash_file(weights_path) if weights_path.exists() else None
+        }
+
+        return hashlib.sha1(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def load(self, key):
+        path = self.cache_dir.joinpath('{}_embeddings.npy'.format(key))
+        if not path.exists():
+            return None
+
+        return CachedEmbeddings(np.load(path, mmap_mode='r'))
+
+    def store(self, key, encodings, encoder, pad_token_id):
+        """Encode all token ids and persist the <s> embeddings"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first - concurrent runs never see partial entries
+        path = self.cache_dir.joinpath('{}_embeddings.npy'.format(key))
+        tmp_path = self.cache_dir.joinpath('{}_embeddings.{}.tmp'.format(key, os.getpid()))
+        extract_embeddings(encoder, encodings, str(tmp_path), pad_token_id, batch_size=self.batch_size,
+                           device=self.device)
+        os.replace(tmp_path, path)
+
+        return self.load(key)
+
+    def load_encoder(self, encoder_model_or_path):
+        if encoder_model_or_path not in self.encoders:
+            from transformers import RobertaModel
+            encoder = RobertaModel.from_pretrained(encoder_model_or_path, add_pooling_layer=False)
+            self.encoders[encoder_model_or_path] = encoder.to(self.device)
+
+        return self.encoders[encoder_model_or_path]
+
+    def encode(self, split_paths, tokenizer, description, preprocessing, num_records, prepare_texts,
+               encoder_model_or_path):
+        """Load embeddings from cache or tokenize texts via the tokenization cache and run the encoder once"""
+        key = self.compute_key(split_paths, tokenizer, description, preprocessing, num_records, encoder_model_or_path)
+
+        embeddings = self.load(key)
+        if embeddings is not None:
+            self.logger.info('Loaded {} embeddings from cache {}!'.format(len(embeddings), key))
+            return embeddings
+
+        encodings = self.tokenization_cache.encode(split_paths, tokenizer, description, preprocessing, num_records,
+                                                   prepare_texts)
+        embeddings = self.store(key, encodings, self.load_encoder(encoder_model_or_path), tokenizer.pad_token_id)
+        self.logger.info('Cached {} embeddings of {} as {}!'.format(len(embeddings), encoder_model_or_path, key))
+
+        return embeddings
@@ -0,0 +1,43 @@
+import itertools
+
+import numpy as np
+import torch
+
+
+class LazyEncodings:
+    """Tokenize texts lazily in chunks and keep the token ids as compact ragged int32 arrays"""
+
+    def __init__(self, texts, tokenizer, chunk_size=4096):
+        self.texts = texts
+        self.tokenizer = tokenizer
+        self.chunk_size = chunk_size
+
+        # Tokenized chunks - flat token ids plus offsets of each text
+        self.chunks = {}
+
+    def tokenize_chunk(self, chunk):
+        start = chunk * self.chunk_size
+        texts = list(self.texts[start:start + self.chunk_size])
+        input_ids = self.tokenizer(texts, truncation=True)['input_ids']
+
+        offsets = np.zeros(len(input_ids) + 1, dtype=np.int64)
+        np.cumsum([len(ids) for ids in input_ids], out=offsets[1:])
+        ids = np.fromiter(itertools.chain.from_iterable(input_ids), dtype=np.int32, count=offsets[-1])
+
+        return ids, offsets
+
+    def __getitem__(self, idx):
+        chunk, position = divmod(idx, self.chunk_size)
+        if chunk not in self.chunks:
+            self.chunks[chunk] = self.tokenize_chunk(chunk)
+
+        ids, offsets = self.chunks[chunk]
+        return ids[offsets[position]:offsets[position + 1]]
+
+    def __len__(self):
+        return len(self.texts)
+
+    def get_item(self, idx):
+        """Unpadded model inputs of a single text - padding is done per batch by the collator"""
+        input_ids = torch.from_numpy(self[idx].astype(np.int64))
+        return {'input_ids': input_ids, 'attention_mask': torch.ones_like(input_ids)}
@@ -0,0 +1,30 @@
+import torch
+from torch.utils.data import Sampler
+
+
+class LengthGroupedSampler(Sampler):
+    """Draw batches of texts with similar length - indices are shuffled, split into mega-batches of
+        mega_batch_multiplier * batch_size and sorted by length within each mega-batch.
+
+        Consecutive batch_size indices therefore hold texts of similar length, which keeps the padding added by
+        the DynamicPaddingCollator small while the mega-batches keep the order random across epochs."""
+
+    def __init__(self, lengths, batch_size, mega_batch_multiplier=50, generator=None):
+        self.lengths = lengths
+        self.batch_size = batch_size
+        self.mega_batch_multiplier = mega_batch_multiplier
+        self.generator = generator
+
+    def __iter__(self):
+        indices = torch.randperm(len(self.lengths), generator=self.generator).tolist()
+        mega_batch_size = self.batch_size * self.mega_batch_multiplier
+
+        grouped_indices = []
+        for start in range(0, len(indices), mega_batch_size):
+            mega_batch = indices[start:start + mega_batch_size]
+            grouped_indices.extend(sorted(mega_batch, key=lambda idx: self.lengths[idx], reverse=True))
+
+        return iter(grouped_indices)
+
+    def __len__(self):
+        return len(self.lengths)
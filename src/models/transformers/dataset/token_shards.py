@@ -0,0 +1,188 @@
+import itertools
+import json
+import logging
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+from src.models.transformers.dataset.tokenization_cache import TokenizationCache
+
+INDEX_FILE = 'index.json'
+# Lines tokenized per batch & tokens per shard
+TOKENIZE_BATCH_SIZE = 10000
+SHARD_SIZE = 1 << 26
+
+
+def iterate_sequences(text_path, tokenizer, block_size, line_by_line, batch_size=TOKENIZE_BATCH_SIZE):
+    """Tokenize a text file batch-wise and yield batches of token sequences
+
+        Lines are concatenated and cut into packed blocks of block_size tokens (the remainder is dropped) or -
+        if line_by_line - non-empty lines are truncated to block_size tokens and kept as single sequences."""
+    remainder = np.zeros(0, dtype=np.int64)
+    with open(text_path, encoding='utf-8') as f:
+        while True:
+            lines = [line.rstrip('\n') for line in itertools.islice(f, batch_size)]
+            if not lines:
+                return
+
+            if line_by_line:
+                lines = [line for line in lines if len(line) > 0 and not line.isspace()]
+                if lines:
+                    yield tokenizer(lines, truncation=True, max_length=block_size)['input_ids']
+            else:
+                input_ids = tokenizer(lines)['input_ids']
+                tokens = np.fromiter(itertools.chain.from_iterable(input_ids), dtype=np.int64)
+                tokens = np.concatenate([remainder, tokens])
+
+                num_blocks = len(tokens) // block_size
+                remainder = tokens[num_blocks * block_size:]
+                yield tokens[:num_blocks * block_size].reshape(num_blocks, block_size)
+
+
+class TokenShardWriter:
+    """Write token sequences as shards of raw token ids - line by line shards additionally store offsets"""
+
+    def __init__(self, output_dir, dtype, line_by_line, shard_size=SHARD_SIZE):
+        self.output_dir = Path(output_dir)
+        self.dtype = dtype
+        self.line_by_line = line_by_line
+        self.shard_size = shard_size
+
+        self.shards = []
+        self.sequences = []
+        self.num_tokens = 0
+
+    def add(self, sequences):
+        for sequence in sequences:
+            self.sequences.append(np.asarray(sequence, dtype=self.dtype))
+            self.num_tokens += len(sequence)
+            if self.num_tokens >= self.shard_size:
+                self.flush()
+
+    def flush(self):
+        if not self.sequences:
+            return
+
+        name = 'shard-{:05d}'.format(len(self.shards))
+        np.concatenate(self.sequences).tofile(self.output_dir.joinpath('{}.bin'.format(name)))
+
+        shard = {'ids': '{}.bin'.format(name), 'offsets': None, 'num_sequences': len(self.sequences)}
+        if self.line_by_line:
+            offsets = np.zeros(len(self.sequences) + 1, dtype=np.int64)
+            np.cumsum([len(sequence) for sequence in self.sequences], out=offsets[1:])
+            shard['offsets'] = '{}.offsets.npy'.format(name)
+            np.save(self.output_dir.joinpath(shard['offsets']), offsets)
+
+        self.shards.append(shard)
+        self.sequences = []
+        self.num_tokens = 0
+
+
+def compute_settings(text_path, tokenizer, block_size, line_by_line):
+    """Everything that influences the token shards of a text file"""
+    return {
+        'source': TokenizationCache.hash_file(text_path),
+        'tokenizer': '{}:{}'.format(type(tokenizer).__name__, getattr(tokenizer, 'name_or_path', '')),
+        'vocab_size': len(tokenizer),
+        'block_size': int(block_size),
+        'line_by_line': bool(line_by_line)
+    }
+
+
+def load_index(shard_dir):
+    index_path = Path(shard_dir).joinpath(INDEX_FILE)
+    if not index_path.exists():
+        return None
+
+    with open(index_path) as f:
+        return json.load(f)
+
+
+def write_token_shards(text_path, shard_dir, tokenizer, block_size, line_by_line, settings=None,
+                       shard_size=SHARD_SIZE):
+    """Tokenize a text file once and persist its token sequences as shards plus an index"""
+    logger = logging.getLogger(__name__)
+    if settings is None:
+        settings = compute_settings(text_path, tokenizer, block_size, line_by_line)
+
+    # Token ids of common vocabularies fit into 16 bits
+    dtype = np.uint16 if len(tokenizer) <= np.iinfo(np.uint16).max + 1 else np.int32
+
+    # Write into a temporary directory first - readers never see partial shards
+    shard_dir = Path(shard_dir)
+    tmp_dir = shard_dir.with_name('{}.{}.tmp'.format(shard_dir.name, os.getpid()))
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    writer = TokenShardWriter(tmp_dir, dtype, line_by_line, shard_size)
+    for sequences in iterate_sequences(text_path, tokenizer, block_size, line_by_line):
+        writer.add(sequences)
+    writer.flush()
+
+    index = {'settings': settings, 'dtype': np.dtype(dtype).name, 'shards': writer.shards}
+    with open(tmp_dir.joinpath(INDEX_FILE), 'w') as f:
+        json.dump(index, f, indent=2)
+
+    shutil.rmtree(shard_dir, ignore_errors=True)
+    os.replace(tmp_dir, shard_dir)
+
+    num_sequences = sum([shard['num_sequences'] for shard in writer.shards])
+    logger.info('Wrote {} sequences of {} in {} shards to {}!'.format(num_sequences, text_path, len(writer.shards),
+                                                                       shard_dir))
+
+
+def load_token_shards(text_path, shard_dir, tokenizer, block_size, line_by_line, overwrite=False,
+                      shard_size=SHARD_SIZE):
+    """Token shards of a text file - the text file is only tokenized if the shards are missing or outdated"""
+    logger = logging.getLogger(__name__)
+    settings = compute_settings(text_path, tokenizer, block_size, line_by_line)
+
+    index = load_index(shard_dir)
+    if overwrite or index is None or index['settings'] != settings:
+        write_token_shards(text_path, shard_dir, tokenizer, block_size, line_by_line, settings, shard_size)
+    else:
+        logger.info('Loaded token shards of {} from {}!'.format(text_path, shard_dir))
+
+    return TokenShardDataset(shard_dir)
+
+
+class TokenShardDataset(Dataset):
+    """Token sequences read directly from memory-mapped shards - tokenization is skipped entirely"""
+
+    def __init__(self, shard_dir):
+        shard_dir = Path(shard_dir)
+        index = load_index(shard_dir)
+        self.block_size = index['settings']['block_size']
+
+        self.shards = []
+        for shard in index['shards']:
+            ids = np.memmap(shard_dir.joinpath(shard['ids']), dtype=index['dtype'], mode='r')
+            offsets = None if shard['offsets'] is None else np.load(shard_dir.joinpath(shard['offsets']),
+                                                                    mmap_mode='r')
+            self.shards.append((ids, offsets))
+
+        self.cumulative_sequences = np.zeros(len(index['shards']) + 1, dtype=np.int64)
+        np.cumsum([shard['num_sequences'] for shard in index['shards']], out=self.cumulative_sequences[1:])
+
+    def __getitem__(self, idx):
+        if not 0 <= idx < len(self):
+            raise IndexError('Sequence {} out of range!'.format(idx))
+
+        shard = int(np.searchsorted(self.cumulative_sequences, idx, side='right')) - 1
+        position = idx - self.cumulative_sequences[shard]
+
+        ids, offsets = self.shards[shard]
+        if offsets is None:
+            sequence = ids[position * self.block_size:(position + 1) * self.block_size]
+        else:
+            sequence = ids[offsets[position]:offsets[position + 1]]
+
+        # Masking & padding are done per batch by the collator
+        return {'input_ids': torch.from_numpy(sequence.astype(np.int64))}
+
+    def __len__(self):
+        return int(self.cumulative_sequences[-1])
@@ -0,0 +1,90 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+
+from src.models.transformers.dataset.lazy_encodings import LazyEncodings
+
+
+class CachedEncodings(LazyEncodings):
+    """Token ids loaded from the tokenization cache - all texts form a single memory-mapped chunk"""
+
+    def __init__(self, ids, offsets):
+        super().__init__(None, None, chunk_size=max(len(offsets) - 1, 1))
+        self.chunks[0] = (ids, offsets)
+
+    def __len__(self):
+        return len(self.chunks[0][1]) - 1
+
+
+class TokenizationCache:
+    """Persist token ids of dataset splits as memory-mapped arrays
+
+        Entries are stored under DATA_DIR/data/processed/<dataset>/cache/ and keyed by a hash of the split files,
+        the tokenizer and the text settings (description, preprocessing), so that identical inputs are only
+        tokenized once across seeds, runs and evaluators."""
+
+    def __init__(self, data_dir, dataset_name):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = Path(data_dir).joinpath('data', 'processed', dataset_name, 'cache')
+
+    @staticmethod
+    def hash_file(path, block_size=1 << 20):
+        file_hash = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                file_hash.update(block)
+
+        return file_hash.hexdigest()
+
+    def compute_key(self, split_paths, tokenizer, description, preprocessing, num_records):
+        """Hash the split files and all settings that influence the token ids"""
+        settings = {
+            'splits': [self.hash_file(path) for path in split_paths],
+            'tokenizer': '{}:{}'.format(type(tokenizer).__name__, getattr(tokenizer, 'name_or_path', '')),
+            'description': bool(description),
+            'preprocessing': bool(preprocessing),
+            'num_records': int(num_records)
+        }
+
+        return hashlib.sha1(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def load(self, key):
+        ids_path = self.cache_dir.joinpath('{}_ids.npy'.format(key))
+        offsets_path = self.cache_dir.joinpath('{}_offsets.npy'.format(key))
+        if not (ids_path.exists() and offsets_path.exists()):
+            return None
+
+        return CachedEncodings(np.load(ids_path, mmap_mode='r'), np.load(offsets_path, mmap_mode='r'))
+
+    def store(self, key, texts, tokenizer):
+        """Tokenize all texts and persist the flat token ids plus offsets"""
+        ids, offsets = LazyEncodings(texts, tokenizer, chunk_size=max(len(texts), 1)).tokenize_chunk(0)
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for name, values in [('ids', ids), ('offsets', offsets)]:
+            # Write to a temporary file first - concurrent runs never see partial entries
+            path = self.cache_dir.joinpath('{}_{}.npy'.format(key, name))
+            tmp_path = self.cache_dir.joinpath('{}_{}.{}.tmp'.format(key, name, os.getpid()))
+            with open(tmp_path, 'wb') as f:
+                np.save(f, values)
+            os.replace(tmp_path, path)
+
+        return self.load(key)
+
+    def encode(self, split_paths, tokenizer, description, preprocessing, num_records, prepare_texts):
+        """Load token ids from cache or prepare texts via prepare_texts() and tokenize them"""
+        key = self.compute_key(split_paths, tokenizer, description, preprocessing, num_records)
+
+        encodings = self.load(key)
+        if encodings is not None:
+            self.logger.info('Loaded {} tokenized records from cache {}!'.format(len(encodings), key))
+            return encodings
+
+        encodings = self.store(key, prepare_texts(), tokenizer)
+        self.logger.info('Cached {} tokenized records as {}!'.format(len(encodings), key))
+
+        return encodings
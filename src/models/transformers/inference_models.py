@@ -0,0 +1,144 @@
+import logging
+import os
+import time
+
+import numpy as np
+import torch
+from torch import nn
+
+INPUT_NAMES = ['input_ids', 'attention_mask']
+
+
+class FlatInferenceModel(nn.Module):
+    """Label free forward pass of RobertaForSequenceClassification - returns the leaf logits"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask, return_dict=False)[0]
+
+
+class RNNInferenceModel(nn.Module):
+    """Label free forward pass of RobertaForHierarchicalClassificationRNN - returns logits per level
+
+        The number of levels is fixed, such that tracing unrolls the loop of the RNN head into a static graph."""
+
+    def __init__(self, model, num_levels):
+        super().__init__()
+        self.roberta = model.roberta
+        self.classifier = model.classifier
+        self.num_levels = num_levels
+
+    def forward(self, input_ids, attention_mask):
+        sequence_output = self.roberta(input_ids, attention_mask=attention_mask, return_dict=False)[0][:, 0, :]
+
+        return self.classifier.unroll(sequence_output, self.num_levels)
+
+
+class HierarchyInferenceModel(nn.Module):
+    """Label free forward pass of RobertaForHierarchicalClassificationHierarchy - returns the logits along the
+    longest paths, which are gathered with a precomputed index"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.roberta = model.roberta
+        self.classifier = model.classifier
+
+    def forward(self, input_ids, attention_mask):
+        sequence_output = self.roberta(input_ids, attention_mask=attention_mask, return_dict=False)[0][:, 0, :]
+
+        all_logits = torch.cat([nodes(sequence_output) for nodes in self.classifier.nodes], dim=1)
+        return self.classifier.predict_along_paths(all_logits, len(self.classifier.paths_per_lvl))
+
+
+def build_inference_model(model, experiment_type, num_levels=None):
+    """Wrap a trained model of the given (evaluation) experiment type into a label free inference model"""
+    experiment_type = experiment_type.replace('eval-', '', 1)
+    if experiment_type == 'transformer-based':
+        inference_model = FlatInferenceModel(model)
+    elif experiment_type == 'transformer-based-rnn':
+        inference_model = RNNInferenceModel(model, num_levels)
+    elif experiment_type == 'transformer-based-hierarchy':
+        inference_model = HierarchyInferenceModel(model)
+    else:
+        raise ValueError('Experiment type {} cannot be exported!'.format(experiment_type))
+
+    return inference_model.eval()
+
+
+def quantize_dynamic(inference_model):
+    """Quantize weights of all linear layers to int8 - activations are quantized on the fly"""
+    return torch.quantization.quantize_dynamic(inference_model, {nn.Linear}, dtype=torch.qint8)
+
+
+def example_inputs(batch_size=2, sequence_length=16):
+    input_ids = torch.ones((batch_size, sequence_length), dtype=torch.long)
+    attention_mask = torch.ones((batch_size, sequence_length), dtype=torch.long)
+    return input_ids, attention_mask
+
+
+def export_torchscript(inference_model, path):
+    """Trace the inference model into a TorchScript file that can be loaded without the model classes"""
+    with torch.no_grad():
+        traced_model = torch.jit.trace(inference_model, example_inputs())
+    torch.jit.save(traced_model, path)
+
+    return path
+
+
+def export_onnx(inference_model, path, opset_version=11):
+    """Export the inference model to ONNX - batch size and sequence length stay dynamic"""
+    dynamic_axes = dict([(name, {0: 'batch', 1: 'sequence'}) for name in INPUT_NAMES])
+    dynamic_axes['logits'] = {0: 'batch'}
+
+    with torch.no_grad():
+        torch.onnx.export(inference_model, example_inputs(), path, input_names=INPUT_NAMES, output_names=['logits'],
+                          dynamic_axes=dynamic_axes, opset_version=opset_version)
+
+    return path
+
+
+def quantize_onnx(path, quantized_path):
+    """Dynamically quantize the weights of an exported ONNX model to int8 - requires onnxruntime"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic as quantize_dynamic_onnx
+    quantize_dynamic_onnx(path, quantized_path, weight_type=QuantType.QInt8)
+
+    return quantized_path
+
+
+class OnnxInferenceModel:
+    """Run an exported ONNX model with onnxruntime on CPU"""
+
+    def __init__(self, path, num_threads=None):
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    def __call__(self, input_ids, attention_mask):
+        inputs = {'input_ids': input_ids.numpy(), 'attention_mask': attention_mask.numpy()}
+        return torch.from_numpy(self.session.run(['logits'], inputs)[0])
+
+
+def file_size(path):
+    """Size of a model file in MB"""
+    return os.path.getsize(path) / (1 << 20)
+
+
+def predict_batches(inference_model, batches):
+    """Predict logits for all batches - returns the concatenated logits plus the latency of each batch"""
+    logger = logging.getLogger(__name__)
+    logits = []
+    latencies = []
+
+    with torch.no_grad():
+        for batch in batches:
+            start = time.perf_counter()
+            logits.append(inference_model(batch['input_ids'], batch['attention_mask']).numpy())
+            latencies.append(time.perf_counter() - start)
+
+    logger.info('Predicted {} batches in {:.1f}s!'.format(len(latencies), sum(latencies)))
+    return np.concatenate(logits), np.array(latencies)
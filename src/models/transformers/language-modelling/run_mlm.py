@@ -29,6 +29,7 @@ import sys
 from dataclasses import dataclass, field
 from typing import Optional
 
+import torch
 from datasets import load_dataset
 
 import transformers
@@ -46,6 +47,8 @@ from transformers import (
 )
 from transformers.trainer_utils import is_main_process
 
+from src.models.transformers.dataset.token_shards import load_token_shards
+
 
 logger = logging.getLogger(__name__)
 MODEL_CONFIG_CLASSES = list(MODEL_FOR_MASKED_LM_MAPPING.keys())
@@ -123,6 +126,13 @@ class DataTrainingArguments:
         default=False,
         metadata={"help": "Whether distinct lines of text in the dataset are to be handled as distinct sequences."},
     )
+    packed_dataset_dir: Optional[str] = field(
+        default=None,
+        metadata={
+            "help": "Directory of pre-tokenized token shards of the train/validation files. Missing or outdated "
+            "shards are written once, afterwards the shards are read memory-mapped and tokenization is skipped."
+        },
+    )
     pad_to_max_length: bool = field(
         default=False,
         metadata={
@@ -198,7 +208,10 @@ def main():
     #
     # In distributed training, the load_dataset function guarantee that only one local process can concurrently
     # download the dataset.
-    if data_args.dataset_name is not None:
+    if data_args.packed_dataset_dir is not None:
+        # Token shards are loaded after the tokenizer - see below
+        datasets = None
+    elif data_args.dataset_name is not None:
         # Downloading and loading a dataset from the hub.
         datasets = load_dataset(data_args.dataset_name, data_args.dataset_config_name)
     else:
@@ -256,13 +269,17 @@ def main():
 
     # Preprocessing the datasets.
     # First we tokenize all the texts.
-    if training_args.do_train:
-        column_names = datasets["train"].column_names
-    else:
-        column_names = datasets["validation"].column_names
-    text_column_name = "text" if "text" in column_names else column_names[0]
+    if datasets is not None:
+        if training_args.do_train:
+            column_names = datasets["train"].column_names
+        else:
+            column_names = datasets["validation"].column_names
+        text_column_name = "text" if "text" in column_names else column_names[0]
 
-    if data_args.line_by_line:
+    if data_args.packed_dataset_dir is not None:
+        # Pre-tokenized token shards - the text files are only tokenized if the shards are missing or outdated
+        tokenized_datasets = load_packed_datasets(data_args, training_args, tokenizer)
+    elif data_args.line_by_line:
         # When using line_by_line, we just tokenize each nonempty line.
         padding = "max_length" if data_args.pad_to_max_length else False
 
@@ -385,6 +402,35 @@ def main():
     return results
 
 
+def load_packed_datasets(data_args, training_args, tokenizer):
+    """Load the token shards of the train & validation file - sequences are packed blocks of max_seq_length tokens
+    or single lines if line_by_line is set"""
+    if data_args.max_seq_length is None:
+        max_seq_length = tokenizer.model_max_length
+    else:
+        max_seq_length = min(data_args.max_seq_length, tokenizer.model_max_length)
+
+    data_files = {"train": data_args.train_file, "validation": data_args.validation_file}
+
+    # Only the main process writes token shards - the other processes wait and read them afterwards
+    if training_args.local_rank not in [-1, 0]:
+        torch.distributed.barrier()
+
+    packed_datasets = {}
+    for split, text_path in data_files.items():
+        if text_path is not None:
+            shard_dir = os.path.join(data_args.packed_dataset_dir, split)
+            packed_datasets[split] = load_token_shards(
+                text_path, shard_dir, tokenizer, max_seq_length, data_args.line_by_line,
+                overwrite=data_args.overwrite_cache and is_main_process(training_args.local_rank)
+            )
+
+    if training_args.local_rank == 0:
+        torch.distributed.barrier()
+
+    return packed_datasets
+
+
 def _mp_fn(index):
     # For xla_spawn (TPUs)
     main()
@@ -0,0 +1,19 @@
+from transformers import Trainer
+
+from src.models.transformers.dataset.lazy_encodings import LazyEncodings
+from src.models.transformers.dataset.length_grouped_sampler import LengthGroupedSampler
+
+
+class LengthGroupedTrainer(Trainer):
+    """Trainer that groups training texts of similar length into batches (see LengthGroupedSampler).
+
+        Only lazily tokenized datasets are grouped - padded encodings and cached embeddings have a fixed length,
+        distributed training falls back to the samplers of the Trainer."""
+
+    def _get_train_sampler(self):
+        encodings = getattr(self.train_dataset, 'encodings', None)
+        if self.args.local_rank != -1 or not isinstance(encodings, LazyEncodings):
+            return super()._get_train_sampler()
+
+        lengths = [len(encodings[idx]) for idx in range(len(encodings))]
+        return LengthGroupedSampler(lengths, self.args.train_batch_size)
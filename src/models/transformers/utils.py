@@ -3,6 +3,8 @@ from src.models.transformers.custom_transformers.roberta_for_hierarchical_classi
     RobertaForHierarchicalClassificationRNN
 from src.models.transformers.custom_transformers.roberta_for_hierarchical_classification_hierarchy import \
     RobertaForHierarchicalClassificationHierarchy
+from src.models.transformers.custom_transformers.roberta_for_hierarchical_classification_lcpn import \
+    RobertaForHierarchicalClassificationLCPN
 
 
 #To-Do: Refactor code at some point --> Interface is not clear anymore
@@ -18,6 +20,8 @@ def provide_model_and_tokenizer(name, pretrained_model_or_path, config=None):
         return roberta_base_hierarchy_rnn(config, pretrained_model_or_path)
     elif name == 'roberta-base-hierarchy':
         return roberta_base_hierarchy(config, pretrained_model_or_path)
+    elif name == 'roberta-base-hierarchy-lcpn':
+        return roberta_base_hierarchy_lcpn(config, pretrained_model_or_path)
 
     raise ValueError('Unknown model name: {}!'.format(name))
 
@@ -47,4 +51,10 @@ def roberta_base_hierarchy(config, pretrained_model_or_path):
     tokenizer = RobertaTokenizerFast.from_pretrained('roberta-base')
     model = RobertaForHierarchicalClassificationHierarchy.from_pretrained(pretrained_model_or_path, config=config)
 
-    return tokenizer, model
\ No newline at end of file
+    return tokenizer, model
+
+def roberta_base_hierarchy_lcpn(config, pretrained_model_or_path):
+    tokenizer = RobertaTokenizerFast.from_pretrained('roberta-base')
+    model = RobertaForHierarchicalClassificationLCPN.from_pretrained(pretrained_model_or_path, config=config)
+
+    return tokenizer, model
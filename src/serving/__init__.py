@@ -0,0 +1 @@
+from src.serving.category_predictor import CategoryPredictor
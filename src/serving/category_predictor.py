@@ -0,0 +1,217 @@
+import json
+import logging
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from src.data.preprocessing import preprocess_many
+from src.utils.tree_utils import TreeUtils
+
+MODEL_TYPES = ['transformer-based', 'transformer-based-rnn', 'fasttext-based', 'random-forest-based']
+
+
+class CategoryPredictor:
+    """Categorize product titles with a trained model - model, encoder and tree are loaded once
+
+        A prediction consists of the leaf category, the path from the first level of the tree to the leaf and a
+        score per level. Models predicting leaf probabilities score each level by the probability mass of the
+        leaves below the predicted node."""
+
+    def __init__(self, model_type, model, tree, tokenizer=None, encoder=None, preprocessing=False,
+                 exploit_hierarchy=False, max_length=128, beam_size=1):
+        self.logger = logging.getLogger(__name__)
+        if model_type not in MODEL_TYPES:
+            raise ValueError('Model type {} not supported!'.format(model_type))
+
+        self.model_type = model_type
+        self.model = model
+        self.tokenizer = tokenizer
+        self.encoder = encoder
+        self.preprocessing = preprocessing
+        self.exploit_hierarchy = exploit_hierarchy
+        self.max_length = max_length
+
+        self.tree = tree
+        self.tree_utils = TreeUtils(tree)
+        self.decoder = dict(tree.nodes(data='name'))
+        # Category names are matched with spaces replaced by underscores - as done for training
+        self.node_by_name = dict([(str(name).replace(' ', '_'), node) for node, name in self.decoder.items()])
+
+        self.device = None
+        if model_type in ['transformer-based', 'transformer-based-rnn']:
+            import torch
+            self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+            self.model.to(self.device)
+            self.model.eval()
+
+        # Paths of the RNN head are decoded top down along the tree - guarantees valid paths
+        self.rnn_decoder = None
+        if model_type == 'transformer-based-rnn':
+            from src.models.transformers.custom_transformers.modules.top_down_decoder import TopDownDecoder
+            self.rnn_decoder = TopDownDecoder.from_tree_utils(self.tree_utils, len(tree), per_parent=exploit_hierarchy,
+                                                              beam_size=beam_size).to(self.device)
+
+        # Node of each column of the predicted leaf probabilities - out of category is -1
+        self.leaf_nodes = None
+        self.ancestors = None
+        if model_type != 'transformer-based-rnn':
+            self.leaf_nodes = self.determine_leaf_nodes()
+            self.ancestors = self.compile_ancestors(self.leaf_nodes)
+
+    @classmethod
+    def from_configuration(cls, configuration_path, data_dir=None):
+        """Load model, encoder and tree described by an evaluation configuration"""
+        with open(configuration_path) as json_file:
+            configuration = json.load(json_file)
+
+        data_dir = Path(data_dir if data_dir is not None else os.environ['DATA_DIR'])
+        model_type = configuration['type'].replace('eval-', '', 1)
+        model_path = data_dir.joinpath(configuration['model_path'])
+
+        # The label space is defined by the dataset the model was trained on
+        dataset_name = configuration['original_dataset']
+        path_to_tree = data_dir.joinpath('data', 'raw', dataset_name, 'tree', 'tree_{}.pkl'.format(dataset_name))
+        with open(path_to_tree, 'rb') as f:
+            tree = pickle.load(f)
+
+        tokenizer = None
+        encoder = None
+        if model_type == 'transformer-based':
+            from transformers import RobertaForSequenceClassification
+            from src.models.transformers import utils
+            model = RobertaForSequenceClassification.from_pretrained(model_path)
+            tokenizer = utils.roberta_base_tokenizer()
+        elif model_type == 'transformer-based-rnn':
+            from src.models.transformers import utils
+            from src.models.transformers.custom_transformers.roberta_for_hierarchical_classification_rnn import \
+                RobertaForHierarchicalClassificationRNN
+            model = RobertaForHierarchicalClassificationRNN.from_pretrained(model_path)
+            tokenizer = utils.roberta_base_tokenizer()
+        elif model_type == 'fasttext-based':
+            import fasttext
+            model = fasttext.load_model(str(model_path))
+            with open(data_dir.joinpath(configuration['encoder_path']), 'rb') as encoder_file:
+                encoder = pickle.load(encoder_file)
+        elif model_type == 'random-forest-based':
+            with open(model_path, 'rb') as model_file:
+                model = pickle.load(model_file)
+        else:
+            raise ValueError('Model type {} not supported!'.format(model_type))
+
+        # fastText models are always trained on preprocessed titles
+        preprocessing = configuration.get('preprocessing', False) or model_type == 'fasttext-based'
+
+        return cls(model_type, model, tree, tokenizer=tokenizer, encoder=encoder, preprocessing=preprocessing,
+                   exploit_hierarchy=configuration.get('exploit_hierarchy', False),
+                   beam_size=configuration.get('beam_size', 1))
+
+    def encode_name(self, name):
+        node = self.node_by_name.get(str(name).replace(' ', '_'))
+        if node is None:
+            self.logger.warning('Category {} not found in tree!'.format(name))
+            return -1
+        return node
+
+    def determine_leaf_nodes(self):
+        if self.model_type == 'transformer-based':
+            # Derived keys of the flat transformer - 0 is out of category, leaves follow in tree order
+            encoder = dict([(value, key) for key, value in self.decoder.items()])
+            leaf_names = set([self.decoder[node] for node in self.tree.nodes() if self.tree.out_degree(node) == 0])
+            return np.array([-1] + [encoder[name] for name in encoder if name in leaf_names], dtype=np.int64)
+
+        if self.model_type == 'fasttext-based':
+            return np.array([self.encode_name(self.encoder[label]) for label in self.model.get_labels()],
+                            dtype=np.int64)
+
+        return np.array([self.encode_name(name) for name in self.model.classes_], dtype=np.int64)
+
+    def compile_ancestors(self, leaf_nodes):
+        """Sparse leaf x node matrix - summing leaf probabilities along it yields the probability of each node"""
+        rows, columns = [], []
+        for row, node in enumerate(leaf_nodes):
+            if node >= 0:
+                path = self.tree_utils.paths[node, :self.tree_utils.depth[node]]
+                rows.extend([row] * len(path))
+                columns.extend(path.tolist())
+
+        return csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)),
+                          shape=(len(leaf_nodes), len(self.tree_utils.parent)))
+
+    def predict(self, titles):
+        """Predict leaf, path and per level scores for a batch of titles"""
+        titles = [str(title) for title in titles]
+        if len(titles) == 0:
+            return []
+        if self.preprocessing:
+            titles = preprocess_many(titles)
+
+        if self.model_type == 'transformer-based-rnn':
+            paths, scores = self.predict_paths_rnn(titles)
+        else:
+            paths, scores = self.decode_leaf_probabilities(self.predict_leaf_probabilities(titles))
+
+        predictions = []
+        for path, path_scores in zip(paths, scores):
+            predictions.append({'leaf': self.decoder[path[-1]] if len(path) > 0 else None,
+                                'path': [self.decoder[node] for node in path],
+                                'scores': [float(score) for score in path_scores]})
+
+        return predictions
+
+    def tokenize(self, titles):
+        encodings = self.tokenizer(titles, padding=True, truncation=True, max_length=self.max_length,
+                                   return_tensors='pt')
+        return dict([(key, value.to(self.device)) for key, value in encodings.items()])
+
+    def predict_leaf_probabilities(self, titles):
+        if self.model_type == 'transformer-based':
+            import torch
+            with torch.no_grad():
+                logits = self.model(**self.tokenize(titles))[0]
+            return torch.softmax(logits, dim=-1).cpu().numpy()
+
+        if self.model_type == 'fasttext-based':
+            column_by_label = dict([(label, column) for column, label in enumerate(self.model.get_labels())])
+            labels, probabilities = self.model.predict(titles, k=-1)
+
+            leaf_probabilities = np.zeros((len(titles), len(column_by_label)), dtype=np.float32)
+            for i, (title_labels, title_probabilities) in enumerate(zip(labels, probabilities)):
+                leaf_probabilities[i, [column_by_label[label] for label in title_labels]] = title_probabilities
+            return leaf_probabilities
+
+        return self.model.predict_proba(titles)
+
+    def decode_leaf_probabilities(self, probabilities):
+        node_probabilities = np.asarray(probabilities @ self.ancestors)
+
+        paths, scores = [], []
+        for i, column in enumerate(np.asarray(probabilities).argmax(axis=1)):
+            node = self.leaf_nodes[column]
+            if node < 0:
+                paths.append([])
+                scores.append([])
+            else:
+                path = self.tree_utils.paths[node, :self.tree_utils.depth[node]]
+                paths.append(path.tolist())
+                scores.append(node_probabilities[i, path].tolist())
+
+        return paths, scores
+
+    def predict_paths_rnn(self, titles):
+        import torch
+        with torch.no_grad():
+            logits = self.model(**self.tokenize(titles), num_levels=len(self.tree_utils.levels))[0]
+            _, nodes, probabilities = self.rnn_decoder(logits)
+
+        # Levels below the predicted leaf are filled up
+        fill_category = len(self.tree)
+        paths, scores = [], []
+        for path, path_scores in zip(nodes.tolist(), probabilities.tolist()):
+            length = path.index(fill_category) if fill_category in path else len(path)
+            paths.append(path[:length])
+            scores.append(path_scores[:length])
+
+        return paths, scores
@@ -0,0 +1,74 @@
+import http.client
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import numpy as np
+
+
+class CategoryClient:
+    """Client of the category server - the connection is kept alive across requests"""
+
+    def __init__(self, host='127.0.0.1', port=8080, timeout=10):
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def request(self, method, path, payload=None):
+        body = None if payload is None else json.dumps(payload)
+        self.connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+        response = self.connection.getresponse()
+        content = json.loads(response.read().decode('utf-8'))
+
+        if response.status != 200:
+            raise RuntimeError('Request failed with status {}: {}'.format(response.status, content.get('error')))
+        return content
+
+    def health(self):
+        return self.request('GET', '/health')
+
+    def predict(self, titles):
+        return self.request('POST', '/predict', {'titles': list(titles)})['predictions']
+
+    def close(self):
+        self.connection.close()
+
+
+@click.command()
+@click.option('--host', help='Host of the category server', default='127.0.0.1')
+@click.option('--port', help='Port of the category server', type=int, default=8080)
+@click.option('--title', help='Title sent with every request', default='Apple iPhone 12 Pro 128GB Graphite')
+@click.option('--requests', help='Number of requests', type=int, default=1000)
+@click.option('--concurrency', help='Number of concurrent clients', type=int, default=16)
+def main(host, port, title, requests, concurrency):
+    """Send single title requests from concurrent clients and report throughput & latency percentiles"""
+    logger = logging.getLogger(__name__)
+
+    def run_client(num_requests):
+        client = CategoryClient(host, port)
+        latencies = []
+        for _ in range(num_requests):
+            start = time.time()
+            client.predict([title])
+            latencies.append(time.time() - start)
+        client.close()
+        return latencies
+
+    logger.info('Prediction: {}'.format(CategoryClient(host, port).predict([title])[0]))
+
+    start = time.time()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = executor.map(run_client, [len(part) for part in np.array_split(np.arange(requests), concurrency)])
+        latencies = np.concatenate([np.array(result) for result in results]) * 1000
+    elapsed_time = time.time() - start
+
+    logger.info('{} requests in {:.1f}s - {:.0f} requests/s - latency p50 {:.1f}ms, p99 {:.1f}ms, max {:.1f}ms'
+                .format(requests, elapsed_time, requests / elapsed_time, np.percentile(latencies, 50),
+                        np.percentile(latencies, 99), latencies.max()))
+
+
+if __name__ == '__main__':
+    log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
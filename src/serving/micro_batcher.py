@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """Group titles of concurrent requests into batches for a predict function
+
+        A batch is predicted as soon as max_batch_size titles are queued or max_wait seconds passed since its first
+        title arrived. Batches are predicted one after another in a worker thread, such that the event loop keeps
+        accepting requests while the model runs. The queue is bounded - if it is full, requests are rejected
+        immediately instead of waiting, which keeps the tail latency bounded under overload."""
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait=0.005, max_queue_size=1024):
+        self.logger = logging.getLogger(__name__)
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+
+        self.queue = None
+        self.task = None
+        self.executor = None
+
+    async def start(self):
+        self.queue = asyncio.Queue(self.max_queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.executor.shutdown(wait=True)
+
+    async def predict(self, titles):
+        """Predict titles - raises asyncio.QueueFull if the titles do not fit into the queue"""
+        if self.queue.qsize() + len(titles) > self.max_queue_size:
+            raise asyncio.QueueFull()
+
+        loop = asyncio.get_event_loop()
+        futures = [loop.create_future() for _ in titles]
+        for title, future in zip(titles, futures):
+            self.queue.put_nowait((title, future))
+
+        return await asyncio.gather(*futures)
+
+    async def collect_batch(self):
+        loop = asyncio.get_event_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            # Take queued titles first, wait for new ones only until the deadline
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = await self.collect_batch()
+            titles = [title for title, _ in batch]
+
+            try:
+                predictions = await loop.run_in_executor(self.executor, self.predict_batch, titles)
+            except Exception as e:
+                self.logger.exception('Prediction of batch with {} titles failed!'.format(len(titles)))
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(prediction)
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import logging
+
+import click
+
+from src.serving.category_predictor import CategoryPredictor
+from src.serving.micro_batcher import MicroBatcher
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error',
+           503: 'Service Unavailable'}
+MAX_BODY_SIZE = 1 << 20
+
+
+class CategoryServer:
+    """Minimal HTTP/1.1 front-end on asyncio streams - connections are kept alive
+
+        GET /health answers {"status": "ok"}.
+        POST /predict expects {"titles": [...]} and answers {"predictions": [...]} in the same order."""
+
+    def __init__(self, batcher, host='127.0.0.1', port=8080):
+        self.logger = logging.getLogger(__name__)
+        self.batcher = batcher
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        await self.batcher.start()
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        # Resolve port if an ephemeral port (0) was requested
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.logger.info('Serving predictions at http://{}:{}/predict!'.format(self.host, self.port))
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.batcher.stop()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    header = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                try:
+                    method, path, headers = self.parse_header(header)
+                    content_length = int(headers.get('content-length', 0))
+                except ValueError:
+                    await self.respond(writer, 400, {'error': 'Malformed request'}, keep_alive=False)
+                    break
+
+                if content_length > MAX_BODY_SIZE:
+                    await self.respond(writer, 400, {'error': 'Request body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(content_length) if content_length > 0 else b''
+
+                status, response = await self.dispatch(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self.respond(writer, status, response, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    def parse_header(self, header):
+        lines = header.decode('latin-1').split('\r\n')
+        request_line = lines[0].split(' ')
+        if len(request_line) != 3:
+            raise ValueError('Malformed request line')
+
+        headers = dict([(key.strip().lower(), value.strip()) for key, value in
+                        [line.split(':', 1) for line in lines[1:] if ':' in line]])
+
+        return request_line[0], request_line[1], headers
+
+    async def dispatch(self, method, path, body):
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path != '/predict':
+            return 404, {'error': 'Unknown path {}'.format(path)}
+        if method != 'POST':
+            return 405, {'error': 'Use POST to request predictions'}
+
+        try:
+            titles = json.loads(body.decode('utf-8'))['titles']
+            if not isinstance(titles, list):
+                raise ValueError('titles must be a list')
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {'error': 'Invalid request: {}'.format(e)}
+
+        try:
+            predictions = await self.batcher.predict(titles)
+        except asyncio.QueueFull:
+            return 503, {'error': 'Too many queued titles'}
+        except Exception as e:
+            return 500, {'error': str(e)}
+
+        return 200, {'predictions': predictions}
+
+    async def respond(self, writer, status, response, keep_alive=True):
+        body = json.dumps(response).encode('utf-8')
+        header = 'HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: {}\r\n\r\n' \
+            .format(status, REASONS[status], len(body), 'keep-alive' if keep_alive else 'close')
+        writer.write(header.encode('latin-1') + body)
+        await writer.drain()
+
+
+async def serve(server):
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+@click.command()
+@click.option('--configuration', help='Evaluation configuration of the model that is served')
+@click.option('--host', help='Host to bind to', default='127.0.0.1')
+@click.option('--port', help='Port to bind to', type=int, default=8080)
+@click.option('--max_batch_size', help='Maximum number of titles per batch', type=int, default=32)
+@click.option('--max_wait_ms', help='Maximum time a title waits for its batch to fill up', type=float, default=5)
+@click.option('--max_queue_size', help='Maximum number of queued titles', type=int, default=1024)
+def main(configuration, host, port, max_batch_size, max_wait_ms, max_queue_size):
+    """Serve categorizations of product titles via HTTP"""
+    predictor = CategoryPredictor.from_configuration(configuration)
+    batcher = MicroBatcher(predictor.predict, max_batch_size=max_batch_size, max_wait=max_wait_ms / 1000,
+                           max_queue_size=max_queue_size)
+
+    asyncio.run(serve(CategoryServer(batcher, host, port)))
+
+
+if __name__ == '__main__':
+    log_fmt = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    logging.basicConfig(level=logging.INFO, format=log_fmt)
+
+    main()
@@ -0,0 +1,104 @@
+import gzip
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.data.webdatacommons import extract_product_names, product_store
+
+
+def strip_language_tag(value):
+    # Resuming does not depend on the text normalization - skip the lemmatization of preprocess
+    return value.split('@')[0]
+
+
+class TestExtractProductNames(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_dir = Path(self.tmp_dir.name).joinpath('input')
+        self.output_dir = Path(self.tmp_dir.name).joinpath('output')
+        self.file_dir.mkdir()
+        self.output_dir.mkdir()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_quads(self, file_name, number_of_products):
+        """Write one product with name & description per graph - the last graph only closes the previous product"""
+        file_path = self.file_dir.joinpath(file_name)
+        with gzip.open(file_path, 'wt', encoding='utf-8') as f:
+            for i in range(number_of_products + 1):
+                graph = '<http://shop{}.com/p/{}>'.format(i % 100, i)
+                f.write('_:node{} <http://schema.org/Product/name> "title {}"@en {} .\n'.format(i, i, graph))
+                f.write('_:node{} <http://schema.org/Product/description> "red shoe"@en {} .\n'.format(i, graph))
+
+        return str(file_path)
+
+    def test_collect_tasks(self):
+        """Test that the largest files come first and complete outputs are skipped"""
+        small = self.write_quads('products.nq-0.gz', 10)
+        large = self.write_quads('products.nq-1.gz', 1000)
+        medium = self.write_quads('products.nq-2.gz', 100)
+        self.write_quads('products.nq-3.gz', 100)
+
+        # nq-2 is interrupted and resumed, nq-3 is complete
+        self.output_dir.joinpath('nq-2').mkdir()
+        extract_product_names.persist_checkpoint(str(self.output_dir.joinpath('nq-2')), 0, 0)
+        self.output_dir.joinpath('nq-3').mkdir()
+
+        tasks = extract_product_names.collect_tasks(str(self.file_dir), str(self.output_dir))
+        self.assertEqual([large, medium, small], [input_file for input_file, _, _ in tasks])
+        self.assertEqual('{}/nq-1'.format(self.output_dir), tasks[0][1])
+        self.assertEqual(Path(large).stat().st_size, tasks[0][2])
+
+    @mock.patch.object(extract_product_names, 'preprocess_value', strip_language_tag)
+    def test_resume_after_interruption(self):
+        """Test that a writer failure is raised by the reader and the resumed run writes every product once"""
+        input_file = self.write_quads('products.nq-0.gz', 25000)
+        output_path = str(self.output_dir.joinpath('nq-0'))
+        write = extract_product_names.remove_duplicates_and_write_to_disk
+
+        def fail_after_second_part(products, path, part):
+            # Part 1 reaches the disk, but its checkpoint is never persisted
+            write(products, path, part)
+            if part == 1:
+                raise OSError('Disk full')
+
+        with mock.patch.object(extract_product_names, 'remove_duplicates_and_write_to_disk',
+                               side_effect=fail_after_second_part):
+            with self.assertRaises(OSError):
+                extract_product_names.extract_products(input_file, output_path, None)
+
+        checkpoint = extract_product_names.load_checkpoint(output_path)
+        self.assertEqual(10000, checkpoint['products'])
+        self.assertGreater(checkpoint['offset'], 0)
+        self.assertEqual(20000, len(product_store.read_products(output_path)))
+
+        # The line at the offset starts product 10000
+        with gzip.open(input_file, 'rb') as f:
+            f.seek(checkpoint['offset'])
+            self.assertIn(b'"title 10000"', f.readline())
+
+        self.assertEqual(25000, extract_product_names.extract_products(input_file, output_path, None))
+
+        titles = product_store.read_products(output_path, columns=['Title'])['Title']
+        self.assertEqual(25000, len(titles))
+        self.assertEqual(sorted(['title {}'.format(i) for i in range(25000)]), sorted(titles))
+        self.assertFalse(Path(extract_product_names.checkpoint_path(output_path)).exists())
+
+    @mock.patch.object(extract_product_names, 'preprocess_value', strip_language_tag)
+    def test_checkpoint_removed_on_completion(self):
+        """Test that a complete run removes its checkpoint, such that the output is no longer scheduled"""
+        input_file = self.write_quads('products.nq-0.gz', 10)
+        output_path = str(self.output_dir.joinpath('nq-0'))
+
+        self.assertEqual(10, extract_product_names.extract_products(input_file, output_path, None))
+        self.assertFalse(Path(extract_product_names.checkpoint_path(output_path)).exists())
+        self.assertIsNone(extract_product_names.load_checkpoint(output_path))
+        self.assertEqual([], extract_product_names.collect_tasks(str(self.file_dir), str(self.output_dir)))
+
+        with open(extract_product_names.checkpoint_path(output_path), 'w') as f:
+            json.dump({'offset': 0, 'products': 0}, f)
+        self.assertEqual(1, len(extract_product_names.collect_tasks(str(self.file_dir), str(self.output_dir))))
@@ -1,6 +1,8 @@
-from src.data.make_dataset import trigger_load_dataset
+from src.data.make_dataset import trigger_load_dataset, load_line_json, iterate_line_json
 
+import json
 import os
+import tempfile
 import unittest
 import pandas as pd
 from pathlib import Path
@@ -15,14 +17,14 @@ class TestMakeDataSet(unittest.TestCase):
     def test_load_dataset(self):
         """Test data load with existing data set --> Subset of Rakuten data set"""
         # Set up
-        path_to_pickle = 'data/processed/subset_rakuten/split/raw/train_data_subset_rakuten.pkl'
+        path_to_split = 'data/processed/subset_rakuten/split/raw/train_data_subset_rakuten.arrow'
 
         # Execute function
         trigger_load_dataset('subset_rakuten')
         # Test success
-        self.assertEqual(True, os.path.exists(path_to_pickle))
+        self.assertEqual(True, os.path.exists(path_to_split))
 
-        df_train_rakuten = pd.read_pickle(path_to_pickle)
+        df_train_rakuten = pd.read_feather(path_to_split)
         df_testing_train_rakuten = pd.read_pickle('data/testing/processed/subset_rakuten/split/raw/subset_rakuten_data_train.pkl')
 
         # Compare number of columns
@@ -38,6 +40,24 @@ class TestMakeDataSet(unittest.TestCase):
             self.assertEqual(str(df_testing_train_rakuten.loc[index]['category']), str(row['category']))
             self.assertEqual(str(df_testing_train_rakuten.loc[index]['path_list']), str(row['path_list']))
 
+    def test_load_line_json(self):
+        """Test bulk, parallel and streaming load of json lines"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'products.json')
+            with open(path, 'w') as f:
+                for i in range(10):
+                    f.write('{}\n'.format(json.dumps({'Name': 'product {}'.format(i), 'lvl1': str(i % 3)})))
+
+            df_products = load_line_json(path)
+            self.assertEqual(['Name', 'lvl1'], list(df_products.columns))
+            self.assertEqual(['product {}'.format(i) for i in range(10)], list(df_products['Name']))
+
+            df_parallel_products = load_line_json(path, workers=3)
+            self.assertEqual(list(df_products['Name']), list(df_parallel_products['Name']))
+
+            chunks = list(iterate_line_json(path, chunksize=4))
+            self.assertEqual([4, 4, 2], [len(chunk) for chunk in chunks])
+
 
 if __name__ == '__main__':
     unittest.main()
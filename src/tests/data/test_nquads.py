@@ -0,0 +1,36 @@
+import unittest
+
+from src.data.webdatacommons.nquads import HostMatcher, parse_quad
+
+
+class TestNQuads(unittest.TestCase):
+
+    def test_parse_quad(self):
+        """Test splitting of N-Quads lines with literal, blank node and malformed objects"""
+        line = '_:node1 <http://schema.org/Product/name> "Red Shoe - Size 42"@en <https://www.shop.com/p/1> .\n'
+        self.assertEqual(('_:node1', '<http://schema.org/Product/name>', 'Red Shoe - Size 42@en',
+                          '<https://www.shop.com/p/1>'), parse_quad(line))
+
+        line = '_:node1 <http://schema.org/Product/offers> _:node2 <https://www.shop.com/p/1> .\n'
+        self.assertEqual('_:node2', parse_quad(line)[2])
+
+        self.assertIsNone(parse_quad('_:node1 <http://schema.org/Product/name> "Red Shoe"@en .\n'))
+        self.assertIsNone(parse_quad('\n'))
+
+    def test_host_matcher(self):
+        """Test host matching including subdomains"""
+        hosts = HostMatcher(['shop.com', 'store.de'])
+
+        self.assertIn('<https://www.shop.com/p/1>', hosts)
+        self.assertIn('<http://outlet.store.de/p/1>', hosts)
+        self.assertNotIn('<https://www.myshop.com/p/1>', hosts)
+        self.assertNotIn('<https://www.store.com/p/1>', hosts)
+
+        # IRIs without path, with upper case letters or with port
+        self.assertIn('<https://shop.com>', hosts)
+        self.assertIn('<https://Shop.com/x>', hosts)
+        self.assertIn('<https://shop.com:8080/x>', hosts)
+        self.assertIn('<http://WWW.Outlet.Store.DE:443>', hosts)
+        self.assertIn('<https://shop.com#top>', hosts)
+        self.assertIn('<https://www.shop.com/p/1>', HostMatcher(['Shop.com']))
+        self.assertNotIn('<https://myshop.com:8080>', hosts)
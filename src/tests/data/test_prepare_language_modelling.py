@@ -0,0 +1,27 @@
+import unittest
+
+from src.data.prepare_language_modelling import generate_additional_lines, generate_lines
+
+
+class TestPrepareLanguageModelling(unittest.TestCase):
+
+    def test_generate_lines(self):
+        """Test that configurations derive their lines from the same preprocessed record"""
+        record = ('red shoe', ['clothe', 'shoe'], ['very nice shoe', 'great quality'])
+        config = {'category': True, 'category_reverse': False, 'description': True,
+                  'multiple_rows': True, 'additional_ds': False}
+
+        self.assertEqual(['red shoe - clothe shoe', 'red shoe - very nice shoe. great quality'],
+                         generate_lines(config, *record))
+
+        config.update({'category_reverse': True, 'multiple_rows': False})
+        self.assertEqual(['red shoe - shoe clothe - very nice shoe. great quality'], generate_lines(config, *record))
+        # Records are not modified
+        self.assertEqual(['clothe', 'shoe'], record[1])
+
+    def test_generate_additional_lines(self):
+        """Test that the title line of the additional dataset is always written"""
+        config = {'category': True, 'category_reverse': False, 'description': True,
+                  'multiple_rows': True, 'additional_ds': True}
+
+        self.assertEqual(['cap - Home > Caps', 'cap'], generate_additional_lines(config, 'cap', ['Home > Caps'], None))
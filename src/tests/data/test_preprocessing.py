@@ -0,0 +1,66 @@
+import unittest
+
+from src.data import preprocessing
+from src.data.preprocessing import TextPreprocessor, create_pool, preprocess_parallel
+
+
+class PluralLemmatizer:
+    """Stand-in for the WordNet lemmatizer - strips a trailing s and counts calls"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def lemmatize(self, token):
+        self.calls += 1
+        return token[:-1] if token.endswith('s') else token
+
+
+class TestPreprocessing(unittest.TestCase):
+
+    def test_preprocess_many(self):
+        """Test normalization, tokenization and memoized lemmatization"""
+        lemmatizer = PluralLemmatizer()
+        text_preprocessor = TextPreprocessor(lemmatizer)
+
+        texts = ["Men's Running Shoes - Size 42 (Black) http://shop.com/p/1", 'running shoes', '']
+        preprocessed_texts = text_preprocessor.preprocess_many(texts)
+
+        self.assertEqual(['men s running shoe size 42 black', 'running shoe', ''], preprocessed_texts)
+        # Tokens shorter than 4 characters are not lemmatized & each distinct token is lemmatized once
+        self.assertEqual(4, lemmatizer.calls)
+
+    def test_preprocess_parallel(self):
+        """Test that parallel preprocessing preserves order and merges the lemmas learned by the workers"""
+        lemmatizer = preprocessing.text_preprocessor.lemmatizer
+        lemmas = preprocessing.text_preprocessor.lemmas
+        preprocessing.text_preprocessor.lemmatizer = PluralLemmatizer()
+        preprocessing.text_preprocessor.lemmas = {}
+        try:
+            texts = ['blue shoes {}'.format(i) for i in range(50)] + ['', 'Red\0Jackets']
+            preprocessed_texts = preprocess_parallel(texts, workers=2, chunksize=8)
+
+            self.assertEqual(TextPreprocessor(PluralLemmatizer()).preprocess_many(texts), preprocessed_texts)
+            self.assertEqual({'blue': 'blue', 'shoes': 'shoe', 'jackets': 'jacket'},
+                             preprocessing.text_preprocessor.lemmas)
+        finally:
+            preprocessing.text_preprocessor.lemmatizer = lemmatizer
+            preprocessing.text_preprocessor.lemmas = lemmas
+
+    def test_preprocess_parallel_shared_pool(self):
+        """Test that a pool is reused by several calls and stays open afterwards"""
+        lemmatizer = preprocessing.text_preprocessor.lemmatizer
+        lemmas = preprocessing.text_preprocessor.lemmas
+        preprocessing.text_preprocessor.lemmatizer = PluralLemmatizer()
+        preprocessing.text_preprocessor.lemmas = {}
+        try:
+            with create_pool(2) as pool:
+                for texts in [['blue shoes {}'.format(i) for i in range(20)], ['red jackets', 'blue shoes']]:
+                    preprocessed_texts = preprocess_parallel(texts, chunksize=8, pool=pool)
+                    self.assertEqual(TextPreprocessor(PluralLemmatizer()).preprocess_many(texts), preprocessed_texts)
+
+                self.assertEqual([4], pool.map(len, [['a', 'b', 'c', 'd']]))
+            self.assertEqual({'blue': 'blue', 'shoes': 'shoe', 'jackets': 'jacket'},
+                             preprocessing.text_preprocessor.lemmas)
+        finally:
+            preprocessing.text_preprocessor.lemmatizer = lemmatizer
+            preprocessing.text_preprocessor.lemmas = lemmas
@@ -0,0 +1,36 @@
+import tempfile
+import unittest
+
+import pandas as pd
+
+from src.data.webdatacommons import product_store
+
+
+class TestProductStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_products(self):
+        """Test partitioned round trip with column projection, host filter and removal of parts"""
+        hosts = ['shop{}.com'.format(i) for i in range(20)]
+        df_products = pd.DataFrame({column: ['{}'.format(i) for i in range(40)]
+                                    for column in product_store.PRODUCT_COLUMNS})
+        df_products['Host'] = hosts * 2
+        df_products['Category'] = ''
+        product_store.write_product_partitions(df_products[:20], self.tmp_dir.name, 0)
+        product_store.write_product_partitions(df_products[20:], self.tmp_dir.name, 1)
+
+        df_read = product_store.read_products(self.tmp_dir.name)
+        self.assertEqual(sorted(df_products['Title']), sorted(df_read['Title']))
+        self.assertTrue(df_read['Category'].isnull().all())
+
+        df_read = product_store.read_products(self.tmp_dir.name, columns=['Title', 'Host'], hosts=['shop3.com'])
+        self.assertEqual(['Title', 'Host'], list(df_read.columns))
+        self.assertEqual(['23', '3'], sorted(df_read['Title']))
+
+        product_store.remove_parts(self.tmp_dir.name, 1)
+        self.assertEqual(20, len(product_store.read_products(self.tmp_dir.name)))
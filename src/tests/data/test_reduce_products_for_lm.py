@@ -0,0 +1,33 @@
+import unittest
+
+import pandas as pd
+
+from src.data.webdatacommons.reduce_products_for_LM import HostSuffixTrie, sample_products_per_host
+
+
+class TestReduceProductsForLM(unittest.TestCase):
+
+    def test_host_suffix_trie(self):
+        """Test that subdomains resolve to the most specific searched host"""
+        trie = HostSuffixTrie(['shop.com', 'outlet.shop.com'])
+
+        self.assertEqual('shop.com', trie.lookup('shop.com'))
+        self.assertEqual('shop.com', trie.lookup('de.shop.com'))
+        self.assertEqual('outlet.shop.com', trie.lookup('de.outlet.shop.com'))
+        self.assertIsNone(trie.lookup('myshop.com'))
+
+        # Malformed hosts with empty labels
+        self.assertEqual('shop.com', trie.lookup('a..shop.com'))
+        self.assertIsNone(trie.lookup('shop..com'))
+        self.assertIsNone(trie.lookup(''))
+
+    def test_sample_products_per_host(self):
+        """Test per-host cap, host order and subdomain matching"""
+        df_products = pd.DataFrame({'title': [str(i) for i in range(9)],
+                                    'host': ['shop.com'] * 5 + ['www.store.de'] * 2 + ['de.shop.com', None]})
+
+        df_reduced_products = sample_products_per_host(df_products, ['store.de', 'shop.com'], 3, seed=1)
+        self.assertEqual(['www.store.de'] * 2 + ['shop.com'] * 3, list(df_reduced_products['host']))
+
+        df_reduced_products = sample_products_per_host(df_products, ['shop.com'], 10, match_subdomains=True)
+        self.assertEqual(6, len(df_reduced_products))
@@ -0,0 +1,27 @@
+import tempfile
+import unittest
+
+import pandas as pd
+
+from src.data import split_storage
+
+
+class TestSplitStorage(unittest.TestCase):
+
+    def test_persist_and_load_split(self):
+        """Test round trip, column projection and label vocabulary of persisted splits"""
+        df_dataset = pd.DataFrame({'title': ['shoe', 'shirt', 'jacket'],
+                                   'description': ['red', None, 'warm'],
+                                   'category': ['b', 'a', 'b']}, index=[7, 3, 5])
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            split_storage.persist_split(df_dataset, data_dir, 'test', 'train')
+
+            pd.testing.assert_frame_equal(df_dataset, split_storage.load_split(data_dir, 'test', 'train'))
+
+            df_projected = split_storage.load_split(data_dir, 'test', 'train', columns=['title'])
+            self.assertEqual(['title'], list(df_projected.columns))
+            self.assertEqual([7, 3, 5], list(df_projected.index))
+
+            self.assertEqual(3, split_storage.load_manifest(data_dir, 'test')['splits']['train']['rows'])
+            self.assertEqual(['a', 'b'], split_storage.load_labels(data_dir, 'test'))
@@ -0,0 +1,24 @@
+import unittest
+
+from src.data.webdatacommons.streaming_aggregation import BloomFilter, HostReservoirSampler, TitleSet, hash_titles
+
+
+class TestStreamingAggregation(unittest.TestCase):
+
+    def test_title_filters(self):
+        """Test that title set and Bloom filter detect duplicates across and within batches"""
+        for title_filter in [TitleSet(), BloomFilter(1000)]:
+            self.assertEqual([True, True, False], title_filter.add_new(hash_titles(['shoe', 'shirt', 'shoe'])).tolist())
+            self.assertEqual([False, True], title_filter.add_new(hash_titles(['shirt', 'jacket'])).tolist())
+
+    def test_host_reservoir_sampler(self):
+        """Test that at most capacity products are kept per host"""
+        sampler = HostReservoirSampler(3, seed=42)
+        for i in range(100):
+            sampler.add('shop.com', i)
+        sampler.add('store.com', 100)
+
+        products = list(sampler.products())
+        self.assertEqual(4, len(sampler))
+        self.assertEqual(3, len(set(products[:3])))
+        self.assertEqual(100, products[3])
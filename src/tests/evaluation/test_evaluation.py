@@ -3,6 +3,8 @@ import pickle
 import unittest
 from pathlib import Path
 
+import networkx as nx
+
 from src.evaluation import scorer
 
 
@@ -91,4 +93,18 @@ class TestMakeDataSet(unittest.TestCase):
         # Lvl3 must match leaf node prediction in this scenario
         self.assertEqual(results['weighted_f1_lvl_3'], results['leaf_weighted_f1'])
 
+    def test_hierarchical_score(self):
+        """Ancestors of the first node below root must be counted as well"""
+        tree = nx.DiGraph()
+        tree.add_edges_from([(0, 1), (0, 2), (1, 3), (1, 4), (2, 5)])
+
+        y_true = [3, 5]
+        y_pred = [4, 5]
+
+        node_index, ancestor_matrix = scorer.build_ancestor_matrix(tree)
+        h_prec, h_rec = scorer.h_score(y_true, y_pred, node_index, ancestor_matrix)
 
+        self.assertEqual(0.75, h_prec)
+        self.assertEqual(0.75, h_rec)
+        # Unknown labels do not have any ancestors
+        self.assertEqual(0.0, scorer.hierarchical_score([3], [42], tree, 0, name=None))
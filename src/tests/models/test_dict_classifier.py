@@ -0,0 +1,50 @@
+import json
+import tempfile
+import unittest
+
+import networkx as nx
+
+from src.models.dictionary.dictclassifier import DictClassifier
+
+
+class StaticDictClassifier(DictClassifier):
+    """Dict classifier with fixed synonyms - no WordNet download required"""
+
+    def generate_synonyms(self, dataset):
+        self.synonyms_dict = {'Running Shoes': ['sneaker', 'trainer'], 'Shirts': ['blouse'], 'Socks': []}
+
+
+class TestDictClassifier(unittest.TestCase):
+
+    def test_classify_dictionary_based_index(self):
+        """Test that index mode scores titles via relative counts of whole class words"""
+        dict_classifier = StaticDictClassifier('test', 'Socks', nx.DiGraph())
+        titles = ['blue running shoes running', 'white blouse', 'red socks', 'wool hat']
+
+        y_pred = dict_classifier.classify_dictionary_based(titles, None, synonyms=True, lemmatize=False, index=True)
+        self.assertEqual(['Running Shoes', 'Shirts', 'Socks', 'Socks'], y_pred)
+
+        scores = dict_classifier.score_titles(titles, synonyms=True, lemmatize=False).toarray()
+        # 'running' occurs twice & 'shoes' once - 4 class words
+        self.assertAlmostEqual(0.75, scores[0, 0])
+        self.assertEqual(0, scores[3].sum())
+
+    def test_load_persisted_synonyms(self):
+        """Test that persisted synonyms & lemmas are loaded without querying WordNet"""
+        tree = nx.DiGraph()
+        tree.add_nodes_from([(0, {'name': 'Root'}), (1, {'name': 'Running Shoes'}), (2, {'name': 'Shirts'})])
+        tree.add_edges_from([(0, 1), (0, 2)])
+
+        with tempfile.TemporaryDirectory() as data_dir:
+            path = StaticDictClassifier('test', 'Shirts', tree, data_dir).synonyms_path(['Running Shoes', 'Shirts'])
+            path.parent.mkdir(parents=True)
+            with open(path, 'w') as f:
+                json.dump({'synonyms': {'Running Shoes': ['sneaker'], 'Shirts': []},
+                           'lemmas': {'running': 'running', 'shoes': 'shoe', 'sneaker': 'sneaker', 'shirts': 'shirt'}},
+                          f)
+
+            dict_classifier = DictClassifier('test', 'Shirts', tree, data_dir)
+            dict_classifier.wnl = None
+
+            self.assertEqual({'Running Shoes': ['sneaker'], 'Shirts': []}, dict_classifier.synonyms_dict)
+            self.assertEqual(['shirt'], dict_classifier.prepare_classes(synonyms=True, lemmatize=True)['Shirts'])
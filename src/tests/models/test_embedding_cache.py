@@ -0,0 +1,73 @@
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+from torch import nn
+
+from src.models.transformers.dataset.category_dataset_flat import CategoryDatasetFlat
+from src.models.transformers.dataset.embedding_cache import EmbeddingCache
+from src.tests.models.test_tokenization_cache import WhitespaceTokenizer
+
+
+class PaddedWhitespaceTokenizer(WhitespaceTokenizer):
+    pad_token_id = 1
+
+
+class EmbeddingEncoder(nn.Module):
+    """Stand-in for RobertaModel - the hidden states depend on the whole (masked) sequence"""
+
+    def __init__(self, hidden_size):
+        super().__init__()
+        self.config = SimpleNamespace(hidden_size=hidden_size)
+        self.embeddings = nn.Embedding(16, hidden_size)
+        self.calls = 0
+
+    def forward(self, input_ids, attention_mask=None, return_dict=False):
+        self.calls += 1
+        mask = attention_mask.unsqueeze(-1)
+        mean = (self.embeddings(input_ids) * mask).sum(1, keepdim=True) / mask.sum(1, keepdim=True)
+        return (self.embeddings(input_ids) + mean,)
+
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        torch.manual_seed(42)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.split_path = Path(self.tmp_dir.name).joinpath('train_data_test.pkl')
+        self.split_path.write_bytes(b'split')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_encode(self):
+        """Test that cached <s> embeddings match the encoder output per text and are reused"""
+        texts = ['red shoe', 'blue winter jacket with hood', 'hat']
+        tokenizer = PaddedWhitespaceTokenizer()
+        encoder = EmbeddingEncoder(4)
+
+        cache = EmbeddingCache(self.tmp_dir.name, 'test', batch_size=2)
+        cache.encoders['encoder'] = encoder
+        embeddings = cache.encode([self.split_path], tokenizer, False, False, len(texts), lambda: texts, 'encoder')
+        cached_embeddings = cache.encode([self.split_path], tokenizer, False, False, len(texts), lambda: texts,
+                                         'encoder')
+
+        self.assertEqual(2, encoder.calls)
+        self.assertEqual(np.float16, cached_embeddings.embeddings.dtype)
+        with torch.no_grad():
+            for idx, ids in enumerate(tokenizer(texts)['input_ids']):
+                input_ids = torch.tensor([ids])
+                expected = encoder(input_ids, attention_mask=torch.ones_like(input_ids))[0][0, 0]
+                self.assertTrue(torch.allclose(expected, cached_embeddings.get_item(idx)['embeddings'], atol=1e-2))
+                self.assertTrue(torch.equal(embeddings.get_item(idx)['embeddings'],
+                                            cached_embeddings.get_item(idx)['embeddings']))
+
+        # Embeddings replace the token ids of the datasets
+        dataset = CategoryDatasetFlat(None, ['Shoes', 'Jackets', 'Hats'], None,
+                                      {'Shoes': {'derived_key': 1}, 'Jackets': {'derived_key': 2},
+                                       'Hats': {'derived_key': 3}}, encodings=cached_embeddings)
+        self.assertEqual(['embeddings', 'labels'], sorted(dataset[1].keys()))
+        self.assertEqual(2, dataset[1]['labels'].item())
@@ -0,0 +1,101 @@
+import importlib.util
+import tempfile
+import unittest
+
+import networkx as nx
+import torch
+
+from src.models.transformers.custom_transformers.modules.lcpn_head import compile_lcpn_structure
+from src.utils.tree_utils import TreeUtils
+
+TRANSFORMERS_AVAILABLE = importlib.util.find_spec('transformers') is not None
+if TRANSFORMERS_AVAILABLE:
+    from transformers import RobertaConfig, RobertaModel
+
+    from src.models.transformers.custom_transformers.head_only_models import HEAD_ONLY_MODELS, \
+        provide_head_only_model
+
+
+@unittest.skipIf(not TRANSFORMERS_AVAILABLE, 'transformers is not installed')
+class TestHeadOnlyModels(unittest.TestCase):
+
+    def setUp(self):
+        torch.manual_seed(42)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+        # Tiny encoder - the hierarchy models expect hidden states of size 768
+        self.config = RobertaConfig(vocab_size=32, hidden_size=768, num_hidden_layers=1, num_attention_heads=2,
+                                    intermediate_size=32, max_position_embeddings=40, hidden_dropout_prob=0.,
+                                    attention_probs_dropout_prob=0.)
+        self.encoder = RobertaModel(self.config, add_pooling_layer=False).eval()
+        self.encoder.save_pretrained(self.tmp_dir.name)
+
+        self.input_ids = torch.tensor([[0, 5, 6, 7, 2], [0, 8, 9, 2, 1], [0, 10, 2, 1, 1]])
+        self.attention_mask = (self.input_ids != self.config.pad_token_id).long()
+
+        # Run the encoder once - the heads are trained on the <s> embeddings
+        with torch.no_grad():
+            self.embeddings = self.encoder(self.input_ids, attention_mask=self.attention_mask,
+                                           return_dict=False)[0][:, 0, :]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def provide_config_and_labels(self, name):
+        config = RobertaConfig.from_dict(self.config.to_dict())
+        config.num_labels = 5
+        labels = torch.tensor([0, 2, 4])
+
+        if name == 'roberta-base-hierarchy-rnn':
+            config.num_levels = 3
+            labels = torch.tensor([[0, 1, 2], [1, 3, 4], [2, 2, 0]])
+        elif name == 'roberta-base-hierarchy':
+            config.paths = [[0, 0, 0], [1, 1, 1], [1, 1, 2], [1, 2, 3], [2, 3, 4]]
+            config.num_labels_per_lvl = {1: 3, 2: 4, 3: 5}
+        elif name == 'roberta-base-hierarchy-lcpn':
+            tree = nx.DiGraph()
+            tree.add_edges_from([(0, 1), (0, 2), (1, 3), (1, 4), (2, 5), (5, 6)])
+            config.lcpn_parents, config.lcpn_children, config.lcpn_leaves = \
+                compile_lcpn_structure(tree, TreeUtils(tree))
+            config.num_labels = len(config.lcpn_leaves)
+            labels = torch.tensor([0, 1, 2])
+
+        return config, labels
+
+    def test_assemble(self):
+        """Test that the assembled full models reproduce logits & loss of the heads trained on embeddings"""
+        for name in HEAD_ONLY_MODELS:
+            with self.subTest(name=name):
+                config, labels = self.provide_config_and_labels(name)
+                head_only = provide_head_only_model(name, config).eval()
+                model = head_only.assemble(self.tmp_dir.name).eval()
+
+                with torch.no_grad():
+                    loss, logits = head_only(embeddings=self.embeddings, labels=labels, return_dict=False)
+                    expected_loss, expected_logits = model(input_ids=self.input_ids,
+                                                           attention_mask=self.attention_mask, labels=labels,
+                                                           return_dict=False)[:2]
+                    label_free_logits = head_only(embeddings=self.embeddings, return_dict=False)[0]
+
+                self.assertTrue(torch.allclose(expected_logits, logits, atol=1e-5))
+                self.assertTrue(torch.allclose(expected_loss, loss, atol=1e-5))
+                self.assertTrue(torch.allclose(expected_logits, label_free_logits, atol=1e-5))
+
+    def test_train_head(self):
+        """Test that the label loss of every head only model trains the head"""
+        for name in HEAD_ONLY_MODELS:
+            with self.subTest(name=name):
+                config, labels = self.provide_config_and_labels(name)
+                head_only = provide_head_only_model(name, config)
+                optimizer = torch.optim.Adam(head_only.parameters(), lr=1e-4)
+
+                losses = []
+                for _ in range(10):
+                    optimizer.zero_grad()
+                    loss = head_only(embeddings=self.embeddings, labels=labels, return_dict=False)[0]
+                    loss.backward()
+                    optimizer.step()
+                    losses.append(loss.item())
+
+                self.assertTrue(all([parameter.grad is not None for parameter in head_only.parameters()]))
+                self.assertLess(losses[-1], losses[0])
@@ -0,0 +1,158 @@
+import unittest
+from types import SimpleNamespace
+
+import networkx as nx
+import torch
+from torch import nn
+from torch.nn import CrossEntropyLoss
+
+from src.models.transformers.custom_transformers.modules.hierarchical_classification_head import \
+    HierarchicalClassificationHead, encode_hierarchy_paths
+from src.models.transformers.dataset.category_dataset_flat import CategoryDatasetFlat
+from src.models.transformers.dataset.dynamic_padding_collator import DynamicPaddingCollator
+from src.tests.models.test_tokenization_cache import WhitespaceTokenizer
+from src.utils.tree_utils import TreeUtils
+
+
+class BaselineHierarchicalClassificationHead(nn.Module):
+    """Fixed copy of the original head - one linear layer per node, evaluated node by node and path by path"""
+
+    def __init__(self, config):
+        super(BaselineHierarchicalClassificationHead, self).__init__()
+
+        self.hidden_size = config.hidden_size
+        self.paths_per_lvl = self.initialize_paths_per_lvl(config.paths)
+
+        self.num_labels_per_lvl = {}
+        for count, number in enumerate(config.num_labels_per_lvl.items()):
+            self.num_labels_per_lvl[count + 1] = number[1]
+
+        self.dropout = nn.Dropout(config.hidden_dropout_prob)
+
+        self.nodes = {}
+        for lvl in self.num_labels_per_lvl:
+            self.nodes[lvl] = nn.ModuleList([nn.Linear(self.hidden_size, 1)
+                                             for i in range(self.num_labels_per_lvl[lvl])])
+
+    def forward(self, input, labels):
+        loss_fct = CrossEntropyLoss()
+        loss = None
+
+        input = self.dropout(input)
+
+        for lvl in self.nodes:
+            logit_list = [node(input) for node in self.nodes[lvl]]
+            logits = torch.stack(logit_list, dim=1)
+
+            updated_labels = self.update_label_per_lvl(labels, lvl)
+
+            if loss is None:
+                loss = loss_fct(logits.view(-1, self.num_labels_per_lvl[lvl]), updated_labels.view(-1))
+            else:
+                loss += loss_fct(logits.view(-1, self.num_labels_per_lvl[lvl]), updated_labels.view(-1))
+
+        # lvl = 3 --> longest path
+        logit_list = [self.predict_along_path(input, path, 3) for path in self.paths_per_lvl[3]]
+        logits = torch.stack(logit_list, dim=1)
+
+        updated_labels = self.update_label_per_lvl(labels, 3)
+        loss += loss_fct(logits.view(-1, self.num_labels_per_lvl[3]), updated_labels.view(-1))
+
+        return logits, loss
+
+    def predict_along_path(self, input, path, lvl):
+        logits = [torch.sigmoid(self.nodes[i + 1][path[i]](input)) for i in range(lvl)]
+        logits = torch.cat(logits, dim=1)
+
+        return torch.prod(logits, dim=1)
+
+    def initialize_paths_per_lvl(self, paths):
+        length = max([len(path) for path in paths])
+        paths_per_lvl = {}
+        for i in range(length):
+            added_paths = set()
+            paths_per_lvl[i + 1] = []
+            for path in paths:
+                new_path = path[:i + 1]
+                new_tuple = tuple(new_path)
+                if not (new_tuple in added_paths):
+                    added_paths.add(new_tuple)
+                    paths_per_lvl[i + 1].append(new_path)
+
+        return paths_per_lvl
+
+    def update_label_per_lvl(self, labels, lvl):
+        unique_values = labels
+        updated_labels = labels.clone()
+        for value in unique_values:
+            searched_path = self.paths_per_lvl[len(self.paths_per_lvl)][value]
+            if len(searched_path) >= lvl:
+                update_value = searched_path[lvl - 1]
+                updated_labels[updated_labels == value] = update_value
+
+        return updated_labels
+
+
+class TestHierarchicalClassificationHead(unittest.TestCase):
+
+    def setUp(self):
+        torch.manual_seed(42)
+        self.config = SimpleNamespace(hidden_size=8, hidden_dropout_prob=0.1,
+                                      paths=[[0, 0, 0], [1, 1, 1], [1, 1, 2], [1, 2, 3], [2, 3, 4]],
+                                      num_labels_per_lvl={1: 3, 2: 4, 3: 5})
+
+    def test_same_outputs_as_baseline(self):
+        """Test that the batched head reproduces logits & loss of the per node baseline on copied weights"""
+        baseline = BaselineHierarchicalClassificationHead(self.config).eval()
+        head = HierarchicalClassificationHead(self.config).eval()
+
+        # Node j on lvl l of the baseline is row j of the weight matrix of lvl l
+        with torch.no_grad():
+            for lvl, nodes in enumerate(head.nodes, start=1):
+                nodes.weight.copy_(torch.cat([node.weight for node in baseline.nodes[lvl]]))
+                nodes.bias.copy_(torch.cat([node.bias for node in baseline.nodes[lvl]]))
+
+        input = torch.randn(4, 8)
+        # The baseline substitutes labels in place - ascending labels keep substituted values from colliding
+        labels = torch.tensor([0, 2, 4, 4])
+
+        baseline_logits, baseline_loss = baseline(input, labels)
+        logits, loss = head(input, labels)
+
+        self.assertTrue(torch.allclose(baseline_logits, logits, atol=1e-6))
+        self.assertTrue(torch.allclose(baseline_loss, loss, atol=1e-5))
+
+    def test_encode_hierarchy_paths_mixed_depth(self):
+        """Test that leaves of different depth get label paths of equal length that agree with the head"""
+        # Leaf Boots below Shoes > Winter on lvl 3 & leaf Hats directly below Accessories on lvl 2
+        tree = nx.DiGraph()
+        tree.add_nodes_from([(0, {'name': 'Root'}), (1, {'name': 'Shoes'}), (2, {'name': 'Accessories'}),
+                             (3, {'name': 'Winter'}), (4, {'name': 'Boots'}), (5, {'name': 'Hats'})])
+        tree.add_edges_from([(0, 1), (0, 2), (1, 3), (3, 4), (2, 5)])
+        tree_utils = TreeUtils(tree)
+
+        normalized_encoder, normalized_decoder, paths = encode_hierarchy_paths(tree, tree_utils)
+        self.assertEqual([[0, 0, 0], [1, 1, 1], [2, 2]], paths)
+        self.assertEqual([1, 1, 1], normalized_encoder['Boots']['derived_path'])
+        self.assertEqual([2, 2, 2], normalized_encoder['Hats']['derived_path'])
+
+        config = SimpleNamespace(hidden_size=8, hidden_dropout_prob=0.1, paths=paths,
+                                 num_labels_per_lvl=tree_utils.get_number_of_nodes_lvl())
+        head = HierarchicalClassificationHead(config)
+        for value in normalized_encoder.values():
+            self.assertEqual(value['derived_path'], head.leaf_to_level_label[:, value['derived_key']].tolist())
+
+        # The path of Hats ends on lvl 2 - its probability is the product along its own nodes
+        all_logits = torch.randn(2, sum(config.num_labels_per_lvl.values()))
+        probabilities = torch.sigmoid(all_logits)
+        self.assertTrue(torch.allclose(probabilities[:, 2] * probabilities[:, 3 + 2],
+                                       head.predict_along_paths(all_logits, 3)[:, 2]))
+
+        # Per lvl labels of all leaves are batched - the last lvl holds the leaf label
+        labels = ['Boots', 'Hats', 'Root']
+        dataset = CategoryDatasetFlat(['winter boots', 'red hat', 'misc'], labels, WhitespaceTokenizer(),
+                                      normalized_encoder, per_lvl_labels=True, dynamic_padding=True)
+        batch = DynamicPaddingCollator(1)([dataset[i] for i in range(len(dataset))])
+        self.assertEqual((3, 3), tuple(batch['labels'].shape))
+        self.assertEqual(['Boots', 'Hats', 'Root'],
+                         [normalized_decoder[label]['value'] for label in batch['labels'][:, -1].tolist()])
@@ -0,0 +1,108 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import torch
+from torch import nn
+
+from src.models.transformers import inference_models
+from src.models.transformers.custom_transformers.modules.hierarchical_classification_head import \
+    HierarchicalClassificationHead
+from src.models.transformers.custom_transformers.modules.roberta_rnn_head import RobertaRNNHead
+
+
+ONNX_AVAILABLE = all([importlib.util.find_spec(name) is not None for name in ['onnx', 'onnxruntime']])
+
+
+class EmbeddingEncoder(nn.Module):
+    """Stand-in for RobertaModel - embeds tokens and returns the hidden states as tuple"""
+
+    def __init__(self, hidden_size):
+        super().__init__()
+        self.embeddings = nn.Embedding(10, hidden_size)
+
+    def forward(self, input_ids, attention_mask=None, return_dict=False):
+        return (self.embeddings(input_ids) * attention_mask.unsqueeze(-1),)
+
+
+class SequenceClassifier(nn.Module):
+    """Stand-in for RobertaForSequenceClassification - classifies the first token of the embeddings"""
+
+    def __init__(self, hidden_size, num_labels):
+        super().__init__()
+        self.roberta = EmbeddingEncoder(hidden_size)
+        self.classifier = nn.Linear(hidden_size, num_labels)
+
+    def forward(self, input_ids=None, attention_mask=None, labels=None, return_dict=None):
+        logits = self.classifier(self.roberta(input_ids, attention_mask)[0][:, 0, :])
+        return (logits,) if labels is None else (nn.functional.cross_entropy(logits, labels), logits)
+
+
+class TestInferenceModels(unittest.TestCase):
+
+    def setUp(self):
+        torch.manual_seed(42)
+        self.config = SimpleNamespace(hidden_size=8, hidden_dropout_prob=0.1, num_labels=5,
+                                      paths=[[0, 0], [1, 1], [1, 2], [2, 3]], num_labels_per_lvl={1: 3, 2: 4})
+        self.input_ids = torch.tensor([[1, 2, 3], [4, 5, 0]])
+        self.attention_mask = torch.tensor([[1, 1, 1], [1, 1, 0]])
+
+    def test_rnn_inference_model(self):
+        """Test that the unrolled RNN head matches the step-wise head and survives quantization & tracing"""
+        model = SimpleNamespace(roberta=EmbeddingEncoder(8), classifier=RobertaRNNHead(self.config, 5))
+        inference_model = inference_models.build_inference_model(model, 'eval-transformer-based-rnn', num_levels=3)
+
+        logits = inference_model(self.input_ids, self.attention_mask)
+        self.assertEqual((2, 3, 5), tuple(logits.shape))
+
+        sequence_output = model.roberta(self.input_ids, self.attention_mask)[0][:, 0, :]
+        hidden = torch.zeros(2, 8)
+        for lvl in range(3):
+            logits_lvl, hidden = model.classifier(sequence_output, hidden)
+            self.assertTrue(torch.allclose(logits_lvl, logits[:, lvl]))
+
+        quantized_model = inference_models.quantize_dynamic(inference_model)
+        with tempfile.TemporaryDirectory() as directory:
+            path = inference_models.export_torchscript(quantized_model, os.path.join(directory, 'model.pt'))
+            traced_model = torch.jit.load(path)
+        self.assertTrue(torch.allclose(quantized_model(self.input_ids, self.attention_mask),
+                                       traced_model(self.input_ids, self.attention_mask)))
+
+    def test_hierarchy_inference_model(self):
+        """Test that the label free hierarchy model predicts along the longest paths"""
+        model = SimpleNamespace(roberta=EmbeddingEncoder(8), classifier=HierarchicalClassificationHead(self.config))
+        model.classifier.eval()
+        inference_model = inference_models.build_inference_model(model, 'eval-transformer-based-hierarchy')
+
+        logits, _ = model.classifier(model.roberta(self.input_ids, self.attention_mask)[0][:, 0, :],
+                                     torch.tensor([0, 2]))
+        self.assertTrue(torch.allclose(logits, inference_model(self.input_ids, self.attention_mask)))
+
+    def test_flat_inference_model(self):
+        """Test that the flat model returns the logits of a label free forward pass"""
+        model = SequenceClassifier(8, 5)
+        inference_model = inference_models.build_inference_model(model, 'eval-transformer-based')
+
+        logits = inference_model(self.input_ids, self.attention_mask)
+        self.assertEqual((2, 5), tuple(logits.shape))
+        self.assertTrue(torch.allclose(model(input_ids=self.input_ids, attention_mask=self.attention_mask)[0], logits))
+
+        with self.assertRaises(ValueError):
+            inference_models.build_inference_model(model, 'eval-dictionary-based')
+
+    @unittest.skipIf(not ONNX_AVAILABLE, 'onnx & onnxruntime are not installed')
+    def test_export_onnx(self):
+        """Test that the exported ONNX model reproduces the logits for other batch sizes & sequence lengths"""
+        inference_model = inference_models.build_inference_model(SequenceClassifier(8, 5), 'eval-transformer-based')
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = inference_models.export_onnx(inference_model, os.path.join(directory, 'model.onnx'))
+            onnx_model = inference_models.OnnxInferenceModel(path, num_threads=1)
+
+            input_ids = torch.tensor([[1, 2, 3, 4], [4, 5, 0, 0], [6, 7, 8, 0]])
+            attention_mask = (input_ids > 0).long()
+            with torch.no_grad():
+                expected_logits = inference_model(input_ids, attention_mask)
+            self.assertTrue(torch.allclose(expected_logits, onnx_model(input_ids, attention_mask), atol=1e-5))
@@ -0,0 +1,59 @@
+import unittest
+from types import SimpleNamespace
+
+import networkx as nx
+import torch
+
+from src.models.transformers.custom_transformers.modules.lcpn_head import LCPNHead, compile_lcpn_structure
+from src.utils.tree_utils import TreeUtils
+
+
+class TestLCPNHead(unittest.TestCase):
+
+    def setUp(self):
+        torch.manual_seed(42)
+        # Root 0 - leaves 3, 4 below 1 & leaf 6 below 2 -> 5
+        tree = nx.DiGraph()
+        tree.add_edges_from([(0, 1), (0, 2), (1, 3), (1, 4), (2, 5), (5, 6)])
+        parents, children, leaves = compile_lcpn_structure(tree, TreeUtils(tree))
+
+        self.config = SimpleNamespace(hidden_size=8, hidden_dropout_prob=0.1, lcpn_parents=parents,
+                                      lcpn_children=children, lcpn_leaves=leaves)
+        self.head = LCPNHead(self.config)
+        self.head.eval()
+        self.input = torch.randn(4, 8)
+
+    def test_compile_lcpn_structure(self):
+        """Test that the root comes first and every parent lists its children"""
+        self.assertEqual([0, 1, 2, 5], self.config.lcpn_parents)
+        self.assertEqual([[1, 2], [3, 4], [5], [6]], self.config.lcpn_children)
+        self.assertEqual([3, 4, 6], self.config.lcpn_leaves)
+        self.assertEqual((6, 8), tuple(self.head.weight.shape))
+
+    def test_forward(self):
+        """Test that leaf scores form a distribution and the loss follows the local decisions along the path"""
+        logits, loss = self.head(self.input, torch.tensor([0, 1, 2, 2]))
+        self.assertTrue(torch.allclose(torch.ones(4), logits.exp().sum(dim=-1)))
+
+        # Leaf 6 is reached via 2 -> 5 -> 6 - a single child has probability 1
+        local_logits = self.head.compute_logits(self.input)
+        root = torch.log_softmax(local_logits[:, [0, 1]], dim=-1)
+        node_1 = torch.log_softmax(local_logits[:, [2, 3]], dim=-1)
+        self.assertTrue(torch.allclose(root[:, 1], logits[:, 2]))
+        self.assertTrue(torch.allclose(root[:, 0] + node_1[:, 1], logits[:, 1]))
+
+        expected_loss = -(root[0, 0] + node_1[0, 0] + root[1, 0] + node_1[1, 1] + root[2, 1] + root[3, 1]) / 10
+        self.assertTrue(torch.allclose(expected_loss, loss))
+
+    def test_predict_top_down(self):
+        """Test that the top down prediction follows valid paths and matches greedy decisions"""
+        nodes, probabilities = self.head.predict_top_down(self.input)
+
+        local_logits = self.head.compute_logits(self.input)
+        for i, path in enumerate(nodes.tolist()):
+            first = [1, 2][local_logits[i, [0, 1]].argmax().item()]
+            if first == 1:
+                self.assertEqual([1, [3, 4][local_logits[i, [2, 3]].argmax().item()], -1], path)
+            else:
+                self.assertEqual([2, 5, 6], path)
+                self.assertEqual(1., probabilities[i, 2].item())
@@ -0,0 +1,43 @@
+import unittest
+
+import torch
+
+from src.models.transformers.dataset.length_grouped_sampler import LengthGroupedSampler
+
+
+class TestLengthGroupedSampler(unittest.TestCase):
+
+    def setUp(self):
+        # Short titles & long descriptions in random order
+        generator = torch.Generator().manual_seed(42)
+        lengths = [5 + i % 6 for i in range(32)] + [100 + i for i in range(32)]
+        self.lengths = [lengths[idx] for idx in torch.randperm(64, generator=generator).tolist()]
+
+    def batches(self, sampler, batch_size):
+        indices = list(sampler)
+        return [indices[start:start + batch_size] for start in range(0, len(indices), batch_size)]
+
+    def test_batches_hold_similar_lengths(self):
+        """Test that batches hold either titles or descriptions only and every index is drawn once"""
+        sampler = LengthGroupedSampler(self.lengths, batch_size=8, mega_batch_multiplier=8,
+                                       generator=torch.Generator().manual_seed(1))
+
+        batches = self.batches(sampler, 8)
+        self.assertEqual(list(range(64)), sorted([idx for batch in batches for idx in batch]))
+        for batch in batches:
+            lengths = [self.lengths[idx] for idx in batch]
+            self.assertTrue(max(lengths) < 100 or min(lengths) >= 100)
+
+    def test_less_padding_than_random_batches(self):
+        """Test that grouping within smaller mega-batches pads less than random batches & shuffles per epoch"""
+        generator = torch.Generator().manual_seed(1)
+        sampler = LengthGroupedSampler(self.lengths, batch_size=4, mega_batch_multiplier=4, generator=generator)
+
+        def padding(batches):
+            return sum([len(batch) * max([self.lengths[idx] for idx in batch])
+                        - sum([self.lengths[idx] for idx in batch]) for batch in batches])
+
+        random_batches = [list(range(start, start + 4)) for start in range(0, 64, 4)]
+        first_epoch = self.batches(sampler, 4)
+        self.assertLess(padding(first_epoch), padding(random_batches) / 2)
+        self.assertNotEqual(first_epoch, self.batches(sampler, 4))
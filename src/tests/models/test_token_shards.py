@@ -0,0 +1,63 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.models.transformers.dataset.token_shards import load_token_shards
+
+
+class CharacterTokenizer:
+    """Stand-in for a Hugging Face tokenizer - one token per character plus start and end token"""
+
+    name_or_path = 'characters'
+
+    def __init__(self):
+        self.calls = 0
+
+    def __len__(self):
+        return 256
+
+    def __call__(self, texts, truncation=False, max_length=None):
+        self.calls += 1
+        input_ids = [[1] + [ord(character) for character in text] + [2] for text in texts]
+        if truncation:
+            input_ids = [ids[:max_length] for ids in input_ids]
+        return {'input_ids': input_ids}
+
+
+class TestTokenShards(unittest.TestCase):
+
+    def test_packed_token_shards(self):
+        """Test packing into fixed blocks across shards and that up to date shards are not tokenized again"""
+        with tempfile.TemporaryDirectory() as directory:
+            text_path = os.path.join(directory, 'train.txt')
+            with open(text_path, 'w') as f:
+                f.write('abc\n\ndefgh\nij\n')
+            shard_dir = os.path.join(directory, 'packed', 'train')
+
+            tokenizer = CharacterTokenizer()
+            dataset = load_token_shards(text_path, shard_dir, tokenizer, 4, line_by_line=False, shard_size=8)
+
+            # 18 tokens are packed into 4 blocks - the remainder is dropped
+            tokens = [1, 97, 98, 99, 2, 1, 2, 1, 100, 101, 102, 103, 104, 2, 1, 105]
+            self.assertEqual(4, len(dataset))
+            self.assertEqual(tokens, np.concatenate([dataset[i]['input_ids'].numpy() for i in range(4)]).tolist())
+            self.assertEqual(2, len(dataset.shards))
+
+            load_token_shards(text_path, shard_dir, tokenizer, 4, line_by_line=False)
+            self.assertEqual(1, tokenizer.calls)
+
+    def test_line_by_line_token_shards(self):
+        """Test that non-empty lines are kept as truncated single sequences"""
+        with tempfile.TemporaryDirectory() as directory:
+            text_path = os.path.join(directory, 'train.txt')
+            with open(text_path, 'w') as f:
+                f.write('abc\n \ndefgh\n')
+
+            dataset = load_token_shards(text_path, os.path.join(directory, 'train'), CharacterTokenizer(), 4,
+                                        line_by_line=True)
+
+            self.assertEqual(2, len(dataset))
+            self.assertEqual([1, 97, 98, 99], dataset[0]['input_ids'].tolist())
+            self.assertEqual([1, 100, 101, 102], dataset[1]['input_ids'].tolist())
@@ -0,0 +1,60 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.models.transformers.dataset.dynamic_padding_collator import DynamicPaddingCollator
+from src.models.transformers.dataset.tokenization_cache import TokenizationCache
+
+
+class WhitespaceTokenizer:
+    """Minimal tokenizer - one id per character length of each word, framed by bos/eos ids"""
+
+    name_or_path = 'whitespace'
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, texts, truncation=True):
+        self.calls += 1
+        return {'input_ids': [[0] + [len(word) + 3 for word in text.split()] + [2] for text in texts]}
+
+
+class TestTokenizationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.split_path = Path(self.tmp_dir.name).joinpath('train_data_test.pkl')
+        self.split_path.write_bytes(b'split')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_encode(self):
+        """Test that cached token ids match the tokenizer output and are reused"""
+        texts = ['red shoe', 'blue winter jacket', 'hat']
+        tokenizer = WhitespaceTokenizer()
+        cache = TokenizationCache(self.tmp_dir.name, 'test')
+
+        encodings = cache.encode([self.split_path], tokenizer, False, False, len(texts), lambda: texts)
+        cached_encodings = cache.encode([self.split_path], tokenizer, False, False, len(texts), lambda: texts)
+
+        self.assertEqual(1, tokenizer.calls)
+        self.assertEqual(3, len(cached_encodings))
+        for idx, ids in enumerate(tokenizer(texts)['input_ids']):
+            self.assertEqual(ids, encodings[idx].tolist())
+            self.assertEqual(ids, cached_encodings[idx].tolist())
+
+        # Changed settings lead to a new cache entry
+        cache.encode([self.split_path], tokenizer, False, True, len(texts), lambda: texts)
+        self.assertEqual(3, tokenizer.calls)
+
+    def test_dynamic_padding(self):
+        """Test that batches are padded to the longest sequence rounded up to a multiple of 8"""
+        tokenizer = WhitespaceTokenizer()
+        cache = TokenizationCache(self.tmp_dir.name, 'test')
+        encodings = cache.encode([self.split_path], tokenizer, False, False, 2, lambda: ['red shoe', 'hat'])
+
+        batch = DynamicPaddingCollator(pad_token_id=1)([encodings.get_item(0), encodings.get_item(1)])
+
+        self.assertEqual([[0, 6, 7, 2, 1, 1, 1, 1], [0, 6, 2, 1, 1, 1, 1, 1]], batch['input_ids'].tolist())
+        self.assertEqual([1, 1, 1, 0, 0, 0, 0, 0], batch['attention_mask'][1].tolist())
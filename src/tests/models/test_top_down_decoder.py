@@ -0,0 +1,59 @@
+import unittest
+
+import networkx as nx
+import torch
+
+from src.models.transformers.custom_transformers.modules.top_down_decoder import TopDownDecoder
+from src.utils.tree_utils import TreeUtils
+
+
+class TestTopDownDecoder(unittest.TestCase):
+
+    def setUp(self):
+        # Root 0 - leaves 3, 4 below 1 & leaf 6 below 2 -> 5; fill up category 7
+        tree = nx.DiGraph()
+        tree.add_edges_from([(0, 1), (0, 2), (1, 3), (1, 4), (2, 5), (5, 6)])
+        self.tree_utils = TreeUtils(tree)
+        self.fill_category = len(tree)
+
+    def test_compile_transitions(self):
+        """Test child mask & transitions for node ids and positions per parent"""
+        child_mask, transitions = self.tree_utils.compile_transitions(self.fill_category)
+        self.assertEqual([1, 2], child_mask[0].nonzero()[0].tolist())
+        self.assertEqual([7], child_mask[3].nonzero()[0].tolist())
+        self.assertEqual([7], child_mask[7].nonzero()[0].tolist())
+        self.assertEqual(5, transitions[2, 5])
+
+        child_mask, transitions = self.tree_utils.compile_transitions(self.fill_category, per_parent=True)
+        self.assertEqual([1, 2], child_mask[1].nonzero()[0].tolist())
+        self.assertEqual(4, transitions[1, 2])
+        self.assertEqual(7, transitions[4, 7])
+
+    def test_decode_valid_paths(self):
+        """Test that masking yields valid paths where independent argmax does not and that the beam finds the
+            path with the highest joint probability"""
+        logits = torch.full((1, 3, 8), -10.)
+        # Level 1 prefers 1 slightly, level 2 strongly prefers 5 (child of 2), level 3 prefers 6
+        logits[0, 0, 1], logits[0, 0, 2] = 1., 0.5
+        logits[0, 1, 5], logits[0, 1, 3] = 5., 0.
+        logits[0, 2, 6], logits[0, 2, 7] = 5., 0.
+        self.assertEqual([1, 5, 6], logits.argmax(-1)[0].tolist())
+
+        labels, nodes, probabilities = TopDownDecoder.from_tree_utils(self.tree_utils, self.fill_category)(logits)
+        self.assertEqual([[1, 3, 7]], labels.tolist())
+        self.assertEqual([[1, 3, 7]], nodes.tolist())
+        self.assertTrue(torch.allclose(torch.softmax(logits, -1)[0, 0, 1], probabilities[0, 0]))
+
+        labels, nodes, _ = TopDownDecoder.from_tree_utils(self.tree_utils, self.fill_category, beam_size=2)(logits)
+        self.assertEqual([[2, 5, 6]], labels.tolist())
+
+    def test_decode_per_parent(self):
+        """Test that positions per parent are decoded into nodes"""
+        logits = torch.full((2, 3, 8), -10.)
+        logits[0, 0, 2], logits[0, 1, 1], logits[0, 2, 1] = 1., 1., 1.
+        logits[1, 0, 1], logits[1, 1, 2], logits[1, 2, 7] = 1., 1., 1.
+
+        decoder = TopDownDecoder.from_tree_utils(self.tree_utils, self.fill_category, per_parent=True, beam_size=3)
+        labels, nodes, _ = decoder(logits)
+        self.assertEqual([[2, 1, 1], [1, 2, 7]], labels.tolist())
+        self.assertEqual([[2, 5, 6], [1, 4, 7]], nodes.tolist())
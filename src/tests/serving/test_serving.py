@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.pipeline import Pipeline
+
+from src.serving import CategoryPredictor
+from src.serving.client import CategoryClient
+from src.serving.micro_batcher import MicroBatcher
+from src.serving.server import CategoryServer
+
+
+def create_tree():
+    tree = nx.DiGraph()
+    tree.add_nodes_from([(0, {'name': 'Root'}), (1, {'name': 'Clothes'}), (2, {'name': 'Running Shoes'}),
+                         (3, {'name': 'Shirts'}), (4, {'name': 'Phones'})])
+    tree.add_edges_from([(0, 1), (1, 2), (1, 3), (0, 4)])
+    return tree
+
+
+class TestServing(unittest.TestCase):
+
+    def test_category_predictor(self):
+        """Test leaf, path and per level scores of a leaf probability model"""
+        titles = ['red running shoes', 'blue running shoes', 'white shirt', 'black shirt', 'apple phone', 'phone']
+        categories = ['Running_Shoes', 'Running_Shoes', 'Shirts', 'Shirts', 'Phones', 'Phones']
+        model = Pipeline([('vect', CountVectorizer()), ('clf', RandomForestClassifier(random_state=42))])
+        model.fit(titles, categories)
+
+        predictor = CategoryPredictor('random-forest-based', model, create_tree())
+        predictions = predictor.predict(['green running shoes', 'phone'])
+
+        self.assertEqual('Running Shoes', predictions[0]['leaf'])
+        self.assertEqual(['Clothes', 'Running Shoes'], predictions[0]['path'])
+        # Probability of a node sums up the probabilities of its leaves
+        self.assertGreaterEqual(predictions[0]['scores'][0], predictions[0]['scores'][1])
+        self.assertEqual(['Phones'], predictions[1]['path'])
+
+    def test_server_micro_batching(self):
+        """Test that concurrent requests are answered in order and grouped into bounded batches"""
+        batch_sizes = []
+
+        def predict_batch(titles):
+            batch_sizes.append(len(titles))
+            return [{'leaf': title.upper()} for title in titles]
+
+        loop = asyncio.new_event_loop()
+        server = CategoryServer(MicroBatcher(predict_batch, max_batch_size=4, max_wait=0.05), port=0)
+        loop.run_until_complete(server.start())
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+
+        try:
+            def request(i):
+                client = CategoryClient(port=server.port)
+                predictions = client.predict(['title {}'.format(i), 'other {}'.format(i)])
+                client.close()
+                return predictions
+
+            with ThreadPoolExecutor(8) as executor:
+                results = list(executor.map(request, range(8)))
+
+            self.assertEqual({'status': 'ok'}, CategoryClient(port=server.port).health())
+        finally:
+            asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+        for i, predictions in enumerate(results):
+            self.assertEqual([{'leaf': 'TITLE {}'.format(i)}, {'leaf': 'OTHER {}'.format(i)}], predictions)
+        self.assertEqual(16, sum(batch_sizes))
+        self.assertLessEqual(max(batch_sizes), 4)
+        self.assertLess(len(batch_sizes), 16)
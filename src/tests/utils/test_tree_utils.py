@@ -0,0 +1,45 @@
+import unittest
+
+import networkx as nx
+
+from src.utils.tree_utils import TreeUtils
+
+
+class TestTreeUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.tree = nx.DiGraph()
+        self.tree.add_edges_from([(0, 1), (0, 2), (1, 3), (1, 4), (2, 5), (5, 6)])
+        self.tree_utils = TreeUtils(self.tree)
+
+    def test_compile_tree_index(self):
+        """Test parent, depth and path lookup of the compiled tree index"""
+        self.assertEqual([-1, 0, 0, 1, 1, 2, 5], self.tree_utils.parent.tolist())
+        self.assertEqual([0, 1, 1, 2, 2, 2, 3], self.tree_utils.depth.tolist())
+        self.assertEqual([2, 5, 6], self.tree_utils.paths[6].tolist())
+        self.assertEqual([1, 4, -1], self.tree_utils.paths[4].tolist())
+
+    def test_determine_path_to_root(self):
+        """Test path to root of single nodes and batches"""
+        self.assertEqual([1, 3], self.tree_utils.determine_path_to_root([3]))
+        self.assertEqual([2, 5, 6], self.tree_utils.determine_path_to_root([6]))
+
+        paths, lengths = self.tree_utils.determine_paths_to_root([6, 3, 0])
+        self.assertEqual([[2, 5, 6], [1, 3, -1], [0, -1, -1]], paths.tolist())
+        self.assertEqual([3, 2, 1], lengths.tolist())
+
+    def test_normalize_paths_from_root_per_level(self):
+        """Test normalization of paths by the position of each node within its level"""
+        self.assertEqual([1, 2], self.tree_utils.get_all_nodes_per_lvl(0))
+        self.assertEqual([3, 4, 5], self.tree_utils.get_all_nodes_per_lvl(1))
+        self.assertEqual([2, 3, 1], self.tree_utils.normalize_path_from_root_per_level([2, 5, 6]))
+
+        normalized_paths = self.tree_utils.normalize_paths_from_root_per_level([6, 4, 3])
+        self.assertEqual([[2, 3, 1], [1, 2, -1], [1, 1, -1]], normalized_paths.tolist())
+
+        sorted_paths = self.tree_utils.sort_paths(normalized_paths)
+        self.assertEqual([[1, 1, -1], [1, 2, -1], [2, 3, 1]], sorted_paths.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
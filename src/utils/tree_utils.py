@@ -1,4 +1,7 @@
 
+import numpy as np
+
+
 class TreeUtils():
 
     def __init__(self, tree):
@@ -6,43 +9,107 @@ class TreeUtils():
         self.tree = tree
         self.root = [node[0] for node in tree.in_degree if node[1] == 0][0]
 
+        # Compiled tree index - parent & depth per node plus the padded path from the first level to each node
+        self.parent, self.depth, self.paths, self.levels = self.compile_tree_index()
+
+        # Level index - position (starting with 1) of each node within its level
+        self.level_position = np.zeros(len(self.parent), dtype=np.int32)
+        for nodes in self.levels:
+            self.level_position[nodes] = np.arange(1, len(nodes) + 1)
+
+    def compile_tree_index(self):
+        """Compile parent, depth and path arrays indexed by node - paths are padded with -1.
+            Additionally the nodes of each level are returned in breadth first order."""
+        num_nodes = max(self.tree.nodes) + 1
+        parent = np.full(num_nodes, -1, dtype=np.int32)
+        depth = np.zeros(num_nodes, dtype=np.int32)
+
+        # Traverse tree level by level starting from the root
+        levels = []
+        current_level = [self.root]
+        while len(current_level) > 0:
+            next_level = []
+            for node in current_level:
+                for successor in self.tree.successors(node):
+                    parent[successor] = node
+                    depth[successor] = depth[node] + 1
+                    next_level.append(successor)
+            if len(next_level) > 0:
+                levels.append(np.array(next_level, dtype=np.int32))
+            current_level = next_level
+
+        paths = np.full((num_nodes, max(len(levels), 1)), -1, dtype=np.int32)
+        for lvl, nodes in enumerate(levels):
+            paths[nodes] = paths[parent[nodes]]
+            paths[nodes, lvl] = nodes
+
+        return parent, depth, paths, levels
+
     def determine_path_to_root(self, nodes):
+        """Determine path from the first level of the tree to the last node in nodes"""
+        node = nodes[-1]
+        path = self.paths[node, :self.depth[node]].tolist()
+
+        return path + nodes[-2::-1]
 
-        predecessors = self.tree.predecessors(nodes[-1])
-        predecessor = [k for k in predecessors][0]
+    def determine_paths_to_root(self, nodes):
+        """Determine padded paths & path lengths for all nodes at once.
+            Nodes without predecessors (root - out of category) are treated as path of length one."""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        paths = self.paths[nodes]
+        lengths = self.depth[nodes]
 
-        if predecessor == self.root:
-            nodes.reverse()
-            return nodes
-        nodes.append(predecessor)
-        return self.determine_path_to_root(nodes)
+        no_predecessor = lengths == 0
+        paths[no_predecessor, 0] = nodes[no_predecessor]
+        lengths[no_predecessor] = 1
+
+        return paths, lengths
 
     def get_all_nodes_per_lvl(self, level):
 
-        successors = self.tree.successors(self.root)
-        while level > 0:
-            next_lvl_succesors = []
-            for successor in successors:
-                next_lvl_succesors.extend(self.tree.successors(successor))
-            successors = next_lvl_succesors
-            level -= 1
+        if level >= len(self.levels):
+            return []
 
-        return successors
+        return self.levels[level].tolist()
 
     def normalize_path_from_root_per_level(self, path):
         """Normalize label values per level"""
-        normalized_path = []
-        for i in range(len(path)):
-            counter = 0
-            nodes_per_lvl = self.get_all_nodes_per_lvl(i)
-            for node in nodes_per_lvl:
-                counter += 1
-                if node == path[i]:
-                    normalized_path.append(counter)
-                    break
-
-        assert (len(path) == len(normalized_path))
-        return normalized_path
+        path = np.asarray(path)
+        assert (self.depth[path] == np.arange(1, len(path) + 1)).all()
+
+        return self.level_position[path].tolist()
+
+    def normalize_paths_from_root_per_level(self, nodes):
+        """Normalize paths of all nodes at once - normalized paths are padded with -1"""
+        paths = self.paths[np.asarray(nodes)]
+
+        return np.where(paths >= 0, self.level_position[paths], -1)
+
+    def sort_paths(self, paths):
+        """Sort padded paths ascending - first level is the most significant"""
+        order = np.lexsort(paths.transpose()[::-1])
+
+        return paths[order]
+
+    def compile_transitions(self, fill_category, per_parent=False):
+        """Compile child mask & transition table of the RNN label space - both are indexed by (node, label).
+            Labels are node ids or, per parent, positions (starting with 1) among the successors of a node.
+            Leaves and the fill up category itself only continue with the fill up category."""
+        num_labels = fill_category + 1
+        child_mask = np.zeros((num_labels, num_labels), dtype=bool)
+        transitions = np.full((num_labels, num_labels), fill_category, dtype=np.int64)
+
+        for node in list(self.tree.nodes) + [fill_category]:
+            successors = list(self.tree.successors(node)) if node != fill_category else []
+            if len(successors) == 0:
+                child_mask[node, fill_category] = True
+                continue
+
+            labels = np.arange(1, len(successors) + 1) if per_parent else np.array(successors)
+            child_mask[node, labels] = True
+            transitions[node, labels] = successors
+
+        return child_mask, transitions
 
     def get_sorted_leaf_nodes(self):
         leaf_nodes = []